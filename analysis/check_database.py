@@ -3,9 +3,12 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database.models import Earthquake, SessionLocal
+from database.catalog_export import describe_source, load_history
+from database.cold_storage import cold_months, month_bounds
+from database.models import Earthquake, EarthquakeRollupDaily, SessionLocal
+from database.rollups import CANONICAL_SOURCE
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import extract, func
 
 class DatabaseAnalyzer:
     """Veritabanındaki mevcut verileri analiz et"""
@@ -13,14 +16,25 @@ class DatabaseAnalyzer:
     def __init__(self):
         self.db = SessionLocal()
     
+    def source_counts(self):
+        """Kaynak başına toplam kayıt - günlük özetlerden"""
+        return self.db.query(
+            EarthquakeRollupDaily.source,
+            func.sum(EarthquakeRollupDaily.event_count).label('count')
+        ).filter(
+            EarthquakeRollupDaily.source != CANONICAL_SOURCE
+        ).group_by(EarthquakeRollupDaily.source).all()
+    
     def check_data_coverage(self):
         """Veritabanında hangi tarih aralığında veri var?"""
         print("\n" + "="*60)
         print("📊 VERİTABANI VERİ KAPSAMI ANALİZİ")
         print("="*60 + "\n")
+        print(describe_source() + "\n")
         
-        # Toplam deprem sayısı
-        total = self.db.query(Earthquake).count()
+        # Toplam deprem sayısı (özet tablolarından)
+        sources = self.source_counts()
+        total = sum(count for _, count in sources)
         print(f"📈 Toplam Deprem Sayısı: {total:,}")
         
         if total == 0:
@@ -29,18 +43,18 @@ class DatabaseAnalyzer:
         
         # Kaynak bazında dağılım
         print(f"\n📊 Kaynak Bazında Dağılım:")
-        sources = self.db.query(
-            Earthquake.source,
-            func.count(Earthquake.id).label('count')
-        ).group_by(Earthquake.source).all()
-        
         for source, count in sources:
             percentage = (count / total) * 100
             print(f"   {source:20s}: {count:8,} deprem ({percentage:5.1f}%)")
         
-        # Tarih aralığı
+        # Tarih aralığı (soğuk katmandaki aylar dahil)
         oldest = self.db.query(func.min(Earthquake.timestamp)).scalar()
         newest = self.db.query(func.max(Earthquake.timestamp)).scalar()
+        months = cold_months()
+        if months:
+            print(f"\n🧊 Soğuk katman: {len(months)} ay ({months[0][0]}-{months[0][1]:02d} → {months[-1][0]}-{months[-1][1]:02d})")
+            oldest = min(filter(None, [oldest, month_bounds(*months[0])[0]]))
+            newest = newest or month_bounds(*months[-1])[1]
         
         if oldest and newest:
             print(f"\n📅 Tarih Aralığı:")
@@ -50,30 +64,25 @@ class DatabaseAnalyzer:
         
         # Büyük depremler (M≥5.0)
         print(f"\n🔴 Büyük Depremler (M ≥ 5.0):")
-        major = self.db.query(Earthquake).filter(
-            Earthquake.magnitude >= 5.0
-        ).order_by(Earthquake.magnitude.desc()).limit(15).all()
+        major = load_history(self.db, min_magnitude=5.0).nlargest(15, 'magnitude')
         
-        if major:
-            for eq in major:
-                print(f"   {eq.timestamp.strftime('%Y-%m-%d')} | M{eq.magnitude:.1f} | {eq.location[:50]}")
+        if len(major):
+            for eq in major.itertuples():
+                print(f"   {eq.timestamp.strftime('%Y-%m-%d')} | M{eq.magnitude:.1f} | {(eq.location or '')[:50]}")
         else:
             print("   Bulunamadı")
         
         # Yıllık dağılım
         print(f"\n📊 Yıllık Dağılım:")
-        for year in range(oldest.year, newest.year + 1):
-            year_start = datetime(year, 1, 1)
-            year_end = datetime(year, 12, 31, 23, 59, 59)
-            
-            count = self.db.query(Earthquake).filter(
-                Earthquake.timestamp >= year_start,
-                Earthquake.timestamp <= year_end
-            ).count()
-            
+        year_expr = extract('year', EarthquakeRollupDaily.bucket).label('year')
+        yearly = self.db.query(year_expr, func.sum(EarthquakeRollupDaily.event_count)).filter(
+            EarthquakeRollupDaily.source != CANONICAL_SOURCE
+        ).group_by(year_expr).order_by(year_expr).all()
+        
+        for year, count in yearly:
             if count > 0:
                 bar = '█' * min(count // 200, 60)
-                print(f"   {year}: {count:6,} deprem {bar}")
+                print(f"   {int(year)}: {count:6,} deprem {bar}")
         
         print("\n" + "="*60 + "\n")
     
@@ -109,12 +118,10 @@ class DatabaseAnalyzer:
             end_date = event['date'] - timedelta(days=1)
             
             # Yakın bölgedeki depremleri say (±0.5 derece ~ 50km)
-            nearby = self.db.query(Earthquake).filter(
-                Earthquake.timestamp >= start_date,
-                Earthquake.timestamp <= end_date,
-                Earthquake.latitude.between(event['lat'] - 0.5, event['lat'] + 0.5),
-                Earthquake.longitude.between(event['lon'] - 0.5, event['lon'] + 0.5)
-            ).count()
+            nearby = len(load_history(
+                self.db, start_date, end_date,
+                bbox=(event['lat'] - 0.5, event['lat'] + 0.5, event['lon'] - 0.5, event['lon'] + 0.5)
+            ))
             
             print(f"📍 {event['name']}")
             print(f"   Depremden 90 gün öncesi (±50km):")
@@ -135,7 +142,7 @@ class DatabaseAnalyzer:
     
     def suggest_next_steps(self):
         """Sonraki adımlar öner"""
-        total = self.db.query(Earthquake).count()
+        total = sum(count for _, count in self.source_counts())
         
         print("💡 SONRAKİ ADIMLAR:")
         print("="*60 + "\n")
@@ -6,14 +6,14 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from database.models import Earthquake, SessionLocal
-from sqlalchemy import and_
+from database.catalog_export import describe_source, load_history
+from database.models import MaintenanceSession
 
 class RetrospectiveAnalysis:
     """Geçmiş büyük depremler öncesi anomali analizi - FAY HATTI VERSİYONU"""
     
     def __init__(self):
-        self.db = SessionLocal()
+        self.db = MaintenanceSession()
         
         # Türkiye'deki kritik büyük depremler + Fay hatları
         self.major_earthquakes_turkey = [
@@ -126,15 +126,12 @@ class RetrospectiveAnalysis:
             print(f"   📍 Fay: {event['fault_direction']} yönlü, {event['fault_length_km']}km × {event['fault_width_km']}km")
             print(f"   📍 Alan: {bounds['lat_min']:.2f}°-{bounds['lat_max']:.2f}°N, {bounds['lon_min']:.2f}°-{bounds['lon_max']:.2f}°E")
             
-            earthquakes = self.db.query(Earthquake).filter(
-                and_(
-                    Earthquake.timestamp >= start_date,
-                    Earthquake.timestamp <= end_date,
-                    Earthquake.latitude.between(bounds['lat_min'], bounds['lat_max']),
-                    Earthquake.longitude.between(bounds['lon_min'], bounds['lon_max']),
-                    Earthquake.magnitude >= 2.0
-                )
-            ).all()
+            # Katalog export'u (yoksa sıcak tablo + soğuk katman) - DataFrame
+            earthquakes = load_history(
+                self.db, start_date, end_date,
+                bbox=(bounds['lat_min'], bounds['lat_max'], bounds['lon_min'], bounds['lon_max']),
+                min_magnitude=2.0
+            )
             
             print(f"✅ {len(earthquakes)} deprem verisi bulundu\n")
             
@@ -147,7 +144,7 @@ class RetrospectiveAnalysis:
     def analyze_foreshock_activity(self, earthquakes, event, bounds):
         """Öncü deprem aktivitesini analiz et"""
         
-        if not earthquakes or len(earthquakes) < 10:
+        if len(earthquakes) < 10:
             print(f"⚠️ Yeterli veri yok - sadece {len(earthquakes)} deprem bulundu")
             print(f"   Minimum 10 deprem gerekli\n")
             return {
@@ -158,21 +155,19 @@ class RetrospectiveAnalysis:
                 'insufficient_data': True
             }
         
-        # DataFrame'e çevir
-        data = [{
-            'time': eq.timestamp,
-            'magnitude': eq.magnitude,
-            'depth': eq.depth,
-            'lat': eq.latitude,
-            'lon': eq.longitude,
-            'location': eq.location,
+        # Analiz kolonları (mesafe vektörel)
+        df = pd.DataFrame({
+            'time': earthquakes['timestamp'],
+            'magnitude': earthquakes['magnitude'],
+            'depth': earthquakes['depth'],
+            'lat': earthquakes['latitude'],
+            'lon': earthquakes['longitude'],
+            'location': earthquakes['location'],
             'distance_km': self.calculate_distance(
-                eq.latitude, eq.longitude,
+                earthquakes['latitude'].to_numpy(), earthquakes['longitude'].to_numpy(),
                 event['lat'], event['lon']
             )
-        } for eq in earthquakes]
-        
-        df = pd.DataFrame(data)
+        })
         df = df.sort_values('time')
         
         print(f"📈 GENEL İSTATİSTİKLER:")
@@ -278,6 +273,7 @@ class RetrospectiveAnalysis:
         print("🧪 RETROSPEKTİF ANALİZ - FAY HATTI VERSİYONU")
         print("   (Genişletilmiş fay hattı taraması)")
         print("🔥"*30 + "\n")
+        print(describe_source())
         
         results = []
         
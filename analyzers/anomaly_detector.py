@@ -3,21 +3,27 @@
 Anomali Tespit Modülü
 - Frekans bazlı anomali tespiti (Z-score)
 - Magnitüd artış tespiti
+- Kaynaklar arası tekilleştirilmiş depremler (canonical_events) üzerinde çalışır
+- Son 48 saat süreç içi depodan (database/recent_store.py) vektörel okunur;
+  çalıştırmalar arası sadece yeni/güncellenen olaylar veritabanından çekilir
+- Baseline sayıları günlük özet tablosundan (earthquake_rollups_daily) okunur
+- Session her analyze() çağrısında açılır ve sonunda kapatılır; çalıştırmalar
+  arasındaki boşta sürede bağlantı tutulmaz
 """
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from datetime import datetime, timedelta, timezone
-from database.models import Earthquake, Anomaly, SessionLocal
-import numpy as np
-import pandas as pd
-from sqlalchemy import and_
+from database.models import Anomaly, DetectorSession
+from database.recent_store import recent_events
+from database.versions import ANOMALIES, bump
+from database.rollups import GRID_SIZE, cell_counts, day_bucket
 
 class AnomalyDetector:
     def __init__(self):
-        self.db = SessionLocal()
-        self.grid_size = 0.45  # ~50km grid
+        self.db = None  # analyze() süresince açık
+        self.grid_size = GRID_SIZE  # ~50km grid (özet tablolarıyla aynı)
     
     def analyze(self):
         """Tüm anomali analizlerini çalıştır"""
@@ -26,18 +32,23 @@ class AnomalyDetector:
         print("="*60 + "\n")
         
         all_anomalies = []
+        self.db = DetectorSession()
         
-        # 1. Frekans anomalisi
-        freq_anomalies = self.detect_frequency_anomaly()
-        all_anomalies.extend(freq_anomalies)
-        
-        # 2. Magnitüd artış anomalisi
-        mag_anomalies = self.detect_magnitude_escalation()
-        all_anomalies.extend(mag_anomalies)
-        
-        # Anomalileri kaydet
-        if all_anomalies:
-            self.save_anomalies(all_anomalies)
+        try:
+            # 1. Frekans anomalisi
+            freq_anomalies = self.detect_frequency_anomaly()
+            all_anomalies.extend(freq_anomalies)
+            
+            # 2. Magnitüd artış anomalisi
+            mag_anomalies = self.detect_magnitude_escalation()
+            all_anomalies.extend(mag_anomalies)
+            
+            # Anomalileri kaydet
+            if all_anomalies:
+                self.save_anomalies(all_anomalies)
+        finally:
+            self.db.close()
+            self.db = None
         
         print(f"\n🎯 Toplam {len(all_anomalies)} anomali tespit edildi!")
         print("="*60 + "\n")
@@ -45,51 +56,43 @@ class AnomalyDetector:
         return all_anomalies
     
     def get_recent_earthquakes(self, hours=48):
-        """Son X saatteki depremleri getir"""
+        """Son X saatteki depremler - DataFrame (timestamp, latitude, longitude, magnitude, depth, location)"""
         time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours)
-        return self.db.query(Earthquake).filter(
-            Earthquake.timestamp >= time_threshold.replace(tzinfo=None)
-        ).all()
+        events = recent_events.snapshot(self.db)
+        return events.to_frame(events.since(time_threshold.replace(tzinfo=None)))
     
-    def get_baseline_earthquakes(self, days=90):
-        """Baseline için geçmiş depremleri getir (son 48 saat hariç)"""
-        end_time = datetime.now(timezone.utc) - timedelta(hours=48)
+    def get_baseline_counts(self, days=90):
+        """
+        Baseline için hücre başına deprem sayısı (son 48 saat hariç)
+        Günlük özetlerden okunur; pencere gün sınırına hizalıdır
+        """
+        end_time = day_bucket(datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=48))
         start_time = end_time - timedelta(days=days)
         
-        return self.db.query(Earthquake).filter(
-            and_(
-                Earthquake.timestamp >= start_time.replace(tzinfo=None),
-                Earthquake.timestamp <= end_time.replace(tzinfo=None)
-            )
-        ).all()
+        return cell_counts(self.db, start_time, end_time, daily=True)
     
     def create_grid(self, earthquakes):
         """Depremleri grid'lere böl"""
-        if not earthquakes:
+        # Koordinatsız kayıt hücreye düşmez (özet tablolarıyla aynı)
+        df = earthquakes.dropna(subset=['latitude', 'longitude'])
+        if df.empty:
             return {}
         
-        # DataFrame oluştur
-        df = pd.DataFrame([{
-            'lat': eq.latitude,
-            'lon': eq.longitude,
-            'mag': eq.magnitude,
-            'location': eq.location
-        } for eq in earthquakes])
-        
-        # Grid koordinatları
-        df['grid_lat'] = (df['lat'] / self.grid_size).round() * self.grid_size
-        df['grid_lon'] = (df['lon'] / self.grid_size).round() * self.grid_size
-        df['grid_id'] = df['grid_lat'].astype(str) + '_' + df['grid_lon'].astype(str)
+        # Grid hücresi (özet tablolarındaki cell_lat/cell_lon ile aynı)
+        df = df.assign(
+            cell_lat=(df['latitude'] / self.grid_size).round().astype(int),
+            cell_lon=(df['longitude'] / self.grid_size).round().astype(int)
+        )
         
         # Grid'lere göre grupla
         grids = {}
-        for grid_id, group in df.groupby('grid_id'):
-            grids[grid_id] = {
-                'center_lat': group['grid_lat'].iloc[0],
-                'center_lon': group['grid_lon'].iloc[0],
+        for (cell_lat, cell_lon), group in df.groupby(['cell_lat', 'cell_lon']):
+            grids[(int(cell_lat), int(cell_lon))] = {
+                'center_lat': cell_lat * self.grid_size,
+                'center_lon': cell_lon * self.grid_size,
                 'count': len(group),
-                'avg_magnitude': group['mag'].mean(),
-                'max_magnitude': group['mag'].max(),
+                'avg_magnitude': group['magnitude'].mean(),
+                'max_magnitude': group['magnitude'].max(),
                 'location': group['location'].iloc[0]
             }
         
@@ -97,23 +100,25 @@ class AnomalyDetector:
     
     def detect_frequency_anomaly(self):
         """Frekans bazlı anomali tespiti"""
+        import numpy as np
+        
         print("🔍 Frekans Anomalisi Analizi...")
         
         # Son 48 saat
         recent_earthquakes = self.get_recent_earthquakes(hours=48)
         print(f"   📊 Son 48 saat: {len(recent_earthquakes)} deprem")
         
-        # Baseline (90 gün)
-        baseline_earthquakes = self.get_baseline_earthquakes(days=90)
-        print(f"   📊 Baseline (90 gün): {len(baseline_earthquakes)} deprem")
+        # Baseline (90 gün) - hücre başına sayılar
+        baseline_counts = self.get_baseline_counts(days=90)
+        baseline_total = sum(baseline_counts.values())
+        print(f"   📊 Baseline (90 gün): {baseline_total} deprem")
         
-        if len(baseline_earthquakes) < 10:
+        if baseline_total < 10:
             print("   ⚠️  Yeterli baseline verisi yok\n")
             return []
         
         # Grid'lere böl
         recent_grids = self.create_grid(recent_earthquakes)
-        baseline_grids = self.create_grid(baseline_earthquakes)
         
         anomalies = []
         
@@ -121,7 +126,7 @@ class AnomalyDetector:
             recent_count = recent_data['count']
             
             # Baseline'daki sayı
-            baseline_count = baseline_grids.get(grid_id, {'count': 0})['count']
+            baseline_count = baseline_counts.get(grid_id, 0)
             
             # Günlük ortalamayı 48 saate çevir
             baseline_avg = (baseline_count / 90) * 2
@@ -163,6 +168,8 @@ class AnomalyDetector:
     
     def detect_magnitude_escalation(self):
         """Magnitüd artış anomalisi"""
+        import numpy as np
+        
         print("\n🔍 Magnitüd Kademeli Artış Analizi...")
         
         # Son 48 saat
@@ -180,24 +187,23 @@ class AnomalyDetector:
             if grid_data['count'] < 5:
                 continue
             
-            # Bu grid'deki depremleri al
-            grid_earthquakes = [eq for eq in recent_earthquakes 
-                              if abs(eq.latitude - grid_data['center_lat']) < self.grid_size/2
-                              and abs(eq.longitude - grid_data['center_lon']) < self.grid_size/2]
-            
-            # Zamana göre sırala
-            grid_earthquakes.sort(key=lambda x: x.timestamp)
+            # Bu grid'deki depremlerin magnitüdleri (depo zamana göre sıralı)
+            in_grid = (
+                ((recent_earthquakes['latitude'] - grid_data['center_lat']).abs() < self.grid_size/2)
+                & ((recent_earthquakes['longitude'] - grid_data['center_lon']).abs() < self.grid_size/2)
+            )
+            magnitudes = recent_earthquakes['magnitude'].to_numpy()[in_grid.to_numpy()]
             
             # Son 3 depremin ortalaması
-            if len(grid_earthquakes) >= 3:
-                last_3_avg = np.mean([eq.magnitude for eq in grid_earthquakes[-3:]])
-                prev_avg = np.mean([eq.magnitude for eq in grid_earthquakes[:-3]]) if len(grid_earthquakes) > 3 else 0
+            if len(magnitudes) >= 3:
+                last_3_avg = np.mean(magnitudes[-3:])
+                prev_avg = np.mean(magnitudes[:-3]) if len(magnitudes) > 3 else 0
                 
                 # Artış var mı?
                 if last_3_avg > prev_avg + 0.5 and last_3_avg >= 3.0:
                     print(f"\n   🚨 Magnitüd artışı tespit edildi!")
                     print(f"      📍 Konum: {grid_data['location']}")
-                    print(f"      📊 Deprem sayısı: {len(grid_earthquakes)}")
+                    print(f"      📊 Deprem sayısı: {len(magnitudes)}")
                     print(f"      📈 Son mag: {last_3_avg:.1f}")
                     print(f"      📉 Önceki ort: {prev_avg:.1f}")
                     print(f"      🔴 Seviye: ORANGE")
@@ -207,7 +213,7 @@ class AnomalyDetector:
                         'longitude': grid_data['center_lon'],
                         'radius_km': 50.0,
                         'z_score': (last_3_avg - prev_avg) * 2,  # Yaklaşık skor
-                        'earthquake_count': len(grid_earthquakes),
+                        'earthquake_count': len(magnitudes),
                         'baseline_rate': prev_avg,
                         'current_rate': last_3_avg,
                         'location': grid_data['location'],
@@ -246,6 +252,7 @@ class AnomalyDetector:
                     self.db.add(anomaly)
                     new_count += 1
             
+            bump(self.db, ANOMALIES)
             self.db.commit()
             print(f"\n💾 {new_count} yeni anomali kaydedildi")
             
@@ -254,11 +261,6 @@ class AnomalyDetector:
             import traceback
             traceback.print_exc()
             self.db.rollback()
-    
-    def __del__(self):
-        """Destructor - DB bağlantısını kapat"""
-        if hasattr(self, 'db'):
-            self.db.close()
 
 if __name__ == "__main__":
     detector = AnomalyDetector()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Kaynaklar Arası Olay Eşleştirme (Deduplication)
+- Aynı fiziksel deprem Kandilli, AFAD ve USGS'ten ayrı ayrı gelir
+- Zaman + mesafe toleransı içindeki kayıtlar tek bir tekil olayda
+  (canonical_events) birleştirilir, her kaynak kaydı event_origins ile bağlanır
+- Eşleştirme çekirdeği database/association.py'de (ingest de oradan çağırır);
+  bu modül son X günü kendi session'ı ile çalıştırır (scheduler / CLI)
+
+Kullanım:
+    python analyzers/event_association.py --days 92            # bağlanmamış kayıtlar
+    python analyzers/event_association.py --days 92 --rebuild  # pencereyi baştan kur
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+from datetime import datetime, timedelta
+
+from database.association import EventAssociator
+from database.models import SessionLocal
+from database.rollups import CANONICAL_SOURCE, hour_bucket, refresh_rollups
+from database.versions import EARTHQUAKES, bump
+
+
+def associate_recent(days=92, rebuild=False):
+    """Son X günü kendi session'ı ile eşleştir (scheduler / CLI)"""
+    since = datetime.utcnow() - timedelta(days=days)
+
+    db = SessionLocal()
+    try:
+        associator = EventAssociator(db)
+        result = associator.rebuild(since) if rebuild else associator.associate(since)
+        refresh_rollups(db, {(hour_bucket(ts), CANONICAL_SOURCE) for ts in associator.touched})
+        if associator.touched:
+            bump(db, EARTHQUAKES)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"🔗 Olay eşleştirme: {result['linked']} kayıt bağlandı, {result['created']} tekil olay oluştu")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kaynaklar arası olay eşleştirme")
+    parser.add_argument('--days', type=int, default=92, help="Eşleştirilecek geçmiş gün sayısı")
+    parser.add_argument('--rebuild', action='store_true', help="Penceredeki tekil olayları baştan kur")
+    args = parser.parse_args()
+
+    associate_recent(days=args.days, rebuild=args.rebuild)
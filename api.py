@@ -1,16 +1,38 @@
 # -*- coding: utf-8 -*-
-from fastapi import FastAPI, Depends, Query
+from anyio import to_thread
+from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import func, tuple_
 from datetime import datetime, timedelta, timezone
-from database.models import Earthquake, Anomaly, SessionLocal
+from typing import Optional
+from api_cache import cache, cached, watcher
+from database.engine import pool_capacity
+from database.models import Earthquake, CanonicalEvent, Anomaly, ReadSessionLocal
+from database.recent_store import recent_earthquakes, recent_events
+from database.rollups import window_totals
+from database.spatial import distance_km, nearest_first, within_radius
+from database.versions import ANOMALIES, EARTHQUAKES
+import base64
 import os
 
 app = FastAPI(title="Deprem Takip Sistemi API")
 
+# Ingest görünür olunca bellekteki son olaylar deposu beklemeden güncellensin
+watcher.on_change(recent_events.expire)
+watcher.on_change(recent_earthquakes.expire)
+
+# Veritabanına giden uç noktalar senkron (def): FastAPI onları thread havuzunda
+# çalıştırır, yavaş bir sorgu event loop'u (diğer istemcileri) bekletmez.
+# Havuz API bağlantı havuzu kadar: fazlası thread değil bağlantı beklerdi
+API_THREADS = int(os.getenv('API_THREADS', '0')) or pool_capacity('api')
+
+@app.on_event("startup")
+async def configure_thread_pool():
+    to_thread.current_default_thread_limiter().total_tokens = API_THREADS
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -20,78 +42,168 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database dependency
+# Database dependency - istek başına okuma session'ı (DATABASE_REPLICA_URL varsa replica)
 def get_db():
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+# Açık uçlu (>=) zaman filtresi önceden açılmış gelecek partition'ları ve default
+# partition'ı da tarar; üst sınır (saat kayması payıyla) pruning'i son aylara indirir
+FUTURE_SLACK = timedelta(days=1)
+
+def get_time_window(hours):
+    """Son X saat için naive UTC [başlangıç, bitiş) aralığı"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now - timedelta(hours=hours), now + FUTURE_SLACK
+
 # Türkiye saati helper
 def get_turkey_time():
     """Türkiye saatini döndür (UTC+3)"""
     turkey_tz = timezone(timedelta(hours=3))
     return datetime.now(timezone.utc).astimezone(turkey_tz)
 
+# Liste uç noktaları ORM nesnesi yerine sadece bu kolonları tuple olarak çeker;
+# yanıt orjson ile doğrudan bayta yazılır (datetime -> ISO 8601, isoformat() ile aynı)
+EARTHQUAKE_FIELDS = ("id", "event_id", "timestamp", "latitude", "longitude", "magnitude", "depth", "location", "source")
+
+def earthquake_columns(model):
+    """EARTHQUAKE_FIELDS sırasıyla kolonlar (tekil olaylarda tercih edilen kaynağın kaydı)"""
+    if model is CanonicalEvent:
+        return (model.preferred_earthquake_id, model.preferred_event_id, model.timestamp, model.latitude,
+                model.longitude, model.magnitude, model.depth, model.location, model.preferred_source)
+    return (model.id, model.event_id, model.timestamp, model.latitude, model.longitude,
+            model.magnitude, model.depth, model.location, model.source)
+
+# Sayfalama: (timestamp, id) azalan sırada keyset - derin sayfalar da ilk sayfa
+# kadar ucuz (OFFSET yok), istek başına bellek en fazla MAX_PAGE_SIZE satır
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+def encode_cursor(timestamp, row_id):
+    """Sayfanın son kaydından sonraki sayfa imleci (opak, URL-güvenli)"""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """İmleç -> (timestamp, id); bozuk imleçte 400"""
+    if cursor is None:
+        return None
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz cursor")
+
 # Static files ve frontend
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
 @app.get("/", response_class=HTMLResponse)
-async def root():
+def root():
     """Ana sayfa - Harita"""
     with open("frontend/index.html", "r", encoding="utf-8") as f:
         return f.read()
 
 @app.get("/api/earthquakes")
-async def get_earthquakes(
+@cached(EARTHQUAKES)
+def get_earthquakes(
     hours: int = Query(default=48, description="Son X saatteki depremler"),
     min_magnitude: float = Query(default=2.5, description="Minimum büyüklük"),
     source: str = Query(default="all", description="Kaynak: all, Kandilli, USGS"),
+    dedupe: bool = Query(default=True, description="Kaynaklar arası aynı depremi tek göster (source=all)"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Sayfa boyutu"),
+    cursor: Optional[str] = Query(default=None, description="Önceki sayfanın next_cursor değeri"),
     db: Session = Depends(get_db)
 ):
-    """Deprem verilerini getir"""
+    """Deprem verilerini getir - yeniden eskiye, sayfalı (next_cursor null olana kadar)"""
     
-    # Zaman filtresi (UTC)
-    start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+    # Zaman filtresi (naive UTC - kolon timestamp without time zone; timezone'lu
+    # parametre kolonu cast ettirir, indeks ve partition pruning kullanılamaz)
+    start_time, end_time = get_time_window(hours)
+    before = decode_cursor(cursor)
     
-    # Query oluştur
-    query = db.query(Earthquake).filter(
-        Earthquake.timestamp >= start_time,
-        Earthquake.magnitude >= min_magnitude
+    # Pencere süreç içi depodaysa (varsayılan 7 gün) veritabanına gidilmez
+    store = recent_events if source == "all" and dedupe else recent_earthquakes
+    if store.covers(hours):
+        events = store.snapshot(db)
+        indices = events.filter(
+            start_time,
+            None if store is recent_events else end_time,
+            min_magnitude,
+            None if source == "all" else source,
+        )
+        records = events.records(events.page(indices, limit + 1, before))
+        page = records[:limit]
+        
+        return {
+            "count": len(page),
+            "earthquakes": [
+                {
+                    "id": r["earthquake_id"],
+                    "event_id": r["event_id"],
+                    "timestamp": r["timestamp"],
+                    "latitude": r["latitude"],
+                    "longitude": r["longitude"],
+                    "magnitude": r["magnitude"],
+                    "depth": r["depth"],
+                    "location": r["location"],
+                    "source": r["source"],
+                    **({"sources": r["sources"].split(',') if r["sources"] else []} if store is recent_events else {})
+                }
+                for r in page
+            ],
+            "next_cursor": encode_cursor(page[-1]["timestamp"], page[-1]["id"]) if len(records) > limit else None
+        }
+    
+    # Tüm kaynaklar: tekilleştirilmiş olaylar (tercih edilen kaynağın kaydı)
+    canonical = source == "all" and dedupe
+    model = CanonicalEvent if canonical else Earthquake
+    extra = [model.sources] if canonical else []
+    
+    # Query oluştur (imleç anahtarı: tablonun kendi id'si)
+    query = db.query(*earthquake_columns(model), model.id.label("cursor_id"), *extra).filter(
+        model.timestamp >= start_time,
+        model.magnitude >= min_magnitude
     )
+    if not canonical:
+        query = query.filter(Earthquake.timestamp < end_time)
     
     # Kaynak filtresi
     if source != "all":
         query = query.filter(Earthquake.source == source)
     
-    earthquakes = query.order_by(Earthquake.timestamp.desc()).all()
+    if before is not None:
+        query = query.filter(tuple_(model.timestamp, model.id) < tuple_(*before))
+    
+    rows = query.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    
+    earthquakes = []
+    for row in page:
+        record = dict(zip(EARTHQUAKE_FIELDS, row))
+        if canonical:
+            record["sources"] = row.sources.split(',') if row.sources else []
+        earthquakes.append(record)
     
     return {
         "count": len(earthquakes),
-        "earthquakes": [
-            {
-                "id": eq.id,
-                "event_id": eq.event_id,
-                "timestamp": eq.timestamp.isoformat(),
-                "latitude": eq.latitude,
-                "longitude": eq.longitude,
-                "magnitude": eq.magnitude,
-                "depth": eq.depth,
-                "location": eq.location,
-                "source": eq.source
-            }
-            for eq in earthquakes
-        ]
+        "earthquakes": earthquakes,
+        "next_cursor": encode_cursor(page[-1].timestamp, page[-1].cursor_id) if len(rows) > limit else None
     }
 
 @app.get("/api/anomalies")
-async def get_anomalies(db: Session = Depends(get_db)):
+@cached(ANOMALIES)
+def get_anomalies(db: Session = Depends(get_db)):
     """Aktif anomalileri getir - YENİ MODEL"""
     
     try:
         # Yeni model yapısını kullan
-        anomalies = db.query(Anomaly).filter(Anomaly.is_active == True).all()
+        anomalies = db.query(
+            Anomaly.id, Anomaly.latitude, Anomaly.longitude, Anomaly.radius_km, Anomaly.z_score,
+            Anomaly.earthquake_count, Anomaly.baseline_rate, Anomaly.current_rate, Anomaly.location,
+            Anomaly.detected_at, Anomaly.is_active
+        ).filter(Anomaly.is_active == True).all()
         
         return {
             "count": len(anomalies),
@@ -106,7 +218,7 @@ async def get_anomalies(db: Session = Depends(get_db)):
                     "baseline_rate": a.baseline_rate if a.baseline_rate else 0.0,
                     "current_rate": a.current_rate if a.current_rate else 0.0,
                     "location": a.location,
-                    "detected_at": a.detected_at.isoformat() if a.detected_at else get_turkey_time().isoformat(),
+                    "detected_at": a.detected_at or get_turkey_time(),
                     "is_active": a.is_active,
                     "alert_level": "red" if a.z_score > 5 else "orange" if a.z_score > 3 else "yellow",
                     "anomaly_type": "frequency",
@@ -124,41 +236,39 @@ async def get_anomalies(db: Session = Depends(get_db)):
         }
 
 @app.get("/api/stats")
-async def get_stats(db: Session = Depends(get_db)):
+@cached(EARTHQUAKES, ANOMALIES)
+def get_stats(db: Session = Depends(get_db)):
     """Genel istatistikler - Türkiye saati ile"""
     
     # UTC'de son 24 saat
     now_utc = datetime.now(timezone.utc)
-    last_24h_utc = now_utc - timedelta(hours=24)
+    last_24h_utc = (now_utc - timedelta(hours=24)).replace(tzinfo=None)
     
     # Türkiye saati
     now_turkey = get_turkey_time()
     
-    # Son 24 saatteki depremler (UTC karşılaştırması)
-    earthquakes_24h = db.query(Earthquake).filter(
-        Earthquake.timestamp >= last_24h_utc
-    ).all()
+    # Son 24 saat (kaynaklar arası tekil) - süreç içi depodan, yoksa saatlik özet tablosundan
+    if recent_events.covers(24):
+        events = recent_events.snapshot(db)
+        total_24h, max_magnitude = events.totals(events.located(events.since(last_24h_utc)))
+    else:
+        total_24h, max_magnitude = window_totals(db, last_24h_utc)
     
     # Aktif anomaliler - YENİ MODEL
     try:
-        active_anomalies = db.query(Anomaly).filter(Anomaly.is_active == True).count()
+        active_anomalies = db.query(func.count(Anomaly.id)).filter(Anomaly.is_active == True).scalar()
     except:
         active_anomalies = 0
     
-    # En büyük deprem
-    max_magnitude = 0.0
-    if earthquakes_24h:
-        max_magnitude = max(eq.magnitude for eq in earthquakes_24h)
-    
     return {
-        "total_24h": len(earthquakes_24h),
-        "max_magnitude_24h": max_magnitude,
+        "total_24h": total_24h,
+        "max_magnitude_24h": max_magnitude or 0.0,
         "active_anomalies": active_anomalies,
         "last_update": now_turkey.isoformat()  # ← Türkiye saati
     }
 
 @app.get("/api/earthquake/{earthquake_id}")
-async def get_earthquake_detail(earthquake_id: int, db: Session = Depends(get_db)):
+def get_earthquake_detail(earthquake_id: int, db: Session = Depends(get_db)):
     """Tek bir depremin detayları"""
     
     earthquake = db.query(Earthquake).filter(Earthquake.id == earthquake_id).first()
@@ -179,7 +289,7 @@ async def get_earthquake_detail(earthquake_id: int, db: Session = Depends(get_db
     }
 
 @app.get("/api/region-stats")
-async def get_region_stats(
+def get_region_stats(
     lat: float = Query(..., description="Enlem"),
     lon: float = Query(..., description="Boylam"),
     radius_km: float = Query(default=50, description="Yarıçap (km)"),
@@ -188,17 +298,44 @@ async def get_region_stats(
 ):
     """Belirli bir bölgenin istatistikleri"""
     
-    start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+    start_time, end_time = get_time_window(hours)
     
-    # Basit mesafe hesabı (yaklaşık)
-    lat_range = radius_km / 111  # 1 derece ~ 111km
-    lon_range = radius_km / (111 * 0.7)  # Türkiye için yaklaşık
+    if recent_earthquakes.covers(hours):
+        # Süreç içi depo: vektörel haversine
+        events = recent_earthquakes.snapshot(db)
+        indices = events.within_radius(events.located(events.since(start_time, end_time)), lat, lon, radius_km)
+        count, max_magnitude = events.totals(indices)
+        magnitudes = events.columns['magnitude'][indices]
+        
+        if not count:
+            return {
+                "count": 0,
+                "max_magnitude": 0,
+                "avg_magnitude": 0,
+                "earthquakes": []
+            }
+        
+        return {
+            "count": count,
+            "max_magnitude": max_magnitude,
+            "avg_magnitude": float(magnitudes.sum() / count),
+            "earthquakes": [
+                {
+                    "timestamp": r["timestamp"].isoformat(),
+                    "magnitude": r["magnitude"],
+                    "depth": r["depth"],
+                    "location": r["location"]
+                }
+                for r in events.records(indices[-20:])  # Son 20 deprem
+            ]
+        }
     
+    # Gerçek daire: PostGIS ST_DWithin (geog GiST indeksi), SQLite'ta haversine
     earthquakes = db.query(Earthquake).filter(
         Earthquake.timestamp >= start_time,
-        Earthquake.latitude.between(lat - lat_range, lat + lat_range),
-        Earthquake.longitude.between(lon - lon_range, lon + lon_range)
-    ).all()
+        Earthquake.timestamp < end_time,
+        within_radius(db, Earthquake, lat, lon, radius_km)
+    ).order_by(Earthquake.timestamp).all()
     
     if not earthquakes:
         return {
@@ -223,12 +360,48 @@ async def get_region_stats(
         ]
     }
 
+@app.get("/api/nearest")
+def get_nearest(
+    lat: float = Query(..., description="Enlem"),
+    lon: float = Query(..., description="Boylam"),
+    limit: int = Query(default=10, ge=1, le=100, description="Deprem sayısı"),
+    hours: int = Query(default=168, description="Son X saat"),
+    dedupe: bool = Query(default=True, description="Kaynaklar arası aynı depremi tek göster"),
+    db: Session = Depends(get_db)
+):
+    """Bir noktaya en yakın depremler (PostGIS KNN sıralaması)"""
+    
+    start_time, end_time = get_time_window(hours)
+    model = CanonicalEvent if dedupe else Earthquake
+    
+    query = db.query(*earthquake_columns(model), distance_km(db, model, lat, lon).label("distance_km")).filter(
+        model.timestamp >= start_time,
+        model.latitude.isnot(None),
+        model.longitude.isnot(None)
+    )
+    if model is Earthquake:
+        query = query.filter(Earthquake.timestamp < end_time)
+    
+    rows = query.order_by(nearest_first(db, model, lat, lon)).limit(limit).all()
+    
+    earthquakes = []
+    for row in rows:
+        record = dict(zip(EARTHQUAKE_FIELDS, row))
+        record["distance_km"] = round(row.distance_km, 2)
+        earthquakes.append(record)
+    
+    return ORJSONResponse({
+        "count": len(earthquakes),
+        "earthquakes": earthquakes
+    })
+
 @app.get("/health")
 async def health_check():
     """Sistem sağlık kontrolü"""
     return {
         "status": "healthy",
-        "timestamp": get_turkey_time().isoformat()
+        "timestamp": get_turkey_time().isoformat(),
+        "cache": cache.stats()
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+API yanıt önbelleği
+- Okuma uç noktalarının JSON yanıtı bayt olarak tutulur; anahtar: uç nokta +
+  normalize edilmiş parametreler (varsayılanlar dahil, FastAPI doğrulamasından
+  sonra) + yanıtın bağlı olduğu veri sürümleri
+- Veri sadece ingest ve anomali tespitinde değişir; yazan işlem sürümü aynı
+  transaction'da artırır (database/versions.py). Sürümler arka plandaki
+  izleyici tarafından VERSION_POLL_S'de bir tek küçük sorguyla okunur;
+  iki ingest arasındaki tekrar istekler veritabanına gitmez
+- Kayan pencereler (son 24/48 saat) ve last_update için girişler CACHE_TTL_S
+  sonra yeniden hesaplanır
+- Boyut sınırı bayt cinsinden (CACHE_MAX_BYTES), en az yakın zamanda
+  kullanılan (LRU) giriş çıkarılır
+- Sürüm okunamazsa (tablo yok, veritabanı erişilemiyor) önbellek devre dışı
+- Süreç başına: her uvicorn worker'ı kendi önbelleğini tutar
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.responses import ORJSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from database.models import ReadSessionLocal
+from database.versions import read_versions
+
+CACHE_MAX_BYTES = int(os.getenv('API_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+CACHE_TTL_S = float(os.getenv('API_CACHE_TTL_S', '60'))
+VERSION_POLL_S = float(os.getenv('DATA_VERSION_POLL_S', '2'))
+
+
+class ResponseCache:
+    """Bayt sınırlı LRU: anahtar -> (gövde, oluşturulma zamanı)"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl_s=CACHE_TTL_S):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl_s:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (body, time.monotonic())
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self._size, 'hits': self.hits, 'misses': self.misses}
+
+
+class DataVersionWatcher:
+    """data_versions'ı arka planda okur; değişince dinleyicileri çağırır"""
+
+    def __init__(self, poll_s=VERSION_POLL_S):
+        self.poll_s = poll_s
+        self._versions = None
+        self._failed = False
+        self._listeners = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def on_change(self, callback):
+        self._listeners.append(callback)
+
+    def current(self):
+        """Son okunan sürümler ({isim: sürüm}, okunamadıysa None); ilk çağrıda izleyici başlar"""
+        if self._thread is None:
+            self.start()
+        return self._versions
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.poll()  # İlk istek hazır sürümle cevaplanır
+            self._thread = threading.Thread(target=self._run, name='data-version-watcher', daemon=True)
+            self._thread.start()
+
+    def poll(self):
+        try:
+            db = ReadSessionLocal()
+            try:
+                versions = read_versions(db)
+            finally:
+                db.close()
+        except Exception as e:
+            if not self._failed:
+                print(f"⚠️  Veri sürümü okunamadı, yanıt önbelleği devre dışı: {e}")
+            self._failed = True
+            self._versions = None
+            return
+
+        self._failed = False
+        if versions != self._versions:
+            # Önce dinleyiciler (eski veriyi tutan katmanlar), sonra yeni sürüm görünür
+            for callback in self._listeners:
+                callback()
+            self._versions = versions
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_s)
+            self.poll()
+
+
+cache = ResponseCache()
+watcher = DataVersionWatcher()
+watcher.on_change(cache.clear)
+
+
+def cached(*names):
+    """
+    Uç noktayı önbelleğe al; names: yanıtın bağlı olduğu veri sürümleri
+    Uç nokta orjson'un kodlayabildiği bir değer döndürmeli (dict/list, str,
+    sayı, datetime, numpy); jsonable_encoder'dan geçmeden doğrudan bayta yazılır.
+    İsabetler event loop'ta cevaplanır; senkron uç nokta sadece ıskalamada
+    thread havuzunda çalışır
+    """
+    def decorator(endpoint):
+        def render(result):
+            return ORJSONResponse(result)
+
+        if inspect.iscoroutinefunction(endpoint):
+            async def call(**kwargs):
+                return render(await endpoint(**kwargs))
+        else:
+            # Sorgu ve JSON kodlaması (büyük yanıtlarda asıl maliyet) aynı thread'de
+            async def call(**kwargs):
+                return await run_in_threadpool(lambda: render(endpoint(**kwargs)))
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            # İlk çağrı sürümleri veritabanından okur: event loop dışında
+            versions = watcher.current() if watcher.started else await run_in_threadpool(watcher.current)
+            if versions is None:
+                return await call(**kwargs)
+
+            params = tuple(sorted((name, value) for name, value in kwargs.items() if name != 'db'))
+            key = (endpoint.__name__, params, tuple(versions.get(name, 0) for name in names))
+
+            body = cache.get(key)
+            if body is not None:
+                return Response(content=body, media_type='application/json')
+
+            response = await call(**kwargs)
+            cache.put(key, response.body)
+            return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""
+Collector benchmark'ı (yerel HTTP sunucusu ile, ağsız)
+- KOERI / USGS / AFAD yanıtları yerel bir HTTP sunucusundan servis edilir:
+  sentetik (1 gün - 1 yıl) veya ham arşivden (data/raw) kaydedilmiş
+- Her collector fetch / parse / yazma aşamalarına ayrılarak ölçülür:
+  süre, satır/s ve aşama başına tepe bellek (tracemalloc)
+- Yazma, atılabilir (throwaway) bir PostgreSQL veya gömülü SQLite
+  veritabanına yapılır; tablolar her ölçümden önce boşaltılır
+
+Kullanım:
+    BENCH_DATABASE_URL=postgresql://localhost/deprem_bench python benchmarks/bench_collectors.py
+    python benchmarks/bench_collectors.py --database-url ... --sizes day,week --save bench.json
+    python benchmarks/bench_collectors.py --database-url ... --baseline bench.json   # regresyon kontrolü
+    python benchmarks/bench_collectors.py --database-url ... --recorded data/raw
+    python benchmarks/bench_collectors.py --database-url sqlite:///data/bench.db --sizes day,week
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import argparse
+import json
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+from bench_kandilli_parser import synthetic_events, synthetic_live
+
+SIZES = {'day': 1, 'week': 7, 'month': 30, 'year': 365}
+
+# Her ölçümden önce boşaltılan tablolar
+BENCH_TABLES = (
+    'earthquakes', 'canonical_events', 'event_origins',
+    'earthquake_rollups_hourly', 'earthquake_rollups_daily',
+)
+
+# Türkiye için yaklaşık günlük olay sayıları
+DAILY_RATES = {'kandilli': 80, 'kandilli_archive': 80, 'usgs': 10, 'afad': 80}
+
+COLLECTORS = ('kandilli', 'kandilli_archive', 'usgs', 'afad')
+PHASES = ('fetch', 'parse', 'write')
+
+ARCHIVE_PATH = re.compile(r'^/scripts/lst(\d{2})(\d{2})\.asp$')
+
+
+# --- Sentetik yanıtlar -------------------------------------------------------------
+
+def synthetic_usgs(count):
+    features = []
+    for i, eq in enumerate(synthetic_events(count, seed=7)):
+        millis = int(eq['timestamp'].timestamp() * 1000)
+        features.append({
+            'type': 'Feature',
+            'id': f"us{i:08d}",
+            'properties': {
+                'mag': eq['ml'], 'place': eq['location'], 'time': millis, 'updated': millis + 60000,
+                'type': 'earthquake', 'magType': 'mb', 'status': 'reviewed',
+            },
+            'geometry': {'type': 'Point', 'coordinates': [eq['longitude'], eq['latitude'], eq['depth']]},
+        })
+    return json.dumps({'type': 'FeatureCollection', 'metadata': {'count': count}, 'features': features}).encode()
+
+
+def synthetic_afad(count):
+    items = [
+        {
+            'eventID': str(600000 + i),
+            'date': eq['timestamp'].strftime('%Y-%m-%dT%H:%M:%S'),
+            'latitude': f"{eq['latitude']:.4f}",
+            'longitude': f"{eq['longitude']:.4f}",
+            'depth': f"{eq['depth']:.2f}",
+            'magnitude': f"{eq['ml']:.1f}",
+            'type': 'ML',
+            'location': eq['location'],
+        }
+        for i, eq in enumerate(synthetic_events(count, seed=11))
+    ]
+    return json.dumps(items, ensure_ascii=False).encode('utf-8')
+
+
+def synthetic_payloads(days, scale=1.0):
+    """Boyut için kaynak başına yanıtlar ve arşiv ayları"""
+    counts = {name: max(1, int(rate * days * scale)) for name, rate in DAILY_RATES.items()}
+    months = max(1, round(days / 30))
+
+    return {
+        'kandilli': synthetic_live(counts['kandilli']).encode('ISO-8859-9'),
+        'kandilli_archive': synthetic_live(max(1, counts['kandilli_archive'] // months)).encode('ISO-8859-9'),
+        'usgs': synthetic_usgs(counts['usgs']),
+        'afad': synthetic_afad(counts['afad']),
+    }, months
+
+
+def recorded_payloads(root):
+    """Ham arşivdeki (manifest.jsonl) kaynak başına en son yanıt"""
+    from collectors import raw_archive
+
+    latest = {}
+    for entry in raw_archive.iter_manifest(root=root):
+        latest[entry['source']] = entry
+
+    payloads = {source: raw_archive.load(entry['sha256'], root) for source, entry in latest.items()}
+    return payloads, 1
+
+
+# --- Yerel HTTP sunucusu -------------------------------------------------------------
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """KOERI / USGS FDSN / AFAD uç noktalarını taklit eder"""
+
+    ROUTES = {
+        '/scripts/lst0.asp': ('kandilli', 'text/html; charset=iso-8859-9'),
+        '/fdsnws/event/1/query': ('usgs', 'application/json'),
+        '/apiv2/event/filter': ('afad', 'application/json'),
+    }
+
+    def _send(self, source, content_type):
+        payload = self.server.payloads.get(source)
+        if payload is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if ARCHIVE_PATH.match(path):
+            self._send('kandilli_archive', 'text/html; charset=iso-8859-9')
+        elif path in self.ROUTES:
+            self._send(*self.ROUTES[path])
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.httpd.payloads = {}
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def root(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# --- Ölçüm ---------------------------------------------------------------------------
+
+class PhaseTimer:
+    """Aşama süreleri ve (istenirse) aşama başına tepe bellek"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {}
+        self.peak_bytes = {}
+
+    @contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        yield
+        self.seconds[name] = time.perf_counter() - started
+        if self.trace_memory:
+            self.peak_bytes[name] = tracemalloc.get_traced_memory()[1]
+
+
+class CollectorBench:
+    """Collector'ları yerel sunucuya yönlendirip aşama aşama çalıştır"""
+
+    def __init__(self, server_root, months):
+        from collectors.http_client import create_session
+
+        self.server_root = server_root
+        self.months = months
+        self.session = create_session(retries=0)
+
+    def run(self, name, timer):
+        return getattr(self, f"_run_{name}")(timer)
+
+    def _run_kandilli(self, timer):
+        from collectors.kandilli_collector import KandilliCollector
+        from database.ingest import upsert_earthquakes
+
+        collector = KandilliCollector(session=self.session)
+        collector.base_url = f"{self.server_root}/scripts/lst0.asp"
+
+        with timer.phase('fetch'):
+            raw = collector.fetch_raw()
+        with timer.phase('parse'):
+            events = [collector.to_event(eq) for eq in collector.parse_lines(collector.data_lines(raw))]
+        with timer.phase('write'):
+            upsert_earthquakes(events)
+        return len(events)
+
+    def _run_kandilli_archive(self, timer):
+        from collectors.archive_backfill import month_range
+        from collectors.kandilli_archive import KandilliArchiveScraper
+        from database.ingest import upsert_earthquakes
+
+        scraper = KandilliArchiveScraper(session=self.session)
+        scraper.archive_root = f"{self.server_root}/scripts"
+
+        end_year, end_month = 2020 + (self.months - 1) // 12, (self.months - 1) % 12 + 1
+        months = list(month_range(2020, 1, end_year, end_month))
+
+        with timer.phase('fetch'):
+            pages = [(year, month, scraper.download_month(year, month)) for year, month in months]
+        with timer.phase('parse'):
+            events = [
+                scraper.to_event(eq, year, month)
+                for year, month, text in pages
+                for eq in scraper.parse_archive_text(text)
+            ]
+        with timer.phase('write'):
+            upsert_earthquakes(events)
+        return len(events)
+
+    def _run_usgs(self, timer):
+        from datetime import datetime, timedelta, timezone
+        from collectors.usgs_collector import USGSCollector
+        from database.ingest import upsert_earthquakes
+
+        collector = USGSCollector(session=self.session)
+        collector.base_url = f"{self.server_root}/fdsnws/event/1/query"
+        end_time = datetime.now(timezone.utc)
+
+        with timer.phase('fetch'):
+            features = collector.fetch_features(end_time - timedelta(days=7), end_time, 2.5)
+        with timer.phase('parse'):
+            events, _ = collector.parse_features(features)
+        with timer.phase('write'):
+            upsert_earthquakes(events)
+        return len(events)
+
+    def _run_afad(self, timer):
+        from collectors.afad_collector import AFADCollector
+        from database.ingest import upsert_earthquakes
+
+        collector = AFADCollector(session=self.session)
+        collector.base_url = f"{self.server_root}/apiv2/event/filter"
+
+        with timer.phase('fetch'):
+            items = collector.fetch_recent_earthquakes()
+        with timer.phase('parse'):
+            events = [event for event in map(collector.to_event, items) if event]
+        with timer.phase('write'):
+            upsert_earthquakes(events)
+        return len(events)
+
+
+def reset_tables():
+    """Her ölçüm boş tablolarla başlasın (yazma aşaması hep INSERT yolunu ölçer)"""
+    from sqlalchemy import text
+    from database.models import get_engine
+    engine = get_engine()
+
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            for table in BENCH_TABLES:
+                conn.execute(text(f"DELETE FROM {table}"))
+        else:
+            conn.execute(text(f"TRUNCATE {', '.join(BENCH_TABLES)} RESTART IDENTITY"))
+
+
+@contextmanager
+def quiet():
+    """Collector'ların print çıktısını ölçüm sırasında bastır"""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def measure(bench, name, repeat):
+    """En iyi süre (repeat kez) + ayrı bir tracemalloc turunda tepe bellek"""
+    best = None
+    for _ in range(repeat):
+        reset_tables()
+        timer = PhaseTimer()
+        with quiet():
+            rows = bench.run(name, timer)
+        if best is None or sum(timer.seconds.values()) < sum(best.seconds.values()):
+            best = timer
+
+    reset_tables()
+    memory = PhaseTimer(trace_memory=True)
+    tracemalloc.start()
+    try:
+        with quiet():
+            bench.run(name, memory)
+    finally:
+        tracemalloc.stop()
+
+    total = sum(best.seconds.values())
+    return {
+        'rows': rows,
+        'seconds': {phase: round(best.seconds.get(phase, 0.0), 6) for phase in PHASES},
+        'rows_per_second': round(rows / total, 1) if total else 0.0,
+        'peak_mib': {phase: round(memory.peak_bytes.get(phase, 0) / 2**20, 2) for phase in PHASES},
+    }
+
+
+def print_row(key, result):
+    seconds, peak = result['seconds'], result['peak_mib']
+    print(f"{key:<28} {result['rows']:>8,} "
+          f"{seconds['fetch'] * 1000:>9.1f} {seconds['parse'] * 1000:>9.1f} {seconds['write'] * 1000:>9.1f} "
+          f"{result['rows_per_second']:>10,.0f} {max(peak.values()):>9.1f}")
+
+
+def check_regressions(results, baseline_path, tolerance):
+    """Baseline'a göre satır/s düşüşü toleransı aşan ölçümleri döndür"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous or not previous['rows_per_second']:
+            continue
+        ratio = result['rows_per_second'] / previous['rows_per_second']
+        if ratio < 1 - tolerance:
+            regressions.append((key, previous['rows_per_second'], result['rows_per_second']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collector benchmark (yerel HTTP sunucusu)")
+    parser.add_argument('--database-url', default=os.getenv('BENCH_DATABASE_URL'),
+                        help="Atılabilir PostgreSQL/SQLite veritabanı (varsayılan: BENCH_DATABASE_URL)")
+    parser.add_argument('--collectors', default=','.join(COLLECTORS), help="Virgülle ayrılmış collector listesi")
+    parser.add_argument('--sizes', default='day,week,month,year', help=f"Boyutlar: {', '.join(SIZES)}")
+    parser.add_argument('--scale', type=float, default=1.0, help="Günlük olay sayısı çarpanı")
+    parser.add_argument('--recorded', help="Sentetik yerine ham arşiv dizininden kayıtlı yanıtlar")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help="Sonuçları JSON olarak kaydet")
+    parser.add_argument('--baseline', help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="İzin verilen satır/s düşüşü (0.2 = %%20)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not args.database_url:
+        print("❌ --database-url veya BENCH_DATABASE_URL gerekli (atılabilir bir veritabanı)")
+        sys.exit(2)
+    if args.database_url == os.getenv('DATABASE_URL'):
+        print("❌ Benchmark asıl DATABASE_URL üzerinde çalıştırılamaz (tablolar boşaltılır)")
+        sys.exit(2)
+
+    # Engine ilk kullanımda oluşturulur: atılabilir veritabanına bağlanır
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['RAW_ARCHIVE'] = '0'
+
+    # init_db: partitioned earthquakes için partition'lar da açılır
+    from database.models import init_db
+    init_db()
+
+    collectors = [name for name in args.collectors.split(',') if name]
+    if args.recorded:
+        scenarios = [('recorded', recorded_payloads(args.recorded))]
+    else:
+        scenarios = [(size, synthetic_payloads(SIZES[size], args.scale)) for size in args.sizes.split(',')]
+
+    print("="*60)
+    print("⚡ COLLECTOR BENCHMARK (yerel HTTP sunucusu)")
+    print("="*60)
+    print(f"{'collector / boyut':<28} {'satır':>8} {'fetch ms':>9} {'parse ms':>9} {'write ms':>9} "
+          f"{'satır/s':>10} {'tepe MiB':>9}")
+
+    results = {}
+    with StandInServer() as server:
+        for size, (payloads, months) in scenarios:
+            server.httpd.payloads = payloads
+            bench = CollectorBench(server.root, months)
+
+            for name in collectors:
+                if name not in payloads:
+                    continue
+                key = f"{name}/{size}"
+                results[key] = measure(bench, name, args.repeat)
+                print_row(key, results[key])
+
+    reset_tables()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Sonuçlar kaydedildi: {args.save}")
+
+    if args.baseline:
+        regressions = check_regressions(results, args.baseline, args.tolerance)
+        print("\n" + "="*60)
+        if regressions:
+            print("❌ Performans gerilemesi:")
+            for key, previous, current in regressions:
+                print(f"   {key}: {previous:,.0f} → {current:,.0f} satır/s")
+            sys.exit(1)
+        print("✅ Baseline'a göre gerileme yok")
+        print("="*60)
+
+
+if __name__ == "__main__":
+    main()
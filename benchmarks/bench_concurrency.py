@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Eşzamanlılık benchmark'ı - yavaş veritabanı istekleri event loop'u bekletiyor mu
+- uvicorn api:app tek worker ile başlatılır; yanıt önbelleği ve son olaylar
+  deposu kapatılır (her istek veritabanına gider)
+- N istemci thread'i (1, 2, 4, ...) kapalı döngüde veritabanı uç noktasını
+  çağırırken bir yoklayıcı /health'e ~20ms'de bir istek atar
+- Her N için uç nokta ve /health p50/p99 gecikmesi raporlanır. Veritabanı
+  işi event loop'ta çalışırsa /health her yavaş isteği bekler (p99 N ile
+  büyür); thread havuzunda çalışırsa sadece CPU/GIL payı kalır
+- Ölçüt mutlak /health p99: herhangi bir N'de N=1 taban çizgisinin
+  --max-slowdown katını (en az --slack-ms fazlasını) aşarsa çıkış kodu 1
+- Uç nokta p99'u API thread havuzu kapasitesinin (API_THREADS / api
+  pool_capacity) altı ve üstü için ayrı özetlenir: kapasite üstünde
+  istekler havuzda kuyruğa girer, gecikme artışı beklenir
+
+Kullanım:
+    python benchmarks/bench_concurrency.py
+    python benchmarks/bench_concurrency.py --database-url postgresql://... --levels 1,8,32
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_concurrency.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+from bench_startup import ROOT, _env, _free_port
+
+DEFAULT_LEVELS = '1,2,4,8,16,32'
+DEFAULT_PATH = '/api/earthquakes?hours=720&min_magnitude=5.5&dedupe=false'
+DEFAULT_MAX_SLOWDOWN = 3.0
+DEFAULT_SLACK_MS = 50.0
+PROBE_INTERVAL_S = 0.02
+REQUEST_TIMEOUT_S = 60
+LOCATIONS = ('PAZARCIK (KAHRAMANMARAS)', 'SINDIRGI (BALIKESIR)', 'MARMARA DENIZI', 'EGE DENIZI', 'ELBISTAN (KAHRAMANMARAS)')
+
+
+def seed(database_url, count, start=0):
+    """Son 30 güne yayılmış sentetik olaylar BENCH<start>..BENCH<count-1> (eşleştirme yok)"""
+    os.environ['DATABASE_URL'] = database_url
+    from database.ingest import upsert_earthquakes
+    from database.models import init_db
+
+    init_db()
+    rng = random.Random(42 + start)
+    now = datetime.utcnow()
+    events = [
+        {
+            'event_id': f"BENCH{i}",
+            'timestamp': now - timedelta(seconds=rng.randint(0, 30 * 86400)),
+            'latitude': round(rng.uniform(36, 42), 4),
+            'longitude': round(rng.uniform(26, 45), 4),
+            'magnitude': round(rng.uniform(1, 6), 1),
+            'depth': round(rng.uniform(1, 30), 1),
+            'location': rng.choice(LOCATIONS),
+            'source': 'Kandilli',
+        }
+        for i in range(start, count)
+    ]
+    return upsert_earthquakes(events, associate=False)['inserted']
+
+
+def start_server(database_url, threads, timeout=30):
+    env = _env(database_url)
+    env['API_CACHE_TTL_S'] = '0'
+    env['RECENT_STORE_HOURS'] = '0'
+    if threads:
+        env['API_THREADS'] = str(threads)
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn kapandı:\n{server.stderr.read().decode()[-2000:]}")
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=2):
+                return server, base_url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError(f"{timeout}s içinde /health yanıt vermedi")
+
+
+def _get(url):
+    """İstek süresi (ms); zaman aşımı REQUEST_TIMEOUT_S olarak sayılır"""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT_S) as response:
+            response.read()
+    except TimeoutError:
+        return REQUEST_TIMEOUT_S * 1000
+    return (time.perf_counter() - started) * 1000
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run_level(base_url, path, clients, duration):
+    """clients istemci + /health yoklayıcısı duration saniye; dönüş: (uç nokta ms listesi, /health ms listesi)"""
+    stop = threading.Event()
+    endpoint_ms, probe_ms = [], []
+    lock = threading.Lock()
+
+    def client():
+        while not stop.is_set():
+            elapsed = _get(base_url + path)
+            with lock:
+                endpoint_ms.append(elapsed)
+
+    def probe():
+        while not stop.is_set():
+            probe_ms.append(_get(base_url + '/health'))
+            time.sleep(PROBE_INTERVAL_S)
+
+    workers = [threading.Thread(target=client) for _ in range(clients)] + [threading.Thread(target=probe)]
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return endpoint_ms, probe_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API eşzamanlılık benchmark'ı (event loop bloklanması)")
+    parser.add_argument('--database-url', default=os.getenv('BENCH_DATABASE_URL'),
+                        help="Varsayılan: geçici SQLite (verilirse tohumlanmaz)")
+    parser.add_argument('--events', type=int, default=20000, help="Geçici veritabanına yazılacak olay sayısı")
+    parser.add_argument('--path', default=DEFAULT_PATH, help="Yük altındaki uç nokta")
+    parser.add_argument('--levels', default=DEFAULT_LEVELS, help="Eşzamanlı istemci sayıları")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seviye başına süre (s)")
+    parser.add_argument('--threads', type=int, default=0, help="API_THREADS (varsayılan: api bağlantı havuzu)")
+    parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help="İzin verilen /health p99 / N=1 /health p99 katı")
+    parser.add_argument('--slack-ms', type=float, default=DEFAULT_SLACK_MS,
+                        help="Sınır en az N=1 /health p99 + bu kadar ms (gürültü payı)")
+    args = parser.parse_args()
+
+    # N=1 taban çizgisi her zaman ölçülür
+    levels = sorted({1, *(int(level) for level in args.levels.split(','))})
+    workdir = None
+    database_url = args.database_url
+
+    print("\n" + "="*60)
+    print(f"🔀 EŞZAMANLILIK BENCHMARK'I ({args.path})")
+    print("="*60)
+
+    if database_url is None:
+        workdir = tempfile.mkdtemp(prefix='deprem_concurrency_')
+        database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        print(f"📥 Geçici SQLite: {seed(database_url, args.events):,} olay")
+
+    # Sunucunun thread havuzu ile aynı hesap (api.API_THREADS)
+    os.environ['DATABASE_URL'] = database_url
+    from database.engine import pool_capacity
+    capacity = args.threads or pool_capacity('api')
+
+    server = None
+    results = {}  # N -> (uç nokta p99, /health p99)
+    try:
+        server, base_url = start_server(database_url, args.threads)
+        _get(base_url + args.path)  # Isınma: bağlantı havuzu, sorgu önbelleği
+
+        print(f"\n{'N':>4} {'istek':>7} {'uç p50':>9} {'uç p99':>9} {'health p50':>11} {'health p99':>11}")
+        for clients in levels:
+            endpoint_ms, probe_ms = run_level(base_url, args.path, clients, args.duration)
+            results[clients] = (percentile(endpoint_ms, 99), percentile(probe_ms, 99))
+            print(
+                f"{clients:>4} {len(endpoint_ms):>7} {percentile(endpoint_ms, 50):>7.1f}ms "
+                f"{results[clients][0]:>7.1f}ms {percentile(probe_ms, 50):>9.1f}ms {results[clients][1]:>9.1f}ms"
+            )
+    finally:
+        if server is not None:
+            # Bloklanmış event loop SIGTERM'de kapanmayı bekletebilir
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print("="*60)
+    for label, group in (('≤', [n for n in levels if n <= capacity]), ('>', [n for n in levels if n > capacity])):
+        if group:
+            worst = max(group, key=lambda n: results[n][0])
+            print(f"📈 N {label} {capacity} (thread havuzu): en kötü uç nokta p99 {results[worst][0]:.1f}ms (N={worst})")
+
+    baseline = results[1][1]
+    limit = max(baseline * args.max_slowdown, baseline + args.slack_ms)
+    worst = max(levels, key=lambda n: results[n][1])
+    failed = results[worst][1] > limit
+    print(f"📐 /health p99: N=1 {baseline:.1f}ms, en kötü {results[worst][1]:.1f}ms (N={worst}), sınır {limit:.1f}ms")
+    if failed:
+        print("❌ /health yük altında yavaşlıyor: event loop bloklanıyor ya da CPU/GIL doygun")
+        if (os.cpu_count() or 1) < 2:
+            print("   ⚠️  Tek CPU: istemci thread'leri ve sunucu aynı çekirdeği paylaşıyor")
+    else:
+        print("✅ Yavaş veritabanı istekleri event loop'u bloklamıyor")
+    print("="*60 + "\n")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
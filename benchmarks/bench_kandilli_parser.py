@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Kandilli parser mikro-benchmark'ı
+Eski satır satır float()/strptime yolu ile vektörel parser'ı aynı içerik
+üzerinde karşılaştırır ve sonuçların aynı olduğunu doğrular.
+
+Kullanım:
+    python benchmarks/bench_kandilli_parser.py                 # sentetik dosya
+    python benchmarks/bench_kandilli_parser.py data/2020.txt   # gerçek arşiv dosyası
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from collectors.kandilli_parser import KANDILLI_TIMEZONE, LIVE, TXT, parse, to_records
+
+
+# --- Eski yol (karşılaştırma için birebir kopya) -------------------------------
+
+def legacy_parse_txt_line(line):
+    """
+    Eski import_kandilli_txt.parse_kandilli_line
+    'No' alt dizesi içeren her satır atlanır (başlık için konmuş, yer adında
+    'No' geçen veri satırlarını da atar); vektörel parser bunları okur
+    """
+    line = line.strip()
+    if not line or 'Deprem Kodu' in line or 'No' in line or line.startswith('---'):
+        return None
+    parts = line.split('\t')
+    if len(parts) < 15:
+        return None
+    try:
+        date = parts[2].strip()
+        time_str = parts[3].strip()
+        if '.' in time_str:
+            time_str = time_str.split('.')[0]
+        latitude = float(parts[4].strip())
+        longitude = float(parts[5].strip())
+        depth = float(parts[6].strip())
+        mags = []
+        for mag_val in [parts[10], parts[11], parts[12], parts[9], parts[8], parts[7]]:
+            mag_val = mag_val.strip()
+            if mag_val and mag_val not in ['0.0', '0', '', '0.00']:
+                try:
+                    mag_float = float(mag_val)
+                    if mag_float > 0:
+                        mags.append(mag_float)
+                except ValueError:
+                    pass
+        if not mags:
+            return None
+        timestamp = datetime.strptime(f"{date} {time_str}", "%Y.%m.%d %H:%M:%S")
+        return {'timestamp': timestamp, 'latitude': latitude, 'longitude': longitude,
+                'depth': depth, 'magnitude': max(mags), 'location': parts[14].strip()}
+    except (ValueError, IndexError):
+        return None
+
+
+def legacy_txt_divergent(line):
+    """Eski yolun sadece 'No' koşulu yüzünden attığı veri satırı mı"""
+    return 'No' in line and 'Deprem Kodu' not in line
+
+
+def legacy_parse_live_line(line):
+    """Eski KandilliCollector / KandilliArchiveScraper satır parse'ı"""
+    line = line.strip()
+    if not line or line.startswith('-'):
+        return None
+    parts = line.split()
+    if len(parts) < 8:
+        return None
+    try:
+        mags = [float(value) for value in (parts[7], parts[6], parts[5]) if value != '-.-']
+        if not mags:
+            return None
+        timestamp = datetime.strptime(f"{parts[0]} {parts[1]}", "%Y.%m.%d %H:%M:%S")
+        return {'timestamp': timestamp, 'latitude': float(parts[2]), 'longitude': float(parts[3]),
+                'depth': float(parts[4]), 'magnitude': max(mags), 'location': ' '.join(parts[8:])}
+    except (ValueError, IndexError):
+        return None
+
+
+# --- Sentetik veri ---------------------------------------------------------------
+
+LOCATIONS = ['SINDIRGI (BALIKESIR)', 'AKHISAR (MANISA)', 'EGE DENIZI', 'GOKSUN (KAHRAMANMARAS)', 'SIVRICE (ELAZIG)']
+
+
+def synthetic_events(count, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        yield {
+            'timestamp': start + timedelta(seconds=i * 700 + rng.randint(0, 600)),
+            'latitude': round(rng.uniform(36, 42), 4),
+            'longitude': round(rng.uniform(26, 45), 4),
+            'depth': round(rng.uniform(1, 30), 1),
+            'md': round(rng.uniform(1, 4), 1) if rng.random() < 0.5 else None,
+            'ml': round(rng.uniform(1, 5), 1),
+            'mw': round(rng.uniform(3, 6), 1) if rng.random() < 0.1 else None,
+            'location': rng.choice(LOCATIONS),
+        }
+
+
+def synthetic_txt(count):
+    lines = ['No\tDeprem Kodu\tOlus tarihi\tOlus zamani\tEnlem\tBoylam\tDerinlik\txM\tMD\tML\tMw\tMs\tMb\tTip\tYer']
+    for i, eq in enumerate(synthetic_events(count), 1):
+        fmt = lambda value: f"{value:.1f}" if value else '0.0'
+        lines.append('\t'.join([
+            str(i), eq['timestamp'].strftime('%Y%m%d%H%M%S'),
+            eq['timestamp'].strftime('%Y.%m.%d'), eq['timestamp'].strftime('%H:%M:%S') + '.00',
+            f"{eq['latitude']:.4f}", f"{eq['longitude']:.4f}", f"{eq['depth']:.1f}",
+            fmt(eq['ml']), fmt(eq['md']), fmt(eq['ml']), fmt(eq['mw']), '0.0', '0.0', 'Ke', eq['location']
+        ]))
+    return '\n'.join(lines) + '\n'
+
+
+def synthetic_live(count):
+    lines = [''] * 6
+    for eq in synthetic_events(count):
+        fmt = lambda value: f"{value:.1f}" if value else '-.-'
+        lines.append(
+            f"{eq['timestamp'].strftime('%Y.%m.%d %H:%M:%S')}  {eq['latitude']:7.4f}   {eq['longitude']:7.4f}"
+            f"       {eq['depth']:5.1f}      {fmt(eq['md'])}  {fmt(eq['ml'])}  {fmt(eq['mw'])}   "
+            f"{eq['location']:<50}İlksel"
+        )
+    return '\n'.join(lines) + '\n'
+
+
+# --- Ölçüm -------------------------------------------------------------------------
+
+def best_of(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def compare(name, text, layout, legacy_line_parser, header_lines, repeat, divergent=None):
+    """divergent: eski yolun bilinen hatası yüzünden attığı satırlar (doğrulamadan çıkarılır)"""
+    all_lines = text.split('\n')
+    lines = all_lines[header_lines:]
+
+    legacy_time, legacy = best_of(lambda: [eq for eq in map(legacy_line_parser, lines) if eq], repeat)
+    vector_time, vector = best_of(lambda: to_records(parse(text, layout)), repeat)
+
+    dropped = [line for line in lines if divergent(line)] if divergent else []
+    if dropped:
+        # Eski davranışla kıyas: o satırlar olmadan ayrıştırılan sonuç
+        kept = all_lines[:header_lines] + [line for line in lines if not divergent(line)]
+        vector = to_records(parse('\n'.join(kept), layout))
+
+    assert len(legacy) == len(vector), f"{name}: satır sayısı farklı ({len(legacy)} != {len(vector)})"
+    for old, new in zip(legacy, vector):
+        # Eski yol yerel saati olduğu gibi saklıyordu; yeni parser UTC döner
+        old_utc = old['timestamp'].replace(tzinfo=ZoneInfo(KANDILLI_TIMEZONE)).astimezone(timezone.utc)
+        assert old_utc.replace(tzinfo=None) == new['timestamp'], f"{name}: timestamp farklı"
+        for key in ('latitude', 'longitude', 'depth', 'magnitude', 'location'):
+            assert old[key] == new[key], f"{name}: {key} farklı ({old[key]!r} != {new[key]!r})"
+
+    print(f"\n📊 {name} ({len(vector):,} deprem)")
+    print(f"   Eski satır satır : {legacy_time * 1000:9.1f} ms  ({len(vector) / legacy_time:,.0f} satır/s)")
+    print(f"   Vektörel parser  : {vector_time * 1000:9.1f} ms  ({len(vector) / vector_time:,.0f} satır/s)")
+    print(f"   Hızlanma         : {legacy_time / vector_time:.1f}x")
+    if dropped:
+        print(f"   ⚠️  Eski yol 'No' içeren {len(dropped):,} veri satırını atıyor (vektörel parser okur)")
+
+    return legacy_time / vector_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kandilli parser benchmark")
+    parser.add_argument('file', nargs='?', help="Gerçek bir Kandilli .txt arşiv dosyası")
+    parser.add_argument('--rows', type=int, default=50000, help="Sentetik satır sayısı (~1 yıllık katalog)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'r', encoding='ISO-8859-9') as f:
+            txt = f.read()
+        txt_name = f"TXT arşiv: {os.path.basename(args.file)}"
+    else:
+        txt = synthetic_txt(args.rows)
+        txt_name = "TXT arşiv (sentetik)"
+
+    print("="*60)
+    print("⚡ KANDİLLİ PARSER BENCHMARK")
+    print("="*60)
+
+    speedups = [
+        compare(txt_name, txt, TXT, legacy_parse_txt_line, 1, args.repeat, divergent=legacy_txt_divergent),
+        compare("Canlı liste / arşiv sayfası (sentetik)", synthetic_live(args.rows), LIVE,
+                legacy_parse_live_line, 6, args.repeat),
+    ]
+
+    print("\n" + "="*60)
+    if min(speedups) < 1:
+        print("❌ Vektörel parser eski yoldan yavaş!")
+        sys.exit(1)
+    print("✅ Vektörel parser tüm formatlarda daha hızlı")
+    print("="*60)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Liste uç noktası serileştirme benchmark'ı (/api/earthquakes, veritabanı yolu)
+Eski yol (ORM nesneleri + satır başına dict/isoformat + jsonable_encoder +
+json.dumps) ile kolon tuple'ları + orjson yolunu aynı veritabanında 1k, 10k,
+100k satırda karşılaştırır: süre (en iyi N) ve tracemalloc tepe bellek.
+Yeni yol sayfalıdır: MAX_PAGE_SIZE'lık sayfalar next_cursor ile sonuna kadar
+okunur (süre tüm sayfaların toplamı, bellek tek sayfayla sınırlı).
+Birleşik sayfaların eski yanıtla JSON olarak aynı olduğu doğrulanır; yeni yol
+yavaşsa çıkış kodu 1.
+
+Kullanım:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --sizes 1000,10000 --repeat 5
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from bench_concurrency import seed
+from bench_startup import ROOT
+
+DEFAULT_SIZES = '1000,10000,100000'
+QUERY = {'hours': 24 * 31, 'min_magnitude': 0.0, 'source': 'all', 'dedupe': False}
+
+
+# --- Eski yol (karşılaştırma için birebir kopya) -------------------------------
+
+def legacy_get_earthquakes(db, hours, min_magnitude, source):
+    """Eski api.get_earthquakes veritabanı yolu (dedupe=False)"""
+    from api import get_time_window
+    from database.models import Earthquake
+
+    start_time, end_time = get_time_window(hours)
+    query = db.query(Earthquake).filter(
+        Earthquake.timestamp >= start_time,
+        Earthquake.timestamp < end_time,
+        Earthquake.magnitude >= min_magnitude
+    )
+    if source != "all":
+        query = query.filter(Earthquake.source == source)
+
+    earthquakes = query.order_by(Earthquake.timestamp.desc()).all()
+
+    return {
+        "count": len(earthquakes),
+        "earthquakes": [
+            {
+                "id": eq.id,
+                "event_id": eq.event_id,
+                "timestamp": eq.timestamp.isoformat(),
+                "latitude": eq.latitude,
+                "longitude": eq.longitude,
+                "magnitude": eq.magnitude,
+                "depth": eq.depth,
+                "location": eq.location,
+                "source": eq.source
+            }
+            for eq in earthquakes
+        ]
+    }
+
+
+def legacy_body(db):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    params = {name: value for name, value in QUERY.items() if name != 'dedupe'}
+    return JSONResponse(jsonable_encoder(legacy_get_earthquakes(db, **params))).body
+
+
+def current_bodies(db):
+    """Tüm sayfaların gövdeleri (next_cursor null olana kadar)"""
+    from fastapi.responses import ORJSONResponse
+
+    from api import MAX_PAGE_SIZE, get_earthquakes
+
+    bodies, cursor = [], None
+    while True:
+        # @cached sarmalayıcısı atlanır: her çağrı veritabanına gider
+        page = get_earthquakes.__wrapped__(db=db, limit=MAX_PAGE_SIZE, cursor=cursor, **QUERY)
+        bodies.append(ORJSONResponse(page).body)
+        cursor = page['next_cursor']
+        if cursor is None:
+            return bodies
+
+
+# --- Ölçüm -----------------------------------------------------------------------
+
+def measure(func, db, repeat):
+    """(en iyi süre s, tepe bellek bayt, gövde)"""
+    best = None
+    for _ in range(repeat):
+        db.expire_all()
+        started = time.perf_counter()
+        body = func(db)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    db.expire_all()
+    tracemalloc.start()
+    func(db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, body
+
+
+def compare(repeat):
+    from database.models import ReadSessionLocal
+
+    db = ReadSessionLocal()
+    try:
+        legacy_time, legacy_peak, legacy = measure(legacy_body, db, repeat)
+        current_time, current_peak, bodies = measure(current_bodies, db, repeat)
+    finally:
+        db.close()
+
+    current = [earthquake for body in bodies for earthquake in json.loads(body)['earthquakes']]
+    current_bytes, size = sum(len(body) for body in bodies), len(current)
+    if json.loads(legacy)['earthquakes'] != current:
+        raise AssertionError(f"{size:,} satır: yanıtlar farklı")
+
+    print(f"\n📊 {size:,} deprem ({current_bytes / 1024:,.0f} KB JSON)")
+    print(f"   Eski (ORM + jsonable_encoder): {legacy_time * 1000:9.1f} ms  tepe {legacy_peak / 1024 / 1024:7.1f} MB")
+    print(f"   Kolonlar + orjson (sayfalı)  : {current_time * 1000:9.1f} ms  tepe {current_peak / 1024 / 1024:7.1f} MB")
+    print(f"   Hızlanma {legacy_time / current_time:.1f}x, bellek {legacy_peak / current_peak:.1f}x daha az")
+    return legacy_time, current_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Liste uç noktası serileştirme benchmark'ı")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Satır sayıları")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # api modülü: göreli frontend dizini, son olaylar deposu kapalı (veritabanı yolu)
+    os.chdir(ROOT)
+    os.environ['RECENT_STORE_HOURS'] = '0'
+
+    print("="*60)
+    print("⚡ LİSTE SERİLEŞTİRME BENCHMARK")
+    print("="*60)
+
+    # Tek geçici veritabanı, boyutlar arasında büyütülür
+    workdir = tempfile.mkdtemp(prefix='deprem_serialization_')
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    slower = []
+    seeded = 0
+    try:
+        for size in sorted(int(size) for size in args.sizes.split(',')):
+            seed(database_url, size, start=seeded)
+            seeded = size
+            legacy_time, current_time = compare(args.repeat)
+            if current_time > legacy_time:
+                slower.append(size)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "="*60)
+    if slower:
+        print(f"❌ Yeni yol eski yoldan yavaş: {', '.join(f'{size:,}' for size in slower)} satır")
+    else:
+        print("✅ Kolon tuple'ları + orjson tüm boyutlarda daha hızlı")
+    print("="*60)
+    sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
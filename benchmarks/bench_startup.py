@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Başlangıç süresi benchmark'ı - web sürecinin ilk isteğe kadar geçen süresi
+- `python -X importtime -c "import api"` ile import süresi ve en yavaş modüller
+- Import sırasında ağır kütüphaneler (pandas, numpy, psycopg2) yüklenirse veya
+  veritabanına bağlanılırsa başarısız (engine ilk kullanımda oluşturulur)
+- --serve: uvicorn'u gömülü SQLite ile başlatıp /api/stats'ın ilk 200
+  yanıtına kadar geçen süreyi (time-to-first-request) ölçer
+- Bütçe aşılırsa çıkış kodu 1
+
+Kullanım:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-ms 1000 --serve
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_BUDGET_MS = 1200       # import api (soğuk olmayan disk önbelleği ile)
+DEFAULT_TTFR_BUDGET_MS = 4000  # uvicorn başlatma + ilk /api/stats yanıtı
+# Web sürecinin import sırasında yüklememesi gereken modüller
+FORBIDDEN_MODULES = ('pandas', 'numpy', 'psycopg2')
+
+
+def _env(database_url):
+    env = dict(os.environ)
+    env['DATABASE_URL'] = database_url
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def parse_importtime(stderr):
+    """-X importtime çıktısı: [(kümülatif_us, self_us, modül)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return rows
+
+
+def measure_import(module, database_url, repeat):
+    """En iyi (en düşük) import süresi ve o çalıştırmanın modül listesi"""
+    best_ms, best_rows = None, []
+
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+            cwd=ROOT, env=_env(database_url), capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} başarısız:\n{result.stderr[-2000:]}")
+
+        rows = parse_importtime(result.stderr)
+        top = [cumulative for cumulative, _, name in rows if name == module]
+        total_ms = (top[-1] if top else sum(self_us for _, self_us, _ in rows)) / 1000
+
+        if best_ms is None or total_ms < best_ms:
+            best_ms, best_rows = total_ms, rows
+
+    return best_ms, best_rows
+
+
+def loaded_forbidden(module, database_url):
+    """Import sonrası sys.modules'te bulunan yasak modüller"""
+    code = (
+        f"import sys, {module}\n"
+        f"print(','.join(m for m in {FORBIDDEN_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, env=_env(database_url), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} başarısız:\n{result.stderr[-2000:]}")
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(database_url, timeout=30):
+    """uvicorn api:app başlatılır; ilk başarılı /api/stats yanıtına kadar geçen süre (ms)"""
+    env = _env(database_url)
+    subprocess.run(
+        [sys.executable, '-c', "from database.models import init_db; init_db()"],
+        cwd=ROOT, env=env, check=True, capture_output=True
+    )
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api/stats"
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn kapandı:\n{server.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=2) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        raise RuntimeError(f"{timeout}s içinde /api/stats yanıt vermedi")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web süreci başlangıç süresi benchmark'ı")
+    parser.add_argument('--module', default='api', help="Ölçülecek modül (varsayılan: api)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help="Import süresi bütçesi")
+    parser.add_argument('--top', type=int, default=10, help="Listelenecek en yavaş import sayısı")
+    parser.add_argument('--serve', action='store_true', help="uvicorn ile ilk isteğe kadar geçen süreyi de ölç")
+    parser.add_argument('--ttfr-budget-ms', type=float, default=DEFAULT_TTFR_BUDGET_MS,
+                        help="İlk istek (time-to-first-request) bütçesi")
+    args = parser.parse_args()
+
+    # Geçici SQLite: import sırasında bağlantı açılırsa dosya oluşur
+    workdir = tempfile.mkdtemp(prefix='deprem_startup_')
+    db_path = os.path.join(workdir, 'bench.db')
+    database_url = f"sqlite:///{db_path}"
+    failures = []
+
+    print("\n" + "="*60)
+    print(f"🚀 BAŞLANGIÇ BENCHMARK'I (import {args.module})")
+    print("="*60)
+
+    try:
+        import_ms, rows = measure_import(args.module, database_url, args.repeat)
+
+        print(f"\n🐢 En yavaş {args.top} import (kümülatif):")
+        for cumulative, _, name in sorted(rows, reverse=True)[:args.top]:
+            print(f"   {cumulative / 1000:8.1f} ms  {name}")
+
+        forbidden = loaded_forbidden(args.module, database_url)
+        connected = os.path.exists(db_path)
+
+        print(f"\n⏱️  import {args.module}: {import_ms:.0f} ms (en iyi {args.repeat}, bütçe {args.budget_ms:.0f} ms)")
+        if import_ms > args.budget_ms:
+            failures.append(f"import süresi bütçeyi aşıyor ({import_ms:.0f} > {args.budget_ms:.0f} ms)")
+        if forbidden:
+            failures.append(f"import sırasında yüklenen ağır modüller: {', '.join(forbidden)}")
+        if connected:
+            failures.append("import sırasında veritabanı bağlantısı açıldı")
+
+        if args.serve:
+            ttfr_ms = measure_first_request(database_url)
+            print(f"⏱️  İlk /api/stats yanıtı: {ttfr_ms:.0f} ms (bütçe {args.ttfr_budget_ms:.0f} ms)")
+            if ttfr_ms > args.ttfr_budget_ms:
+                failures.append(f"ilk istek bütçeyi aşıyor ({ttfr_ms:.0f} > {args.ttfr_budget_ms:.0f} ms)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("="*60)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Başlangıç bütçesi içinde")
+    print("="*60 + "\n")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
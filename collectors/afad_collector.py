@@ -2,61 +2,65 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import json
 import requests
+from collectors import raw_archive
+from collectors.cancellation import claim
+from collectors.http_client import get_session
 from datetime import datetime, timedelta
-from database.models import Earthquake, SessionLocal
+from database.models import SessionLocal
+from database.ingest import upsert_earthquakes
 
 class AFADCollector:
     """AFAD (Türkiye) deprem verilerini toplar"""
     
-    def __init__(self):
+    def __init__(self, session=None, timeout=30):
         # AFAD'ın API endpoint'i
         self.base_url = "https://deprem.afad.gov.tr/apiv2/event/filter"
+        self.session = session or get_session('afad')
+        self.timeout = timeout
+    
+    def fetch_items(self):
+        """Son 7 günün depremlerini çek (hata çağırana iletilir)"""
+        print(f"🇹🇷 AFAD'dan veri çekiliyor...")
+        
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=7)
+        
+        headers = {
+            'User-Agent': 'Mozilla/5.0',
+            'Content-Type': 'application/json'
+        }
+        
+        payload = {
+            "start": start_date.strftime("%Y-%m-%d"),
+            "end": end_date.strftime("%Y-%m-%d")
+        }
+        
+        print(f"📅 Tarih aralığı: {payload['start']} - {payload['end']}")
+        
+        response = self.session.post(self.base_url, json=payload, headers=headers, timeout=self.timeout)
+        
+        # Debug bilgileri
+        print(f"📡 Status Code: {response.status_code}")
+        print(f"📡 Content-Type: {response.headers.get('Content-Type')}")
+        
+        if response.status_code != 200:
+            print(f"❌ AFAD hata kodu: {response.status_code}")
+            print(f"Response: {response.text[:200]}")
+            response.raise_for_status()
+            raise requests.exceptions.HTTPError(f"AFAD beklenmeyen durum kodu: {response.status_code}")
+        
+        raw_archive.store('afad', response.content, url=self.base_url, params=payload)
+        earthquakes = self.items_from_payload(response.content)
+        
+        print(f"✅ {len(earthquakes)} deprem verisi alındı")
+        return earthquakes
     
     def fetch_recent_earthquakes(self):
-        """Son 7 günün depremlerini çek"""
+        """Son 7 günün depremlerini çek (hata olursa boş liste)"""
         try:
-            print(f"🇹🇷 AFAD'dan veri çekiliyor...")
-            
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=7)
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0',
-                'Content-Type': 'application/json'
-            }
-            
-            payload = {
-                "start": start_date.strftime("%Y-%m-%d"),
-                "end": end_date.strftime("%Y-%m-%d")
-            }
-            
-            print(f"📅 Tarih aralığı: {payload['start']} - {payload['end']}")
-            
-            response = requests.post(self.base_url, json=payload, headers=headers, timeout=30)
-            
-            # Debug bilgileri
-            print(f"📡 Status Code: {response.status_code}")
-            print(f"📡 Content-Type: {response.headers.get('Content-Type')}")
-            
-            if response.status_code != 200:
-                print(f"❌ AFAD hata kodu: {response.status_code}")
-                print(f"Response: {response.text[:200]}")
-                return []
-            
-            data = response.json()
-            
-            # AFAD'ın response formatına göre veriyi al
-            if isinstance(data, list):
-                earthquakes = data
-            elif isinstance(data, dict):
-                earthquakes = data.get('data', data.get('result', []))
-            else:
-                earthquakes = []
-            
-            print(f"✅ {len(earthquakes)} deprem verisi alındı")
-            return earthquakes
-            
+            return self.fetch_items()
         except requests.exceptions.Timeout:
             print("❌ AFAD zaman aşımı")
             return []
@@ -67,90 +71,108 @@ class AFADCollector:
             print(f"❌ Beklenmeyen hata: {e}")
             return []
     
-    def save_to_database(self, earthquakes):
-        """Depremleri veritabanına kaydet"""
-        db = SessionLocal()
-        saved_count = 0
-        skipped_count = 0
+    def items_from_payload(self, raw):
+        """Ham JSON yanıtından deprem listesini çıkar (replay de kullanır)"""
+        data = json.loads(raw)
+        
+        # AFAD'ın response formatına göre veriyi al
+        if isinstance(data, list):
+            return data
+        if isinstance(data, dict):
+            return data.get('data', data.get('result', []))
+        return []
+    
+    def to_event(self, eq):
+        """AFAD kaydını normalize edilmiş olaya çevir (geçersizse None)"""
+        # AFAD'ın farklı formatlarını destekle
+        event_id = f"afad_{eq.get('eventID', eq.get('geoid', eq.get('id', '')))}"
         
+        if not event_id or event_id == "afad_":
+            return None
+        
+        # Tarih parse et
+        date_field = eq.get('eventDate', eq.get('date', eq.get('dateTime', '')))
         try:
-            for eq in earthquakes:
-                # AFAD'ın farklı formatlarını destekle
-                event_id = f"afad_{eq.get('eventID', eq.get('geoid', eq.get('id', '')))}"
-                
-                if not event_id or event_id == "afad_":
-                    skipped_count += 1
-                    continue
-                
-                # Zaten var mı kontrol et
-                existing = db.query(Earthquake).filter_by(event_id=event_id).first()
-                if existing:
-                    skipped_count += 1
-                    continue
-                
-                # Tarih parse et
-                date_field = eq.get('eventDate', eq.get('date', eq.get('dateTime', '')))
-                try:
-                    if 'T' in date_field:
-                        timestamp = datetime.fromisoformat(date_field.replace('Z', '+00:00'))
-                    else:
-                        timestamp = datetime.strptime(date_field, '%Y-%m-%d %H:%M:%S')
-                except:
-                    skipped_count += 1
-                    continue
-                
-                # Koordinatlar ve büyüklük
-                lat = float(eq.get('latitude', eq.get('lat', eq.get('geojson', {}).get('coordinates', [0, 0])[1])))
-                lon = float(eq.get('longitude', eq.get('lon', eq.get('geojson', {}).get('coordinates', [0, 0])[0])))
-                mag = float(eq.get('magnitude', eq.get('mag', eq.get('ml', 0))))
-                depth = float(eq.get('depth', 0))
-                
-                if mag == 0 or lat == 0 or lon == 0:
-                    skipped_count += 1
-                    continue
-                
-                location = eq.get('location', eq.get('title', eq.get('locationTr', 'Türkiye')))
-                
-                earthquake = Earthquake(
-                    event_id=event_id,
-                    timestamp=timestamp,
-                    latitude=lat,
-                    longitude=lon,
-                    magnitude=mag,
-                    depth=depth,
-                    location=location,
-                    source='AFAD',
-                    geometry=f'POINT({lon} {lat})'
-                )
-                
-                db.add(earthquake)
-                saved_count += 1
-            
-            db.commit()
+            if 'T' in date_field:
+                timestamp = datetime.fromisoformat(date_field.replace('Z', '+00:00'))
+            else:
+                timestamp = datetime.strptime(date_field, '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            return None
+        
+        # Koordinatlar ve büyüklük
+        try:
+            lat = float(eq.get('latitude', eq.get('lat', eq.get('geojson', {}).get('coordinates', [0, 0])[1])))
+            lon = float(eq.get('longitude', eq.get('lon', eq.get('geojson', {}).get('coordinates', [0, 0])[0])))
+            mag = float(eq.get('magnitude', eq.get('mag', eq.get('ml', 0))))
+            depth = float(eq.get('depth', 0))
+        except (TypeError, ValueError, IndexError):
+            return None
+        
+        if mag == 0 or lat == 0 or lon == 0:
+            return None
+        
+        location = eq.get('location', eq.get('title', eq.get('locationTr', 'Türkiye')))
+        
+        return {
+            'event_id': event_id,
+            'timestamp': timestamp,
+            'latitude': lat,
+            'longitude': lon,
+            'magnitude': mag,
+            'depth': depth,
+            'location': location,
+            'source': 'AFAD'
+        }
+    
+    def save_to_database(self, earthquakes, db=None):
+        """
+        Depremleri veritabanına kaydet (tek toplu upsert)
+        db verilirse hata çağırana iletilir
+        """
+        events = [event for event in map(self.to_event, earthquakes) if event]
+        invalid_count = len(earthquakes) - len(events)
+        
+        try:
+            result = upsert_earthquakes(events, db=db)
             print(f"💾 Veritabanına kaydedildi:")
-            print(f"   ✅ {saved_count} yeni deprem")
-            print(f"   ⏭️  {skipped_count} zaten mevcut veya geçersiz")
-            
+            print(f"   ✅ {result['inserted']} yeni deprem")
+            print(f"   ⏭️  {result['skipped'] + invalid_count} zaten mevcut veya geçersiz")
+            return result
         except Exception as e:
-            db.rollback()
             print(f"❌ Veritabanı hatası: {e}")
-        finally:
-            db.close()
+            if db is not None:
+                raise
+            return None
     
-    def collect(self):
-        """Ana toplama fonksiyonu"""
+    def collect(self, token=None):
+        """
+        Ana toplama fonksiyonu
+        token: paralel toplayıcının CycleToken'ı (yazmadan önce claim edilir)
+        Hata çağırana iletilir (paralel toplayıcı 'error' olarak raporlar)
+        """
         print("\n" + "="*50)
         print("🚀 AFAD Deprem Verisi Toplama Başladı")
         print("="*50)
         
-        earthquakes = self.fetch_recent_earthquakes()
-        
-        if earthquakes:
-            self.save_to_database(earthquakes)
-        else:
-            print("⚠️  Kaydedilecek veri yok")
+        db = SessionLocal()
         
-        print("="*50 + "\n")
+        try:
+            earthquakes = self.fetch_items()
+            
+            if earthquakes:
+                claim(token)
+                self.save_to_database(earthquakes, db=db)
+                db.commit()
+            else:
+                print("⚠️  Kaydedilecek veri yok")
+        except Exception as e:
+            db.rollback()
+            print(f"❌ AFAD hatası: {e}")
+            raise
+        finally:
+            db.close()
+            print("="*50 + "\n")
 
 
 if __name__ == "__main__":
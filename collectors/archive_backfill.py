@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Kandilli arşiv backfill motoru
+- Sınırlı worker havuzu ile aylar paralel çekilir
+- Global token-bucket hız sınırı ile KOERI sunucusu yorulmaz
+- Ay başına checkpoint (archive_backfill_months) sayesinde yarıda kalan
+  çalıştırma kaldığı yerden devam eder, başarısız aylar tekrar denenir
+- 'empty' yalnızca sayfa gerçekten yoksa (HTTP 404) yazılır; indirilen ama
+  deprem satırı çıkmayan sayfa (kesik yanıt, hata sayfası, format değişikliği)
+  hata sayılır ve 'failed' olarak bir sonraki çalıştırmada tekrar denenir
+- Etkileşimsiz: input() beklemez, CLI argümanları ile çalışır
+
+Kullanım:
+    python collectors/archive_backfill.py --start 2019-01 --workers 4 --rate 1
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from collectors.http_client import create_session
+from collectors.kandilli_archive import KandilliArchiveScraper
+from database.models import ArchiveBackfillMonth, SessionLocal
+from database.ingest import upsert_earthquakes
+from database.partitions import ensure_partitions_for
+
+DONE_STATUSES = ('done', 'empty')
+
+
+class TokenBucket:
+    """Thread-safe token bucket: saniyede `rate` istek, en fazla `capacity` birikme"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bir token alınana kadar bekle"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait_time = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+
+
+def month_range(start_year, start_month, end_year, end_month):
+    """(yıl, ay) çiftlerini sırayla üret"""
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        yield year, month
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+
+
+class ArchiveBackfill:
+    """Paralel, devam ettirilebilir Kandilli arşiv backfill'i"""
+
+    def __init__(self, workers=4, rate=1.0, burst=2, max_attempts=3, retry_backoff=5.0):
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst)
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.scraper = KandilliArchiveScraper(session=create_session(pool_size=workers))
+
+    def plan(self, months):
+        """
+        Checkpoint satırlarını hazırla ve işlenecek ayları döndür
+        - done/empty aylar atlanır (içinde bulunulan ay hariç, o hala doluyor)
+        - failed/pending aylar tekrar kuyruğa girer
+        """
+        now = datetime.utcnow()
+        current = (now.year, now.month)
+
+        db = SessionLocal()
+        try:
+            existing = {
+                (row.year, row.month): row
+                for row in db.query(ArchiveBackfillMonth).all()
+            }
+
+            todo = []
+            for year, month in months:
+                row = existing.get((year, month))
+                if row is None:
+                    db.add(ArchiveBackfillMonth(year=year, month=month, status='pending', attempts=0))
+                elif row.status in DONE_STATUSES and (year, month) != current:
+                    continue
+                todo.append((year, month))
+
+            db.commit()
+            return todo
+        finally:
+            db.close()
+
+    def _mark(self, year, month, status, saved=0, error=None, attempts=0):
+        """Checkpoint'i kısa ömürlü bir session ile güncelle"""
+        db = SessionLocal()
+        try:
+            row = db.get(ArchiveBackfillMonth, (year, month))
+            if row is None:
+                row = ArchiveBackfillMonth(year=year, month=month, attempts=0)
+                db.add(row)
+            row.status = status
+            row.saved_count = saved
+            row.last_error = error
+            row.attempts = (row.attempts or 0) + attempts
+            db.commit()
+        finally:
+            db.close()
+
+    def process_month(self, year, month):
+        """
+        Tek bir ayı çek ve kaydet; geçici hatalarda backoff ile tekrar dene
+        Sayfa var ama deprem satırı yoksa bu da geçici hata sayılır
+        """
+        last_error = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            self.bucket.acquire()
+
+            try:
+                text = self.scraper.download_month(year, month)
+
+                if text is None:
+                    self._mark(year, month, 'empty', attempts=attempt)
+                    return 'empty', 0
+
+                earthquakes = self.scraper.parse_archive_text(text)
+                events = [
+                    event for event in (self.scraper.to_event(eq, year, month) for eq in earthquakes)
+                    if event
+                ]
+                if not events:
+                    # Sayfa indi ama satır yok: "veri yok" değil, bozuk/eksik yanıt
+                    raise ValueError(f"Sayfa indirildi ama deprem satırı çıkmadı ({len(text)} karakter)")
+
+                # Geçmiş ay: satırlar default partition'a düşmesin
+                timestamps = [event['timestamp'] for event in events]
+                ensure_partitions_for(min(timestamps), max(timestamps))
+                result = upsert_earthquakes(events)
+
+                self._mark(year, month, 'done', saved=result['inserted'], attempts=attempt)
+                return 'done', result['inserted']
+
+            except Exception as e:
+                last_error = str(e)
+                if attempt < self.max_attempts:
+                    time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+        self._mark(year, month, 'failed', error=last_error, attempts=self.max_attempts)
+        return 'failed', 0
+
+    def run(self, start_year, start_month, end_year, end_month):
+        """Tarih aralığını backfill et"""
+        print("\n" + "="*60)
+        print("📚 KANDİLLİ ARŞİV BACKFILL BAŞLADI")
+        print("="*60)
+        print(f"Tarih Aralığı: {start_year}-{start_month:02d} → {end_year}-{end_month:02d}")
+
+        todo = self.plan(month_range(start_year, start_month, end_year, end_month))
+        print(f"⏳ İşlenecek ay: {len(todo)} (worker: {self.workers}, hız: {self.bucket.rate}/s)\n")
+
+        started = time.perf_counter()
+        total_saved = 0
+        counts = {'done': 0, 'empty': 0, 'failed': 0}
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill') as executor:
+            futures = {
+                executor.submit(self.process_month, year, month): (year, month)
+                for year, month in todo
+            }
+
+            for future in as_completed(futures):
+                year, month = futures[future]
+                status, saved = future.result()
+                total_saved += saved
+                counts[status] += 1
+
+                icon = {'done': '✅', 'empty': '⚪', 'failed': '❌'}[status]
+                print(f"   {icon} {year}-{month:02d}: {status} ({saved} yeni)")
+
+                if status == 'failed':
+                    failed.append(f"{year}-{month:02d}")
+
+        print("\n" + "="*60)
+        print("📊 BACKFILL TAMAMLANDI")
+        print("="*60)
+        print(f"💾 Toplam kaydedilen deprem: {total_saved:,}")
+        print(f"📅 Aylar: ✅ {counts['done']} tamam, ⚪ {counts['empty']} sayfa yok, ❌ {counts['failed']} başarısız")
+        print(f"⏱️  Süre: {time.perf_counter() - started:.1f}s")
+
+        if failed:
+            print(f"\n⚠️ Başarısız aylar ({len(failed)}) - tekrar çalıştırınca yeniden denenecek:")
+            for month in failed[:10]:
+                print(f"   - {month}")
+            if len(failed) > 10:
+                print(f"   ... ve {len(failed) - 10} ay daha")
+
+        print("="*60 + "\n")
+
+        return total_saved
+
+
+def _parse_month(value):
+    year, month = value.split('-')
+    return int(year), int(month)
+
+
+if __name__ == "__main__":
+    now = datetime.now()
+
+    parser = argparse.ArgumentParser(description="Kandilli arşiv backfill")
+    parser.add_argument('--start', default='2019-01', help="Başlangıç ayı (YYYY-MM)")
+    parser.add_argument('--end', default=f"{now.year}-{now.month:02d}", help="Bitiş ayı (YYYY-MM)")
+    parser.add_argument('--workers', type=int, default=4, help="Paralel worker sayısı")
+    parser.add_argument('--rate', type=float, default=1.0, help="Saniyedeki en fazla istek")
+    parser.add_argument('--attempts', type=int, default=3, help="Ay başına deneme sayısı")
+    args = parser.parse_args()
+
+    start_year, start_month = _parse_month(args.start)
+    end_year, end_month = _parse_month(args.end)
+
+    backfill = ArchiveBackfill(workers=args.workers, rate=args.rate, max_attempts=args.attempts)
+    backfill.run(start_year, start_month, end_year, end_month)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Toplama döngüsü iptali
+- Paralel toplayıcı deadline'ı geçen kaynağı bekleyemez ama thread'i de
+  öldüremez; thread HTTP isteğini bitirip sonraki döngünün içine yazabilir
+- Bu yüzden her kaynağa bir CycleToken verilir: worker veritabanına yazmadan
+  hemen önce claim() çağırır, koordinatör deadline dolunca cancel() çağırır
+"""
+import threading
+
+
+class CollectionCancelled(Exception):
+    """Döngüsü bitmiş (iptal edilmiş) bir toplama veritabanına yazmaya çalıştı"""
+
+
+class CycleToken:
+    """
+    Tek bir kaynağın tek bir döngüdeki yazma hakkı
+
+    claim() ile cancel() aynı kilitle yarışır; sonuç ikisinden biridir:
+    - worker yazmaya başlamıştır -> cancel() False döner, koordinatör bekler
+    - döngü iptal edilmiştir -> claim() CollectionCancelled fırlatır, hiç yazılmaz
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cancelled = False
+        self.claimed = False
+
+    def claim(self):
+        """Yazmadan önce çağrılır; döngü iptal edildiyse CollectionCancelled"""
+        with self._lock:
+            if self.cancelled:
+                raise CollectionCancelled("Toplama döngüsü sona erdi, yazma atlandı")
+            self.claimed = True
+
+    def cancel(self):
+        """Döngüyü iptal et; worker yazmaya başlamışsa False döner"""
+        with self._lock:
+            if self.claimed:
+                return False
+            self.cancelled = True
+            return True
+
+
+def claim(token):
+    """token verilmişse yazma hakkını al (tekil çalıştırmada token yoktur)"""
+    if token is not None:
+        token.claim()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Paylaşılan HTTP istemcileri
+- Kaynak başına keep-alive bağlantı havuzlu requests.Session
+- Geçici hatalarda (429/5xx, bağlantı kopması) exponential backoff ile retry
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0  # 1s, 2s, 4s ...
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def create_session(retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, pool_size=4):
+    """Retry ve bağlantı havuzu ayarlı yeni bir Session oluştur"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'POST']),  # AFAD POST ile sorgulanıyor
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = 'deprem-monitor/1.0'
+    return session
+
+
+def retry_budget(timeout, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """
+    Tek bir isteğin retry'lar dahil en kötü durumda süreceği süre (saniye)
+    - Her deneme connect + read timeout'u kadar sürebilir
+    - Denemeler arasında backoff beklenir (1s, 2s, 4s ...)
+    """
+    attempts = retries + 1
+    sleeps = sum(backoff * (2 ** i) for i in range(retries))
+    return attempts * 2 * timeout + sleeps
+
+
+def get_session(name):
+    """
+    Kaynak adına göre süreç boyunca paylaşılan Session'ı getir
+    Aynı kaynak her döngüde aynı keep-alive bağlantıları kullanır
+    """
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = create_session()
+            _sessions[name] = session
+        return session
+
+
+def close_sessions():
+    """Tüm paylaşılan Session'ları kapat"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -3,87 +3,37 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from datetime import datetime
-from database.models import Earthquake, SessionLocal
+from collectors.kandilli_parser import TXT, parse, to_records
+from database.models import MaintenanceSession
+from database.ingest import upsert_earthquakes
+from database.partitions import ensure_partitions_for
+
+def to_event(eq_data):
+    """Parse edilmiş satırı normalize edilmiş olaya çevir"""
+    event_id = f"kandilli_manual_{eq_data['date'].replace('.', '')}_{eq_data['time'].replace(':', '')}_{eq_data['latitude']:.2f}_{eq_data['longitude']:.2f}"
+
+    return {
+        'event_id': event_id,
+        'timestamp': eq_data['timestamp'],
+        'latitude': eq_data['latitude'],
+        'longitude': eq_data['longitude'],
+        'magnitude': eq_data['magnitude'],
+        'depth': eq_data['depth'],
+        'location': eq_data['location'],
+        'source': 'Kandilli_Manual'
+    }
+
 
 class KandilliTxtImporter:
     """Kandilli .txt dosyalarını veritabanına aktar"""
     
     def __init__(self):
-        self.db = SessionLocal()
+        self.db = None  # import_file() süresince açık (toplu yükleme: süre sınırı yok)
+        self.batch_size = 5000
     
-    def parse_kandilli_line(self, line):
-        """Kandilli tab-separated formatını parse et"""
-        line = line.strip()
-        
-        # Boş satır veya başlık satırı ise atla
-        if not line or 'Deprem Kodu' in line or 'No' in line or line.startswith('---'):
-            return None
-        
-        # TAB ile ayır
-        parts = line.split('\t')
-        
-        if len(parts) < 15:
-            return None
-        
-        try:
-            # Sütunlar:
-            # 0: No, 1: Deprem Kodu, 2: Tarih, 3: Saat, 4: Enlem, 5: Boylam, 
-            # 6: Derinlik, 7: xM, 8: MD, 9: ML, 10: Mw, 11: Ms, 12: Mb, 13: Tip, 14: Yer
-            
-            date = parts[2].strip()  # 1995.12.31
-            time = parts[3].strip()  # 05:16:19.20
-            
-            # Saniye kısmını sadeleştir (05:16:19.20 -> 05:16:19)
-            if '.' in time:
-                time = time.split('.')[0]
-            
-            latitude = float(parts[4].strip())
-            longitude = float(parts[5].strip())
-            depth = float(parts[6].strip())
-            
-            # Büyüklükler
-            xm = parts[7].strip()
-            md = parts[8].strip()
-            ml = parts[9].strip()
-            mw = parts[10].strip()
-            ms = parts[11].strip()
-            mb = parts[12].strip()
-            
-            location = parts[14].strip() if len(parts) > 14 else 'Bilinmiyor'
-            
-            # En büyük magnitude'ü bul
-            mags = []
-            for mag_val in [mw, ms, mb, ml, md, xm]:
-                if mag_val and mag_val not in ['0.0', '0', '', '0.00']:
-                    try:
-                        mag_float = float(mag_val)
-                        if mag_float > 0:
-                            mags.append(mag_float)
-                    except:
-                        pass
-            
-            if not mags:
-                return None
-            
-            magnitude = max(mags)
-            
-            # Tarih parse et
-            timestamp = datetime.strptime(f"{date} {time}", "%Y.%m.%d %H:%M:%S")
-            
-            return {
-                'timestamp': timestamp,
-                'latitude': latitude,
-                'longitude': longitude,
-                'depth': depth,
-                'magnitude': magnitude,
-                'location': location,
-                'date': date,
-                'time': time
-            }
-            
-        except (ValueError, IndexError) as e:
-            return None
+    def to_event(self, eq_data):
+        """Parse edilmiş satırı normalize edilmiş olaya çevir"""
+        return to_event(eq_data)
     
     def import_file(self, file_path):
         """Tek bir .txt dosyasını içe aktar"""
@@ -97,62 +47,45 @@ class KandilliTxtImporter:
         saved_count = 0
         skipped_count = 0
         error_count = 0
+        self.db = MaintenanceSession()
         
         try:
             encodings = ['ISO-8859-9', 'utf-8', 'latin-1', 'cp1254']
-            lines = None
+            text = None
             
             for encoding in encodings:
                 try:
                     with open(file_path, 'r', encoding=encoding) as f:
-                        lines = f.readlines()
+                        text = f.read()
                     break
-                except:
+                except UnicodeDecodeError:
                     continue
             
-            if not lines:
+            if not text:
                 print(f"   ❌ Dosya okunamadı")
                 return 0
             
-            print(f"   📊 Toplam satır: {len(lines)}")
+            # Tüm dosya tek geçişte parse edilir (ilk satır başlık)
+            df = parse(text, TXT)
+            line_count = text.count('\n')
+            error_count = max(line_count - 1 - len(df), 0)
             
-            # İlk satır başlık, onu atla
-            data_lines = lines[1:]
+            print(f"   📊 Toplam satır: {line_count}")
             
-            for line in data_lines:
-                eq_data = self.parse_kandilli_line(line)
-                
-                if not eq_data:
-                    error_count += 1
-                    continue
-                
-                event_id = f"kandilli_manual_{eq_data['date'].replace('.', '')}_{eq_data['time'].replace(':', '')}_{eq_data['latitude']:.2f}_{eq_data['longitude']:.2f}"
-                
-                existing = self.db.query(Earthquake).filter_by(event_id=event_id).first()
-                if existing:
-                    skipped_count += 1
-                    continue
-                
-                earthquake = Earthquake(
-                    event_id=event_id,
-                    timestamp=eq_data['timestamp'],
-                    latitude=eq_data['latitude'],
-                    longitude=eq_data['longitude'],
-                    magnitude=eq_data['magnitude'],
-                    depth=eq_data['depth'],
-                    location=eq_data['location'],
-                    source='Kandilli_Manual',
-                    geometry=f"POINT({eq_data['longitude']} {eq_data['latitude']})"
-                )
-                
-                self.db.add(earthquake)
-                saved_count += 1
-                
-                if saved_count % 500 == 0:
-                    self.db.commit()
-                    print(f"   ⏳ {saved_count:,} kayıt eklendi...")
+            events = [self.to_event(eq_data) for eq_data in to_records(df)]
             
-            self.db.commit()
+            # Geçmiş aylar: satırlar default partition'a düşmesin
+            if events:
+                ensure_partitions_for(df['timestamp'].min().to_pydatetime(), df['timestamp'].max().to_pydatetime())
+            
+            # Her batch tek bir toplu upsert
+            for i in range(0, len(events), self.batch_size):
+                result = upsert_earthquakes(events[i:i + self.batch_size], db=self.db)
+                self.db.commit()
+                
+                saved_count += result['inserted']
+                skipped_count += result['skipped']
+                print(f"   ⏳ {saved_count:,} kayıt eklendi...")
             
             print(f"   ✅ {saved_count:,} yeni kayıt eklendi")
             print(f"   ⏭️  {skipped_count:,} zaten mevcuttu")
@@ -165,6 +98,9 @@ class KandilliTxtImporter:
             import traceback
             traceback.print_exc()
             return 0
+        finally:
+            self.db.close()
+            self.db = None
         
         return saved_count
     
@@ -192,9 +128,6 @@ class KandilliTxtImporter:
         print("="*60 + "\n")
         
         return total_saved
-    
-    def __del__(self):
-        self.db.close()
 
 
 if __name__ == "__main__":
@@ -223,6 +156,9 @@ if __name__ == "__main__":
         print(f"\n⏱️  Tahmini süre: {len(found_files) * 3}-{len(found_files) * 8} dakika")
         print("💾 Veritabanına onbinlerce kayıt eklenecek...\n")
         
+        print("💡 Daha hızlı akış (COPY) tabanlı paralel içe aktarma için:")
+        print("   python collectors/kandilli_txt_stream.py --workers 4\n")
+        
         response = input("ENTER'a basarak içe aktarmayı başlat (veya CTRL+C ile iptal): ")
         
         total = importer.import_multiple_files(found_files)
@@ -4,80 +4,70 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import requests
+from collectors import raw_archive
+from collectors.http_client import get_session
 from datetime import datetime, timedelta
-from database.models import Earthquake, SessionLocal
+from database.ingest import upsert_earthquakes
+from database.partitions import ensure_partitions_for
 import time
 
 class KandilliArchiveScraper:
     """Kandilli Rasathanesi geçmiş deprem verilerini çeker"""
     
-    def __init__(self):
+    def __init__(self, session=None, timeout=30):
         self.base_url = "http://www.koeri.boun.edu.tr/scripts/lst0.asp"
+        self.archive_root = "http://www.koeri.boun.edu.tr/scripts"
+        self.session = session or get_session('kandilli_archive')
+        self.timeout = timeout
     
-    def fetch_archive_data(self, year, month):
-        """
-        Belirli bir ay için deprem verilerini çek
-        Kandilli'nin arşiv sayfası format: lst{YY}{MM}.asp
-        """
+    def archive_url(self, year, month):
+        """Kandilli'nin arşiv sayfası format: lst{YY}{MM}.asp"""
         # Yıl formatı: 2023 -> 23
         year_short = str(year)[-2:]
         month_str = f"{month:02d}"
+        return f"{self.archive_root}/lst{year_short}{month_str}.asp"
+    
+    def download_month(self, year, month):
+        """
+        Ay sayfasını indir
+        Sayfa yoksa None döner, ağ hatalarında exception fırlatır (retry için)
+        """
+        url = self.archive_url(year, month)
+        response = self.session.get(url, timeout=self.timeout)
         
-        # Arşiv URL'si
-        archive_url = f"http://www.koeri.boun.edu.tr/scripts/lst{year_short}{month_str}.asp"
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        raw_archive.store('kandilli_archive', response.content, url=url, meta={'year': year, 'month': month})
         
+        return self.decode(response.content)
+    
+    def decode(self, raw):
+        """Arşiv sayfası ISO-8859-9 (Türkçe) kodlu"""
+        return raw.decode('ISO-8859-9', errors='replace')
+    
+    def parse_archive_text(self, text):
+        """Arşiv sayfasının metnini deprem sözlüklerine çevir (vektörel parser)"""
+        # numpy/pandas yalnızca parse sırasında yüklenir (hızlı başlangıç)
+        from collectors.kandilli_parser import ARCHIVE, parse, to_records
+        return to_records(parse(text, ARCHIVE))
+    
+    def fetch_archive_data(self, year, month):
+        """
+        Belirli bir ay için deprem verilerini çek
+        Kandilli'nin arşiv sayfası format: lst{YY}{MM}.asp
+        """
         print(f"📅 {year}-{month:02d} verisi çekiliyor...")
-        print(f"   URL: {archive_url}")
+        print(f"   URL: {self.archive_url(year, month)}")
         
         try:
-            response = requests.get(archive_url, timeout=30)
-            response.encoding = 'ISO-8859-9'
+            text = self.download_month(year, month)
             
-            if response.status_code != 200:
-                print(f"   ⚠️ Sayfa bulunamadı (HTTP {response.status_code})")
+            if text is None:
+                print(f"   ⚠️ Sayfa bulunamadı (HTTP 404)")
                 return []
             
-            lines = response.text.split('\n')
-            earthquakes = []
-            
-            # Veri satırlarını bul
-            for line in lines[6:]:  # İlk 6 satır başlık
-                line = line.strip()
-                if not line or line.startswith('-'):
-                    continue
-                
-                parts = line.split()
-                if len(parts) < 8:
-                    continue
-                
-                try:
-                    eq = {
-                        'date': parts[0],
-                        'time': parts[1],
-                        'latitude': float(parts[2]),
-                        'longitude': float(parts[3]),
-                        'depth': float(parts[4]),
-                        'md': parts[5] if parts[5] != '-.-' else None,
-                        'ml': parts[6] if parts[6] != '-.-' else None,
-                        'mw': parts[7] if parts[7] != '-.-' else None,
-                        'location': ' '.join(parts[8:])
-                    }
-                    
-                    # En büyük magnitude'ü seç
-                    mags = []
-                    if eq['mw'] and eq['mw'] != '-.-':
-                        mags.append(float(eq['mw']))
-                    if eq['ml'] and eq['ml'] != '-.-':
-                        mags.append(float(eq['ml']))
-                    if eq['md'] and eq['md'] != '-.-':
-                        mags.append(float(eq['md']))
-                    
-                    if mags:
-                        eq['magnitude'] = max(mags)
-                        earthquakes.append(eq)
-                
-                except (ValueError, IndexError):
-                    continue
+            earthquakes = self.parse_archive_text(text)
             
             print(f"   ✅ {len(earthquakes)} deprem bulundu")
             return earthquakes
@@ -89,65 +79,43 @@ class KandilliArchiveScraper:
             print(f"   ❌ Hata: {e}")
             return []
     
+    def to_event(self, eq, year, month):
+        """Arşiv satırını normalize edilmiş olaya çevir"""
+        # Benzersiz ID oluştur
+        event_id = f"kandilli_archive_{year}{month:02d}_{eq['date'].replace('.', '')}_{eq['time'].replace(':', '')}_{eq['latitude']:.2f}_{eq['longitude']:.2f}"
+        
+        return {
+            'event_id': event_id,
+            'timestamp': eq['timestamp'],
+            'latitude': eq['latitude'],
+            'longitude': eq['longitude'],
+            'magnitude': eq['magnitude'],
+            'depth': eq['depth'],
+            'location': eq['location'],
+            'source': 'Kandilli_Archive'
+        }
+    
     def save_to_database(self, earthquakes, year, month):
-        """Depremleri veritabanına kaydet"""
+        """Depremleri veritabanına kaydet (tek toplu upsert)"""
         if not earthquakes:
             return 0
         
-        db = SessionLocal()
-        saved_count = 0
-        skipped_count = 0
+        events = [event for event in (self.to_event(eq, year, month) for eq in earthquakes) if event]
+        invalid_count = len(earthquakes) - len(events)
         
         try:
-            for eq in earthquakes:
-                # Benzersiz ID oluştur
-                event_id = f"kandilli_archive_{year}{month:02d}_{eq['date'].replace('.', '')}_{eq['time'].replace(':', '')}_{eq['latitude']:.2f}_{eq['longitude']:.2f}"
-                
-                # Zaten var mı kontrol et
-                existing = db.query(Earthquake).filter_by(event_id=event_id).first()
-                if existing:
-                    skipped_count += 1
-                    continue
-                
-                # Tarih parse et
-                try:
-                    timestamp = datetime.strptime(f"{eq['date']} {eq['time']}", "%Y.%m.%d %H:%M:%S")
-                except:
-                    skipped_count += 1
-                    continue
-                
-                # Yeni kayıt oluştur
-                earthquake = Earthquake(
-                    event_id=event_id,
-                    timestamp=timestamp,
-                    latitude=eq['latitude'],
-                    longitude=eq['longitude'],
-                    magnitude=eq['magnitude'],
-                    depth=eq['depth'],
-                    location=eq['location'],
-                    source='Kandilli_Archive',
-                    geometry=f"POINT({eq['longitude']} {eq['latitude']})"
-                )
-                
-                db.add(earthquake)
-                saved_count += 1
-                
-                # Her 100 kayıtta bir commit (performans için)
-                if saved_count % 100 == 0:
-                    db.commit()
-            
-            # Kalan kayıtları commit et
-            db.commit()
-            
-            print(f"   💾 {saved_count} yeni, {skipped_count} mevcut kayıt")
-            
+            if events:
+                # Geçmiş ay: satırlar default partition'a düşmesin
+                timestamps = [event['timestamp'] for event in events]
+                ensure_partitions_for(min(timestamps), max(timestamps))
+            result = upsert_earthquakes(events)
         except Exception as e:
-            db.rollback()
             print(f"   ❌ Veritabanı hatası: {e}")
-        finally:
-            db.close()
+            return 0
+        
+        print(f"   💾 {result['inserted']} yeni, {result['skipped'] + invalid_count} mevcut kayıt")
         
-        return saved_count
+        return result['inserted']
     
     def fetch_date_range(self, start_year, start_month, end_year, end_month):
         """
@@ -215,6 +183,9 @@ if __name__ == "__main__":
     print("⏱️ Tahmini süre: 10-20 dakika")
     print("🔄 İşlem sırasında bekleyin...\n")
     
+    print("💡 Paralel ve kaldığı yerden devam eden sürüm için:")
+    print("   python collectors/archive_backfill.py --start 2019-01\n")
+    
     input("ENTER'a basarak başlatın (veya CTRL+C ile iptal edin): ")
     
     total = scraper.fetch_date_range(
@@ -3,69 +3,56 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import requests
+from collectors import raw_archive
+from collectors.cancellation import claim
+from collectors.http_client import get_session
 from datetime import datetime
-from database.models import Earthquake, SessionLocal
+import hashlib
+from database.models import SessionLocal
+from database.ingest import upsert_earthquakes
+from database.cursors import get_cursor
 
 class KandilliCollector:
     """Kandilli Rasathanesi deprem verilerini toplar"""
     
-    def __init__(self):
+    def __init__(self, session=None, timeout=30):
         self.base_url = "http://www.koeri.boun.edu.tr/scripts/lst0.asp"
+        self.session = session or get_session('kandilli')
+        self.timeout = timeout
+        self.cursor_name = 'kandilli'
+    
+    def fetch_raw(self):
+        """lst0.asp sayfasını ham byte olarak indir"""
+        response = self.session.get(self.base_url, timeout=self.timeout)
+        response.raise_for_status()
+        raw_archive.store('kandilli', response.content, url=self.base_url)
+        return response.content
+    
+    def data_lines(self, raw):
+        """Ham içerikten veri satırlarını çıkar (en yeni deprem en üstte)"""
+        # Türkçe karakterler için doğru encoding
+        text = raw.decode('ISO-8859-9', errors='replace')
+        
+        # İlk 6 satır başlık
+        for line in text.split('\n')[6:]:
+            line = line.strip()
+            if not line or line.startswith('-'):
+                continue
+            yield line
+    
+    def parse_lines(self, lines):
+        """Veri satırlarını deprem sözlüklerine çevir (vektörel parser)"""
+        # numpy/pandas yalnızca parse sırasında yüklenir (hızlı başlangıç)
+        from collectors.kandilli_parser import parse_live_lines, to_records
+        return to_records(parse_live_lines(lines))
     
     def fetch_recent_earthquakes(self):
-        """Son depremleri çek"""
+        """Son depremleri çek (tam liste)"""
         try:
             print(f"🇹🇷 Kandilli Rasathanesi'nden veri çekiliyor...")
             
-            response = requests.get(self.base_url, timeout=30)
-            # Türkçe karakterler için doğru encoding
-            response.encoding = 'ISO-8859-9'  # Türkçe için
-            
-            lines = response.text.split('\n')
-            earthquakes = []
-            
-            # Veri satırlarını bul (başlık satırlarını atla)
-            for line in lines[6:]:  # İlk 6 satır başlık
-                line = line.strip()
-                if not line or line.startswith('-'):
-                    continue
-                
-                # Satırı boşluklara göre ayır
-                parts = line.split()
-                if len(parts) < 8:
-                    continue
-                
-                try:
-                    # Kandilli formatı:
-                    # Tarih Saat Lat Lon Derinlik MD ML Mw Yer
-                    eq = {
-                        'date': parts[0],      # YYYY.MM.DD
-                        'time': parts[1],      # HH:MM:SS
-                        'latitude': float(parts[2]),
-                        'longitude': float(parts[3]),
-                        'depth': float(parts[4]),
-                        'md': parts[5] if parts[5] != '-.-' else None,
-                        'ml': parts[6] if parts[6] != '-.-' else None,
-                        'mw': parts[7] if parts[7] != '-.-' else None,
-                        'location': ' '.join(parts[8:])
-                    }
-                    
-                    # En büyük magnitude'ü seç
-                    mags = []
-                    if eq['mw'] and eq['mw'] != '-.-':
-                        mags.append(float(eq['mw']))
-                    if eq['ml'] and eq['ml'] != '-.-':
-                        mags.append(float(eq['ml']))
-                    if eq['md'] and eq['md'] != '-.-':
-                        mags.append(float(eq['md']))
-                    
-                    if mags:
-                        eq['magnitude'] = max(mags)
-                        earthquakes.append(eq)
-                    
-                except (ValueError, IndexError) as e:
-                    continue
+            raw = self.fetch_raw()
+            earthquakes = self.parse_lines(self.data_lines(raw))
             
             print(f"✅ {len(earthquakes)} deprem verisi alındı")
             return earthquakes
@@ -74,70 +61,142 @@ class KandilliCollector:
             print(f"❌ Kandilli hatası: {e}")
             return []
     
-    def save_to_database(self, earthquakes):
-        """Depremleri veritabanına kaydet"""
+    def line_hash(self, line):
+        """Satırın kısa parmak izi (marker'da satırın kendisi yerine saklanır)"""
+        return hashlib.sha1(line.encode('utf-8')).hexdigest()[:16]
+    
+    def take_new_lines(self, lines, marker):
+        """
+        Önceki sorguda görülmemiş satırları al
+        - marker, önceki listedeki (son ~500 deprem) tüm satırların hash kümesidir
+        - Tek bir "en üst satır"a göre durmak, listenin ortasına sonradan eklenen
+          veya revize edilen (REVIZE) satırları kaçırıyordu; küme karşılaştırması
+          listenin neresinde olursa olsun yeni/değişmiş satırı yakalar
+        - Listeden düşen satırlar kümeden de düşer (lookback = listenin kendisi)
+        Dönüş: (yeni satırlar, yeni marker)
+        """
+        # Eski formattaki marker (tek ham satır) boş küme gibi davranır: liste bir kez
+        # baştan işlenir, upsert tekrarları zaten atlar
+        seen = set(marker.split('\n')) if marker else set()
+        
+        new_lines = []
+        hashes = []
+        for line in lines:
+            digest = self.line_hash(line)
+            hashes.append(digest)
+            if digest not in seen:
+                new_lines.append(line)
+        
+        return new_lines, '\n'.join(hashes) or marker
+    
+    def to_event(self, eq):
+        """Ham Kandilli satırını normalize edilmiş olaya çevir"""
+        # Benzersiz ID oluştur
+        event_id = f"kandilli_{eq['date'].replace('.', '')}_{eq['time'].replace(':', '')}_{eq['latitude']:.2f}_{eq['longitude']:.2f}"
+        
+        return {
+            'event_id': event_id,
+            'timestamp': eq['timestamp'],
+            'latitude': eq['latitude'],
+            'longitude': eq['longitude'],
+            'magnitude': eq['magnitude'],
+            'depth': eq['depth'],
+            'location': eq['location'],  # Artık düzgün Türkçe
+            'source': 'Kandilli'
+        }
+    
+    def save_to_database(self, earthquakes, db=None, update=False):
+        """
+        Depremleri veritabanına kaydet (tek toplu upsert)
+        db verilirse hata çağırana iletilir (imleç ile aynı transaction)
+        update=True: mevcut kayıtlar revize değerlerle güncellenir
+        """
+        events = [event for event in map(self.to_event, earthquakes) if event]
+        invalid_count = len(earthquakes) - len(events)
+        
+        try:
+            result = upsert_earthquakes(events, db=db, update=update)
+            print(f"💾 Veritabanına kaydedildi:")
+            print(f"   ✅ {result['inserted']} yeni deprem")
+            print(f"   ⏭️  {result['skipped'] + invalid_count} zaten mevcut veya geçersiz")
+            return result
+        except Exception as e:
+            print(f"❌ Veritabanı hatası: {e}")
+            if db is not None:
+                raise
+            return None
+    
+    def collect_delta(self, token=None):
+        """
+        Delta modu
+        - İçerik parmak izi (sha256) öncekiyle aynıysa parse tamamen atlanır
+        - Değilse, yalnızca önceki listede olmayan (yeni veya revize) satırlar
+          parse edilir; revize satırlar mevcut kaydı günceller
+        - Parmak izi ve marker (satır hash kümesi) collector_cursors tablosunda saklanır, böylece
+          scheduler yeniden başlasa da tüm liste tekrar işlenmez
+        - Hata çağırana iletilir (paralel toplayıcı 'error' olarak raporlar)
+        """
         db = SessionLocal()
-        saved_count = 0
-        skipped_count = 0
         
         try:
-            for eq in earthquakes:
-                # Benzersiz ID oluştur
-                event_id = f"kandilli_{eq['date'].replace('.', '')}_{eq['time'].replace(':', '')}_{eq['latitude']:.2f}_{eq['longitude']:.2f}"
-                
-                # Zaten var mı kontrol et
-                existing = db.query(Earthquake).filter_by(event_id=event_id).first()
-                if existing:
-                    skipped_count += 1
-                    continue
-                
-                # Tarih parse et
-                try:
-                    timestamp = datetime.strptime(f"{eq['date']} {eq['time']}", "%Y.%m.%d %H:%M:%S")
-                except:
-                    skipped_count += 1
-                    continue
-                
-                earthquake = Earthquake(
-                    event_id=event_id,
-                    timestamp=timestamp,
-                    latitude=eq['latitude'],
-                    longitude=eq['longitude'],
-                    magnitude=eq['magnitude'],
-                    depth=eq['depth'],
-                    location=eq['location'],  # Artık düzgün Türkçe
-                    source='Kandilli',
-                    # geometry=f"POINT({eq['longitude']} {eq['latitude']})" # KALDIRILDI
-                )
-                
-                db.add(earthquake)
-                saved_count += 1
+            print(f"🇹🇷 Kandilli Rasathanesi'nden veri çekiliyor (delta)...")
+            raw = self.fetch_raw()
+            fingerprint = hashlib.sha256(raw).hexdigest()
             
+            cursor = get_cursor(db, self.cursor_name)
+            now = datetime.utcnow()
+            
+            if cursor.fingerprint == fingerprint:
+                print("⏭️  Liste değişmemiş, parse atlandı")
+                claim(token)
+                cursor.last_success_at = now
+                db.commit()
+                return []
+            
+            new_lines, marker = self.take_new_lines(self.data_lines(raw), cursor.marker)
+            earthquakes = self.parse_lines(new_lines)
+            print(f"✅ {len(earthquakes)} yeni satır işlendi")
+            
+            claim(token)
+            if earthquakes:
+                self.save_to_database(earthquakes, db=db, update=True)
+            
+            cursor.fingerprint = fingerprint
+            cursor.marker = marker
+            cursor.last_success_at = now
             db.commit()
-            print(f"💾 Veritabanına kaydedildi:")
-            print(f"   ✅ {saved_count} yeni deprem")
-            print(f"   ⏭️  {skipped_count} zaten mevcut")
+            
+            return earthquakes
             
         except Exception as e:
             db.rollback()
-            print(f"❌ Veritabanı hatası: {e}")
+            print(f"❌ Kandilli hatası: {e}")
+            raise
         finally:
             db.close()
     
-    def collect(self):
-        """Ana toplama fonksiyonu"""
+    def collect(self, delta=True, token=None):
+        """
+        Ana toplama fonksiyonu
+        token: paralel toplayıcının CycleToken'ı (yazmadan önce claim edilir)
+        """
         print("\n" + "="*50)
         print("🚀 Kandilli Deprem Verisi Toplama Başladı")
         print("="*50)
         
-        earthquakes = self.fetch_recent_earthquakes()
-        
-        if earthquakes:
-            self.save_to_database(earthquakes)
-        else:
-            print("⚠️  Kaydedilecek veri yok")
-        
-        print("="*50 + "\n")
+        try:
+            if delta:
+                self.collect_delta(token=token)
+            else:
+                earthquakes = self.fetch_recent_earthquakes()
+                
+                if earthquakes:
+                    claim(token)
+                    self.save_to_database(earthquakes)
+                else:
+                    print("⚠️  Kaydedilecek veri yok")
+        finally:
+            print("="*50 + "\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Kandilli metin formatları için tek, vektörel parser
+- LIVE:    lst0.asp canlı liste (sabit genişlikli sütunlar, MD ML Mw)
+- ARCHIVE: lst{YY}{MM}.asp arşiv sayfaları (canlı liste ile aynı düzen)
+- TXT:     Kandilli katalog .txt dosyaları (TAB ayrımlı, xM MD ML Mw Ms Mb)
+
+İçerik tek geçişte NumPy dizilerine alınır; sayı ve tarih dönüşümü ile en
+büyük magnitude seçimi satır satır float()/strptime yerine sütun bazında yapılır.
+
+Kandilli zamanları Türkiye yerel saatidir: timestamp naive UTC'ye çevrilir
+(diğer kaynaklarla aynı), date/time ham yerel değerler olarak kalır (event_id).
+"""
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+
+LIVE = 'live'
+ARCHIVE = 'archive'
+TXT = 'txt'
+
+# Canlı liste / arşiv sayfalarında ilk 6 satır başlık
+HEADER_LINES = 6
+
+# Sabit genişlikli bölgenin taranacak genişliği (tarih ... Mw + yer başlangıcı)
+LIVE_PREFIX_WIDTH = 96
+# Tarih+saat: "YYYY.MM.DD HH:MM:SS" -> ilk 19 karakter
+DATETIME_WIDTH = 19
+# Saat sonrası sabit sütunlar: Enlem Boylam Derinlik MD ML Mw
+LIVE_FIELDS = ('latitude', 'longitude', 'depth', 'md', 'ml', 'mw')
+LIVE_MAGNITUDES = ('mw', 'ml', 'md')
+
+# TXT sütunları:
+# 0: No, 1: Deprem Kodu, 2: Tarih, 3: Saat, 4: Enlem, 5: Boylam,
+# 6: Derinlik, 7: xM, 8: MD, 9: ML, 10: Mw, 11: Ms, 12: Mb, 13: Tip, 14: Yer
+TXT_COLUMNS = {
+    2: 'date', 3: 'time', 4: 'latitude', 5: 'longitude', 6: 'depth',
+    7: 'xm', 8: 'md', 9: 'ml', 10: 'mw', 11: 'ms', 12: 'mb', 14: 'location'
+}
+TXT_MAGNITUDES = ('mw', 'ms', 'mb', 'ml', 'md', 'xm')
+# Satır başına okunan alan sayısı; fazlası (sondaki TAB'lar, ek sütunlar) atılır
+TXT_FIELDS = 15
+
+# Kandilli yayın saat dilimi (2016 öncesi yaz saati uygulaması dahil)
+KANDILLI_TIMEZONE = 'Europe/Istanbul'
+
+OUTPUT_COLUMNS = ['date', 'time', 'timestamp', 'latitude', 'longitude', 'depth', 'magnitude', 'location']
+
+_SPACE, _DASH, _DOT, _COLON, _ZERO, _NINE = (ord(c) for c in ' -.:09')
+
+
+def _code_matrix(strings, width):
+    """String listesini (satır x karakter) unicode kod matrisine çevir (taşan kısım kesilir)"""
+    arr = np.array(strings, dtype=f'U{width}')
+    return arr.view(np.uint32).reshape(len(arr), width)
+
+
+def _fixed_float(codes):
+    """
+    Sabit genişlikli sayı alanını vektörel olarak float'a çevir
+    Rakam içermeyen alanlar ('-.-', boşluk) ve geçersiz karakterler NaN olur.
+    Tamsayı mantis / 10^ondalık ile hesaplandığı için float(str) ile aynı sonucu verir.
+    """
+    n, width = codes.shape
+    is_digit = (codes >= _ZERO) & (codes <= _NINE)
+    is_dot = codes == _DOT
+    is_dash = codes == _DASH
+    is_blank = (codes == _SPACE) | (codes == 0)
+
+    valid = (is_digit | is_dot | is_dash | is_blank).all(axis=1) & is_digit.any(axis=1)
+    valid &= is_dot.sum(axis=1) <= 1
+
+    digits = np.where(is_digit, codes.astype(np.int64) - _ZERO, 0)
+    # Her rakamın mantisteki basamak değeri: sağındaki rakam sayısı
+    digits_to_right = np.cumsum(is_digit[:, ::-1], axis=1)[:, ::-1] - is_digit
+    mantissa = (digits * 10 ** np.minimum(digits_to_right, 18)).sum(axis=1)
+
+    # Ondalık basamak sayısı: noktanın sağındaki rakamlar
+    after_dot = np.cumsum(is_dot, axis=1) > 0
+    decimals = (is_digit & after_dot).sum(axis=1)
+
+    values = mantissa / 10.0 ** decimals
+    values[is_dash.any(axis=1)] *= -1
+    values[~valid] = np.nan
+    return values
+
+
+def _datetimes(date_codes, time_codes):
+    """
+    'YYYY.MM.DD' ve 'HH:MM:SS' kod matrislerinden datetime64[s] dizisi üret
+    Geçersiz tarihler NaT olur
+    """
+    iso = np.concatenate([date_codes, np.full((len(date_codes), 1), ord('T'), dtype=np.uint32), time_codes], axis=1)
+    iso[:, 4] = _DASH
+    iso[:, 7] = _DASH
+    strings = np.ascontiguousarray(iso).view(f'U{DATETIME_WIDTH}').ravel()
+
+    try:
+        return strings.astype('datetime64[s]')
+    except ValueError:
+        # Nadir durum: en az bir geçersiz tarih var - satır bazında NaT'a düş
+        return pd.to_datetime(pd.Series(strings), format='%Y-%m-%dT%H:%M:%S', errors='coerce') \
+            .to_numpy(dtype='datetime64[s]')
+
+
+def _local_to_utc(timestamp):
+    """
+    Yerel (Europe/Istanbul) datetime64 dizisini naive UTC'ye çevir
+    datetime.replace(tzinfo=ZoneInfo(...)) ile aynı kurallar (fold=0): yaz
+    saatinden dönüşte iki kez yaşanan saat yaz saati sayılır, ileri alınışta
+    var olmayan saat bir saat ileri kaydırılır
+    """
+    local = pd.DatetimeIndex(timestamp).tz_localize(
+        KANDILLI_TIMEZONE, ambiguous=np.ones(len(timestamp), dtype=bool), nonexistent=pd.Timedelta(hours=1)
+    )
+    return local.tz_convert('UTC').tz_localize(None).to_numpy(dtype='datetime64[s]')
+
+
+def _select_magnitude(columns):
+    """Pozitif magnitude'lerin satır bazında maksimumu (hiçbiri yoksa NaN)"""
+    mags = np.column_stack(columns)
+    mags[~(mags > 0)] = -np.inf
+    best = mags.max(axis=1)
+    best[np.isneginf(best)] = np.nan
+    return best
+
+
+def _frame(date, time, timestamp, latitude, longitude, depth, magnitude, location):
+    """Geçerli satırları ortak çıktı DataFrame'ine topla"""
+    valid = (
+        ~np.isnan(magnitude) & ~np.isnan(latitude) & ~np.isnan(longitude)
+        & ~np.isnan(depth) & ~np.isnat(timestamp)
+    )
+    return pd.DataFrame({
+        'date': date[valid],
+        'time': time[valid],
+        'timestamp': _local_to_utc(timestamp[valid]),
+        'latitude': latitude[valid],
+        'longitude': longitude[valid],
+        'depth': depth[valid],
+        'magnitude': magnitude[valid],
+        'location': location[valid],
+    }, columns=OUTPUT_COLUMNS)
+
+
+def _empty():
+    return pd.DataFrame(columns=OUTPUT_COLUMNS)
+
+
+def _field_spans(codes):
+    """
+    Tüm satırlarda boşluk olan sütunlar alan ayırıcısıdır
+    Dönüş: (başlangıç, bitiş) alan aralıkları listesi
+    """
+    occupied = ~((codes == _SPACE) | (codes == 0)).all(axis=0)
+    edges = np.diff(np.concatenate([[0], occupied.astype(np.int8), [0]]))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def _single_token(codes):
+    """Her satırda alanın tam olarak bir kelime içerip içermediği (hizalama kontrolü)"""
+    filled = ~((codes == _SPACE) | (codes == 0))
+    starts = filled & ~np.concatenate([np.zeros((len(codes), 1), dtype=bool), filled[:, :-1]], axis=1)
+    return (starts.sum(axis=1) == 1).all()
+
+
+def parse_live_lines(lines):
+    """Canlı liste / arşiv veri satırlarını (başlıksız) DataFrame'e çevir"""
+    lines = [line.strip() for line in lines]
+    if not lines:
+        return _empty()
+
+    codes = _code_matrix(lines, LIVE_PREFIX_WIDTH)
+
+    # Veri satırları "YYYY.MM.DD HH:MM:SS" ile başlar
+    is_digit = (codes[:, :DATETIME_WIDTH] >= _ZERO) & (codes[:, :DATETIME_WIDTH] <= _NINE)
+    is_data = (
+        is_digit[:, [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]].all(axis=1)
+        & (codes[:, 4] == _DOT) & (codes[:, 7] == _DOT)
+        & (codes[:, 13] == _COLON) & (codes[:, 16] == _COLON)
+    )
+    rows = np.flatnonzero(is_data)
+    if rows.size == 0:
+        return _empty()
+
+    codes = codes[rows]
+    spans = _field_spans(codes[:, DATETIME_WIDTH:])
+
+    # 6 sayısal alan + yer adı bekleniyor; hizalama bozuksa toleranslı yola düş
+    field_codes = [
+        codes[:, DATETIME_WIDTH + start:DATETIME_WIDTH + end]
+        for start, end in spans[:len(LIVE_FIELDS)]
+    ]
+    if len(spans) <= len(LIVE_FIELDS) or not all(_single_token(field) for field in field_codes):
+        return _parse_live_tokens([lines[i] for i in rows])
+
+    fields = {name: _fixed_float(field) for name, field in zip(LIVE_FIELDS, field_codes)}
+
+    # Yer adı: Mw alanından sonrası, boşluklar tek boşluğa indirgenmiş
+    location_start = DATETIME_WIDTH + spans[len(LIVE_FIELDS) - 1][1]
+    location = np.array([' '.join(lines[i][location_start:].split()) for i in rows], dtype=object)
+
+    date_codes = codes[:, :10]
+    time_codes = codes[:, 11:DATETIME_WIDTH]
+
+    return _frame(
+        date=np.ascontiguousarray(date_codes).view('U10').ravel().astype(object),
+        time=np.ascontiguousarray(time_codes).view('U8').ravel().astype(object),
+        timestamp=_datetimes(date_codes, time_codes),
+        latitude=fields['latitude'],
+        longitude=fields['longitude'],
+        depth=fields['depth'],
+        magnitude=_select_magnitude([fields[name] for name in LIVE_MAGNITUDES]),
+        location=location,
+    )
+
+
+def _parse_live_tokens(lines):
+    """
+    Hizası bozuk sayfalar için boşlukla ayırma yolu
+    (Tarih Saat Enlem Boylam Derinlik MD ML Mw Yer)
+    """
+    tokens = [line.split(None, 8) for line in lines]
+    tokens = [parts + [''] * (9 - len(parts)) for parts in tokens if len(parts) >= 8]
+    if not tokens:
+        return _empty()
+
+    columns = list(zip(*tokens))
+    numeric = {
+        name: pd.to_numeric(pd.Series(columns[i + 2]), errors='coerce').to_numpy(dtype='float64')
+        for i, name in enumerate(LIVE_FIELDS)
+    }
+    date = np.array(columns[0], dtype=object)
+    time = np.array(columns[1], dtype=object)
+
+    return _frame(
+        date=date,
+        time=time,
+        timestamp=_datetimes(_code_matrix(columns[0], 10), _code_matrix(columns[1], 8)),
+        latitude=numeric['latitude'],
+        longitude=numeric['longitude'],
+        depth=numeric['depth'],
+        magnitude=_select_magnitude([numeric[name] for name in LIVE_MAGNITUDES]),
+        location=np.array([' '.join(value.split()) for value in columns[8]], dtype=object),
+    )
+
+
+def parse_txt_lines(lines):
+    """
+    TAB ayrımlı katalog satırlarını (başlıksız) DataFrame'e çevir
+    Eski satır satır parser gibi TXT_FIELDS'tan az alanlı satırlar atılır,
+    fazla alanlar (sondaki TAB'lar, ek sütunlar) kesilir: parçanın ilk
+    satırındaki farklı alan sayısı read_csv'de tüm dosyayı düşürmesin
+    """
+    text = '\n'.join(
+        '\t'.join(fields[:TXT_FIELDS])
+        for fields in (line.rstrip('\r\n').split('\t', TXT_FIELDS) for line in lines)
+        if len(fields) >= TXT_FIELDS
+    )
+    if not text.strip():
+        return _empty()
+
+    df = pd.read_csv(
+        io.StringIO(text), sep='\t', header=None, names=range(TXT_FIELDS),
+        usecols=list(TXT_COLUMNS), dtype={2: str, 3: str, 14: str},
+        quoting=csv.QUOTE_NONE, on_bad_lines='skip', skip_blank_lines=True, engine='c'
+    ).rename(columns=TXT_COLUMNS)
+
+    # Sayısal sütunlar C parser'da float olarak gelir; bozuk değer içerenler coerce edilir
+    numeric = {}
+    for name in ('latitude', 'longitude', 'depth') + TXT_MAGNITUDES:
+        column = df[name]
+        if column.dtype.kind not in 'fi':
+            column = pd.to_numeric(column, errors='coerce')
+        numeric[name] = column.to_numpy(dtype='float64')
+
+    dates = [value.strip() for value in df['date'].fillna('').tolist()]
+    # 05:16:19.20 -> 05:16:19 (U8'e kesilir)
+    times = [value.strip() for value in df['time'].fillna('').tolist()]
+    date_codes = _code_matrix(dates, 10)
+    time_codes = _code_matrix(times, 8)
+
+    location = df['location'].fillna('').str.strip().replace('', 'Bilinmiyor').to_numpy(dtype=object)
+
+    return _frame(
+        date=np.array(dates, dtype=object),
+        time=np.ascontiguousarray(time_codes).view('U8').ravel().astype(object),
+        timestamp=_datetimes(date_codes, time_codes),
+        latitude=numeric['latitude'],
+        longitude=numeric['longitude'],
+        depth=numeric['depth'],
+        magnitude=_select_magnitude([numeric[name] for name in TXT_MAGNITUDES]),
+        location=location,
+    )
+
+
+def parse(text, layout):
+    """
+    Bir içeriğin tamamını tek geçişte parse et
+    Dönüş: OUTPUT_COLUMNS sütunlu DataFrame
+    """
+    lines = text.split('\n')
+
+    if layout in (LIVE, ARCHIVE):
+        return parse_live_lines(lines[HEADER_LINES:])
+    if layout == TXT:
+        # İlk satır başlık
+        return parse_txt_lines(lines[1:])
+
+    raise ValueError(f"Bilinmeyen Kandilli formatı: {layout}")
+
+
+def to_records(df):
+    """DataFrame'i collector'ların kullandığı sözlük listesine çevir"""
+    if df.empty:
+        return []
+
+    columns = [
+        df[name].to_numpy(dtype='datetime64[us]').tolist() if name == 'timestamp' else df[name].tolist()
+        for name in OUTPUT_COLUMNS
+    ]
+    return [dict(zip(OUTPUT_COLUMNS, row)) for row in zip(*columns)]
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Kandilli TXT arşivleri için akış (streaming) tabanlı toplu içe aktarma
+- Dosya parça parça decode edilir, satır parçaları generator zinciri ile
+  vektörel parser'dan geçirilir
+  (dosya hiçbir zaman tamamen belleğe alınmaz)
+- Satırlar PostgreSQL COPY ile geçici bir staging tablosuna yüklenir
+- Staging tek bir INSERT ... SELECT ... ON CONFLICT ile earthquakes'e aktarılır
+  (farklı timestamp ile zaten kayıtlı event_id'ler atlanır - database/ingest.py)
+- Merge ingest ile aynı kilit altında ve aynı transaction'da eşleştirme, özet
+  tabloları ve veri sürümü güncellenir (upsert_earthquakes ile aynı sonuç)
+- Birden fazla dosya ayrı süreçlerde (process pool) paralel işlenir
+
+Kullanım:
+    python collectors/kandilli_txt_stream.py data/*.txt --workers 4
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import codecs
+import glob
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from collectors.import_kandilli_txt import to_event
+from collectors.kandilli_parser import parse_txt_lines, to_records
+
+SNIFF_BYTES = 64 * 1024
+CHUNK_LINES = 20000  # Vektörel parse için satır parçası boyutu
+COPY_COLUMNS = ('event_id', 'timestamp', 'latitude', 'longitude', 'magnitude', 'depth', 'location', 'source')
+
+STAGING_DDL = """
+    CREATE TEMP TABLE earthquakes_staging (
+        event_id VARCHAR,
+        timestamp TIMESTAMP,
+        latitude DOUBLE PRECISION,
+        longitude DOUBLE PRECISION,
+        magnitude DOUBLE PRECISION,
+        depth DOUBLE PRECISION,
+        location VARCHAR,
+        source VARCHAR
+    ) ON COMMIT DROP
+"""
+
+# Eklenen satırlar (saat başı, kaynak) kovalarına toplanarak döner: özet tabloları için
+MERGE_SQL = """
+    WITH merged AS (
+        INSERT INTO earthquakes (event_id, timestamp, latitude, longitude, magnitude, depth, location, source, created_at)
+        SELECT DISTINCT ON (event_id)
+            event_id, timestamp, latitude, longitude, magnitude, depth, location, source,
+            (now() AT TIME ZONE 'utc')
+        FROM earthquakes_staging
+        WHERE timestamp IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM earthquakes e
+              WHERE e.event_id = earthquakes_staging.event_id AND e.timestamp <> earthquakes_staging.timestamp
+          )
+        ORDER BY event_id
+        ON CONFLICT (event_id, timestamp) DO NOTHING
+        RETURNING timestamp, source
+    )
+    SELECT date_trunc('hour', timestamp), source, count(*)
+    FROM merged
+    GROUP BY 1, 2
+"""
+
+
+def _latin5_fallback(error):
+    """UTF-8 olarak çözülemeyen baytları U+FFFD yerine ISO-8859-9 olarak oku"""
+    return error.object[error.start:error.end].decode('ISO-8859-9'), error.end
+
+
+codecs.register_error('kandilli_latin5', _latin5_fallback)
+
+
+def detect_encoding(file_path):
+    """
+    İlk parçaya bakarak encoding seç
+    - Sadece ASCII ise belirsiz (Türkçe karakterler dosyanın ilerisinde olabilir):
+      Kandilli'nin varsayılanı ISO-8859-9
+    - ASCII dışı baytlar geçerli UTF-8 ise utf-8, değilse ISO-8859-9
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+
+    if head.isascii():
+        return 'ISO-8859-9'
+
+    try:
+        # Artımlı decoder parçanın sonunda yarım kalan çok baytlı karakteri tolere eder
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'ISO-8859-9'
+
+
+def iter_lines(file_path):
+    """
+    Dosyayı artımlı decode ederek satır satır oku (başlık satırı atlanır)
+    UTF-8 seçilip ilerde geçersiz bayt çıkarsa o baytlar ISO-8859-9 okunur
+    """
+    encoding = detect_encoding(file_path)
+
+    with open(file_path, 'rb') as raw:
+        stream = io.TextIOWrapper(raw, encoding=encoding, errors='kandilli_latin5', newline=None)
+        next(stream, None)  # İlk satır başlık
+        for line in stream:
+            yield line
+
+
+def iter_chunks(lines, size=CHUNK_LINES):
+    """Satırları sabit boyutlu parçalar halinde grupla"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_events(lines, stats):
+    """Satır parçalarını vektörel parser ile normalize edilmiş olaylara çevir"""
+    for chunk in iter_chunks(lines):
+        records = to_records(parse_txt_lines(chunk))
+        stats['parsed'] += len(records)
+        stats['errors'] += len(chunk) - len(records)
+        for eq_data in records:
+            yield to_event(eq_data)
+
+
+def _copy_value(value):
+    """COPY text formatı için tek bir değeri kaçışla"""
+    if value is None:
+        return '\\N'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat(sep=' ')
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+def iter_copy_rows(events):
+    """Olayları COPY text satırlarına (bytes) çevir"""
+    for event in events:
+        row = '\t'.join(_copy_value(event[col]) for col in COPY_COLUMNS)
+        yield (row + '\n').encode('utf-8')
+
+
+class IteratorFile:
+    """Bir bytes generator'ını COPY'nin okuyabileceği dosya benzeri nesneye çevir"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = bytearray()
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        if size < 0:
+            size = len(self._buffer)
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def import_file_copy(file_path):
+    """
+    Tek bir dosyayı COPY + set tabanlı merge ile içe aktar
+    Process pool worker'ı olarak da çağrılır
+    - COPY (parse) kilitsiz: dosyalar paralel yüklenir
+    - Merge ve sonrası database/ingest.py'nin kilidiyle sıralanır; yeni
+      kayıtlar eşleştirilir, etkilenen özet kovaları yeniden hesaplanır
+    """
+    from datetime import timedelta
+
+    from database.association import EventAssociator
+    from database.dialect import advisory_xact_lock
+    from database.ingest import ADVISORY_LOCK_KEY
+    from database.models import MaintenanceSession
+    from database.partitions import ensure_partitions_for
+    from database.rollups import CANONICAL_SOURCE, hour_bucket, refresh_rollups
+    from database.versions import EARTHQUAKES, bump
+
+    stats = {'file': os.path.basename(file_path), 'parsed': 0, 'errors': 0, 'inserted': 0}
+    started = time.perf_counter()
+
+    rows = iter_copy_rows(iter_events(iter_lines(file_path), stats))
+
+    # Toplu yükleme: süre sınırı yok (import_kandilli_txt ile aynı)
+    db = MaintenanceSession()
+    try:
+        # Session'ın bağlantısı: COPY ve merge aynı transaction'da
+        conn = db.connection().connection
+        with conn.cursor() as cur:
+            cur.execute(STAGING_DDL)
+            cur.copy_expert(
+                f"COPY earthquakes_staging ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT text)",
+                IteratorFile(rows)
+            )
+
+            # Dosyanın ayları için partition'lar (ayrı kısa transaction): geçmiş
+            # satırlar default partition'a düşmesin
+            cur.execute("SELECT min(timestamp), max(timestamp) FROM earthquakes_staging")
+            ensure_partitions_for(*cur.fetchone(), engine=db.get_bind())
+
+            advisory_xact_lock(db, ADVISORY_LOCK_KEY)
+            cur.execute(MERGE_SQL)
+            merged = cur.fetchall()
+
+        stats['inserted'] = sum(count for _, _, count in merged)
+        if stats['inserted']:
+            hours = {(hour, source) for hour, source, _ in merged if source}
+
+            buckets = [hour for hour, _, _ in merged]
+            associator = EventAssociator(db)
+            associator.associate(min(buckets), max(buckets) + timedelta(hours=1))
+            hours |= {(hour_bucket(ts), CANONICAL_SOURCE) for ts in associator.touched}
+
+            refresh_rollups(db, hours)
+            bump(db, EARTHQUAKES)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def import_files_parallel(file_paths, workers=None):
+    """Dosyaları ayrı süreçlerde paralel içe aktar"""
+    workers = workers or min(len(file_paths), os.cpu_count() or 1)
+
+    print("\n" + "="*60)
+    print("📥 KANDİLLİ TXT AKIŞ (COPY) İÇE AKTARMA")
+    print(f"   {len(file_paths)} dosya, {workers} süreç")
+    print("="*60)
+
+    started = time.perf_counter()
+    total_inserted = 0
+    failed = []
+
+    # spawn: her worker kendi engine'ini ve bağlantısını oluşturur
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {executor.submit(import_file_copy, path): path for path in file_paths}
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                failed.append(path)
+                print(f"   ❌ {os.path.basename(path)}: {e}")
+                continue
+
+            total_inserted += stats['inserted']
+            print(f"   ✅ {stats['file']}: {stats['parsed']:,} satır, "
+                  f"{stats['inserted']:,} yeni, {stats['errors']:,} hatalı ({stats['seconds']:.1f}s)")
+
+    print("\n" + "="*60)
+    print("📊 İÇE AKTARMA TAMAMLANDI")
+    print("="*60)
+    print(f"✅ İşlenen Dosya: {len(file_paths) - len(failed)}/{len(file_paths)}")
+    print(f"✅ Toplam Eklenen Deprem: {total_inserted:,}")
+    print(f"⏱️  Süre: {time.perf_counter() - started:.1f}s")
+    print("="*60 + "\n")
+
+    return total_inserted
+
+
+if __name__ == "__main__":
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Kandilli TXT akış içe aktarma (COPY)")
+    parser.add_argument('files', nargs='*', help="İçe aktarılacak .txt dosyaları (varsayılan: data/*.txt)")
+    parser.add_argument('--workers', type=int, default=None, help="Paralel süreç sayısı")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(parent_dir, 'data', '*.txt')))
+
+    if not files:
+        print("❌ İçe aktarılacak .txt dosyası bulunamadı!")
+    else:
+        import_files_parallel(files, workers=args.workers)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Paralel veri toplama
+- Kandilli, USGS ve AFAD aynı anda, sınırlı bir thread havuzunda çekilir
+- Her kaynağın kendi HTTP timeout'u ve toplam süre sınırı (deadline) vardır
+- Yavaş veya hata veren bir kaynak diğerlerini bekletmez; döngü süresi
+  kaynakların toplamı değil, en yavaş kaynak kadardır
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from collectors.cancellation import CycleToken, CollectionCancelled
+from collectors.http_client import retry_budget
+from collectors.kandilli_collector import KandilliCollector
+from collectors.usgs_collector import USGSCollector
+from collectors.afad_collector import AFADCollector
+
+# Kaynak başına ayarlar:
+# timeout  -> tek bir HTTP isteğinin timeout'u (saniye)
+# requests -> bir toplamada yapılan HTTP isteği sayısı
+# deadline -> retry'lar dahil kaynağın bitmesi için beklenecek en uzun süre;
+#             retry bütçesinden türetilir, böylece retry'daki kaynak
+#             yanlışlıkla 'timeout' sayılmaz
+WRITE_MARGIN = 30  # parse + veritabanı yazması için pay (saniye)
+
+SOURCE_SETTINGS = {
+    'Kandilli': {'timeout': 20, 'requests': 1},
+    'USGS': {'timeout': 30, 'requests': 1},
+    'AFAD': {'timeout': 30, 'requests': 1},
+}
+
+for _settings in SOURCE_SETTINGS.values():
+    _settings['deadline'] = _settings['requests'] * retry_budget(_settings['timeout']) + WRITE_MARGIN
+
+
+def _collect_kandilli(timeout, token):
+    KandilliCollector(timeout=timeout).collect(token=token)
+
+
+def _collect_usgs(timeout, token):
+    USGSCollector(timeout=timeout).collect(days=7, min_magnitude=2.5, token=token)
+
+
+def _collect_afad(timeout, token):
+    AFADCollector(timeout=timeout).collect(token=token)
+
+
+SOURCE_JOBS = {
+    'Kandilli': _collect_kandilli,
+    'USGS': _collect_usgs,
+    'AFAD': _collect_afad,
+}
+
+
+def _run_source(name, job, timeout, token):
+    """Tek bir kaynağı çalıştır, süre ve hatayı yakala"""
+    started = time.perf_counter()
+    try:
+        job(timeout, token)
+        return {'status': 'ok', 'seconds': time.perf_counter() - started}
+    except CollectionCancelled as e:
+        return {'status': 'cancelled', 'seconds': time.perf_counter() - started, 'error': str(e)}
+    except Exception as e:
+        return {'status': 'error', 'seconds': time.perf_counter() - started, 'error': str(e)}
+
+
+def collect_all_parallel(sources=None, max_workers=None):
+    """
+    Seçilen kaynakları paralel topla
+
+    sources: ['Kandilli', 'USGS', 'AFAD'] alt kümesi (None -> hepsi)
+    Dönüş: {kaynak: {'status': ok/error/timeout/cancelled, 'seconds': float, ...}}
+    """
+    sources = sources or list(SOURCE_JOBS)
+    max_workers = max_workers or len(sources)
+
+    started = time.perf_counter()
+    results = {}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='collector')
+    tokens = {name: CycleToken() for name in sources}
+    try:
+        futures = {
+            executor.submit(_run_source, name, SOURCE_JOBS[name], SOURCE_SETTINGS[name]['timeout'], tokens[name]): name
+            for name in sources
+        }
+
+        # Her kaynak kendi deadline'ına kadar beklenir; süresi dolan kaynak
+        # 'timeout' olarak işaretlenir ve diğerleri beklemeye devam eder
+        for future in sorted(futures, key=lambda f: SOURCE_SETTINGS[futures[f]]['deadline']):
+            name = futures[future]
+            remaining = SOURCE_SETTINGS[name]['deadline'] - (time.perf_counter() - started)
+            done, _ = wait([future], timeout=max(remaining, 0))
+
+            if done:
+                results[name] = future.result()
+            elif tokens[name].cancel():
+                # Worker henüz yazmadı ve artık yazamaz; thread arka planda
+                # HTTP timeout'u ile biter ama sonraki döngüye veri sokamaz
+                results[name] = {'status': 'timeout', 'seconds': time.perf_counter() - started}
+            else:
+                # Worker yazmaya başlamış: yarım bırakmak yerine bu döngüde bitir
+                results[name] = future.result()
+
+    finally:
+        # İptal edilen thread'leri bekleme - yazma hakları olmadığı için
+        # arka planda bitmeleri bir sonraki döngüyü etkilemez
+        for token in tokens.values():
+            token.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    total = time.perf_counter() - started
+
+    print("\n📊 Paralel toplama özeti:")
+    for name in sources:
+        result = results[name]
+        icon = '✅' if result['status'] == 'ok' else '⚠️'
+        line = f"   {icon} {name:10s} {result['status']:8s} {result['seconds']:.1f}s"
+        if result.get('error'):
+            line += f" - {result['error']}"
+        print(line)
+    print(f"   ⏱️  Toplam süre: {total:.1f}s")
+
+    return results
+
+
+if __name__ == "__main__":
+    collect_all_parallel()
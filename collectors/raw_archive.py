@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Ham yanıt arşivi (content-addressed)
+- Collector'ların indirdiği her yanıt gzip'lenip sha256'sı ile saklanır,
+  aynı içerik diske bir kez yazılır
+- Her indirme manifest.jsonl'e bir satır ekler (kaynak, URL, zaman, özet)
+- Parser düzeltmesinden sonra collectors/replay.py ile ağa çıkmadan
+  yeniden işlenebilir
+
+Ayarlar (.env):
+    RAW_ARCHIVE=1              # arşivlemeyi aç (varsayılan kapalı: saklama süresi yok,
+                               # her sorgu yanıtı diske eklenir - kalıcı disk ve temizlik gerekir)
+    RAW_ARCHIVE_DIR=data/raw   # arşiv dizini
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'raw')
+MANIFEST_NAME = 'manifest.jsonl'
+
+_manifest_lock = threading.Lock()
+
+
+def archive_dir():
+    return os.getenv('RAW_ARCHIVE_DIR') or DEFAULT_DIR
+
+
+def is_enabled():
+    return os.getenv('RAW_ARCHIVE', '0').lower() in ('1', 'true', 'yes')
+
+
+def blob_path(digest, root=None):
+    """sha256 -> blobs/ab/abcdef....gz (dizin başına dosya sayısı sınırlı kalsın)"""
+    return os.path.join(root or archive_dir(), 'blobs', digest[:2], f"{digest}.gz")
+
+
+def store(source, payload, url=None, params=None, meta=None):
+    """
+    Ham yanıtı arşivle
+    Arşiv hatası toplamayı durdurmaz; başarısızsa None döner
+
+    Dönüş: içerik sha256'sı
+    """
+    if not is_enabled() or payload is None:
+        return None
+
+    digest = hashlib.sha256(payload).hexdigest()
+    root = archive_dir()
+
+    try:
+        path = blob_path(digest, root)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Önce geçici dosyaya yaz: yarım kalan blob asla geçerli görünmesin
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                # mtime=0: aynı içerik her zaman aynı gzip baytlarını üretir
+                f.write(gzip.compress(payload, mtime=0))
+            os.replace(tmp_path, path)
+
+        entry = {
+            'sha256': digest,
+            'source': source,
+            'url': url,
+            'params': params,
+            'meta': meta or {},
+            'size': len(payload),
+            'fetched_at': datetime.utcnow().isoformat(timespec='seconds'),
+        }
+        with _manifest_lock:
+            with open(os.path.join(root, MANIFEST_NAME), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+
+    except OSError as e:
+        print(f"⚠️  Ham yanıt arşivlenemedi ({source}): {e}")
+        return None
+
+    return digest
+
+
+def load(digest, root=None):
+    """Arşivlenmiş ham yanıtı byte olarak getir"""
+    with open(blob_path(digest, root), 'rb') as f:
+        return gzip.decompress(f.read())
+
+
+def iter_manifest(root=None, sources=None, since=None):
+    """
+    Manifest kayıtlarını eskiden yeniye üret
+    sources: kaynak adı kümesi, since: bu zamandan (datetime) sonra indirilenler
+    """
+    path = os.path.join(root or archive_dir(), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Yarım yazılmış son satır
+
+            if sources and entry.get('source') not in sources:
+                continue
+            if since is not None and datetime.fromisoformat(entry['fetched_at']) < since:
+                continue
+            yield entry
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Ham yanıt arşivinden ağsız yeniden işleme (replay)
+- Manifest'teki yanıtlar arşivden okunur, güncel parser'lardan geçirilir
+  ve toplu upsert ile yazılır (KOERI/USGS/AFAD'a istek atılmaz)
+- Aynı içerik (sha256) bir çalıştırmada yalnızca bir kez işlenir
+- Parser düzeltmelerinden sonra --update ile mevcut kayıtlar da düzeltilir
+- Arşiv collector'larda RAW_ARCHIVE=1 ile açılır (collectors/raw_archive.py)
+
+Kullanım:
+    python collectors/replay.py                                  # tüm arşiv
+    python collectors/replay.py --source kandilli_archive --update
+    python collectors/replay.py --since 2025-01-01 --dry-run
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from datetime import datetime
+
+from collectors import raw_archive
+from collectors.afad_collector import AFADCollector
+from collectors.kandilli_archive import KandilliArchiveScraper
+from collectors.kandilli_collector import KandilliCollector
+from collectors.usgs_collector import USGSCollector
+from database.ingest import upsert_earthquakes
+
+SOURCES = ('kandilli', 'kandilli_archive', 'usgs', 'afad')
+
+
+class Replayer:
+    """Arşivlenmiş yanıtları kaynağına göre parse edip normalize olaylara çevir"""
+
+    def __init__(self):
+        # Session'lar oluşturulur ama hiç kullanılmaz (ağ erişimi yok)
+        self.kandilli = KandilliCollector()
+        self.archive = KandilliArchiveScraper()
+        self.usgs = USGSCollector()
+        self.afad = AFADCollector()
+
+    def events(self, entry, raw):
+        """Tek bir manifest kaydını normalize edilmiş olay listesine çevir"""
+        source = entry['source']
+
+        if source == 'kandilli':
+            earthquakes = self.kandilli.parse_lines(self.kandilli.data_lines(raw))
+            return [self.kandilli.to_event(eq) for eq in earthquakes]
+
+        if source == 'kandilli_archive':
+            year, month = entry['meta']['year'], entry['meta']['month']
+            earthquakes = self.archive.parse_archive_text(self.archive.decode(raw))
+            return [self.archive.to_event(eq, year, month) for eq in earthquakes]
+
+        if source == 'usgs':
+            earthquakes, _ = self.usgs.parse_features(self.usgs.features_from_payload(raw))
+            return earthquakes
+
+        if source == 'afad':
+            items = self.afad.items_from_payload(raw)
+            return [event for event in map(self.afad.to_event, items) if event]
+
+        raise ValueError(f"Bilinmeyen kaynak: {source}")
+
+
+def replay(sources=None, since=None, update=False, dry_run=False, root=None):
+    """
+    Arşivi yeniden işle
+    Dönüş: {'payloads': n, 'events': n, 'inserted': n, 'updated': n, 'failed': n}
+    """
+    print("\n" + "="*60)
+    print("🔁 HAM ARŞİVDEN YENİDEN İŞLEME")
+    print(f"   Arşiv: {root or raw_archive.archive_dir()}")
+    print("="*60)
+
+    replayer = Replayer()
+    stats = {'payloads': 0, 'events': 0, 'inserted': 0, 'updated': 0, 'failed': 0}
+    seen = set()
+    started = time.perf_counter()
+
+    for entry in raw_archive.iter_manifest(root=root, sources=sources, since=since):
+        key = (entry['source'], entry['sha256'])
+        if key in seen:
+            continue
+        seen.add(key)
+
+        try:
+            events = replayer.events(entry, raw_archive.load(entry['sha256'], root))
+        except Exception as e:
+            stats['failed'] += 1
+            print(f"   ❌ {entry['source']} {entry['sha256'][:12]}: {e}")
+            continue
+
+        stats['payloads'] += 1
+        stats['events'] += len(events)
+
+        if dry_run or not events:
+            continue
+
+        result = upsert_earthquakes(events, update=update)
+        stats['inserted'] += result['inserted']
+        stats['updated'] += result['updated']
+
+    print("\n" + "="*60)
+    print("📊 YENİDEN İŞLEME TAMAMLANDI")
+    print("="*60)
+    print(f"📦 İşlenen yanıt: {stats['payloads']:,} (hatalı: {stats['failed']})")
+    print(f"🔎 Parse edilen deprem: {stats['events']:,}")
+    if dry_run:
+        print("🧪 Dry-run: veritabanına yazılmadı")
+    else:
+        print(f"✅ Yeni: {stats['inserted']:,}, güncellenen: {stats['updated']:,}")
+    print(f"⏱️  Süre: {time.perf_counter() - started:.1f}s")
+    print("="*60 + "\n")
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ham yanıt arşivinden yeniden işleme")
+    parser.add_argument('--source', action='append', choices=SOURCES, help="Sadece bu kaynak (tekrarlanabilir)")
+    parser.add_argument('--since', help="Bu tarihten sonra indirilenler (YYYY-MM-DD)")
+    parser.add_argument('--update', action='store_true', help="Mevcut kayıtları da güncelle (parser düzeltmesi)")
+    parser.add_argument('--dry-run', action='store_true', help="Sadece parse et, veritabanına yazma")
+    parser.add_argument('--dir', help="Arşiv dizini (varsayılan: RAW_ARCHIVE_DIR veya data/raw)")
+    args = parser.parse_args()
+
+    replay(
+        sources=set(args.source) if args.source else None,
+        since=datetime.fromisoformat(args.since) if args.since else None,
+        update=args.update,
+        dry_run=args.dry_run,
+        root=args.dir,
+    )
@@ -3,15 +3,26 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import requests
+from collectors import raw_archive
+from collectors.cancellation import claim
+from collectors.http_client import get_session
 from datetime import datetime, timedelta, timezone
-from database.models import Earthquake, SessionLocal
+from database.models import SessionLocal
+from database.ingest import upsert_earthquakes
+from database.cursors import get_cursor
 import hashlib
+import json
 
 class USGSCollector:
-    def __init__(self):
+    def __init__(self, session=None, timeout=30):
         self.base_url = "https://earthquake.usgs.gov/fdsnws/event/1/query"
         self.source = "USGS"
+        self.session = session or get_session('usgs')
+        self.timeout = timeout
+        
+        # Artımlı toplama imleci ve güvenlik payı (geç gelen güncellemeler için)
+        self.cursor_name = 'usgs'
+        self.cursor_overlap = timedelta(minutes=10)
         
         # Türkiye sınırları (yaklaşık)
         self.min_latitude = 36.0
@@ -27,125 +38,177 @@ class USGSCollector:
         unique_string = f"usgs-{timestamp}-{lat:.3f}-{lon:.3f}-{magnitude:.1f}"
         return hashlib.md5(unique_string.encode()).hexdigest()[:16]
     
-    def collect(self, days=7, min_magnitude=2.5):
-        """USGS'den veri topla"""
+    def plan_window(self, cursor, now, days):
+        """
+        Sorgu penceresini belirle
+        - Soğuk başlangıç veya pencereden eski imleç (boşluk) -> tam pencere
+        - Aksi halde: sadece son çalıştırmadan beri güncellenenler (updatedafter)
+        """
+        start_time = now - timedelta(days=days)
+        
+        hwm = cursor.high_water_mark if cursor else None
+        last_success = cursor.last_success_at if cursor else None
+        
+        if hwm is None or last_success is None:
+            return start_time, None, 'cold-start'
+        
+        hwm = hwm.replace(tzinfo=timezone.utc)
+        last_success = last_success.replace(tzinfo=timezone.utc)
+        
+        if last_success < start_time or hwm < start_time:
+            return start_time, None, 'gap'
+        
+        return start_time, hwm - self.cursor_overlap, 'incremental'
+    
+    def fetch_features(self, start_time, end_time, min_magnitude, updated_after=None):
+        """FDSN sorgusunu çalıştır ve GeoJSON feature listesini döndür"""
+        # API parametreleri
+        params = {
+            'format': 'geojson',
+            'starttime': start_time.isoformat(),
+            'endtime': end_time.isoformat(),
+            'minlatitude': self.min_latitude,
+            'maxlatitude': self.max_latitude,
+            'minlongitude': self.min_longitude,
+            'maxlongitude': self.max_longitude,
+            'minmagnitude': min_magnitude,
+            'orderby': 'time-asc'
+        }
+        if updated_after is not None:
+            params['updatedafter'] = updated_after.isoformat()
+        
+        # API isteği
+        response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        raw_archive.store('usgs', response.content, url=self.base_url, params=params)
+        
+        return self.features_from_payload(response.content)
+    
+    def features_from_payload(self, raw):
+        """Ham GeoJSON yanıtından feature listesini çıkar (replay de kullanır)"""
+        data = json.loads(raw)
+        return data.get('features', [])
+    
+    def parse_features(self, features):
+        """
+        GeoJSON feature'larını normalize edilmiş olaylara çevir
+        Dönüş: (earthquakes, en yeni 'updated' zamanı veya None)
+        """
+        earthquakes = []
+        max_updated_ms = None
+        
+        for feature in features:
+            try:
+                props = feature['properties']
+                coords = feature['geometry']['coordinates']
+                
+                # Timestamp (milisaniye)
+                timestamp_ms = props['time']
+                dt_utc = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+                
+                # Koordinatlar
+                lat = coords[1]
+                lon = coords[0]
+                depth = coords[2]
+                magnitude = props['mag']
+                
+                # Event ID oluştur (timestamp + konum + büyüklük)
+                event_id = self.generate_event_id(dt_utc, lat, lon, magnitude)
+                
+                earthquake = {
+                    'event_id': event_id,
+                    'timestamp': dt_utc,
+                    'latitude': lat,
+                    'longitude': lon,
+                    'depth': depth,
+                    'magnitude': magnitude,
+                    'location': props.get('place', 'Unknown'),
+                    'source': self.source
+                }
+                
+                earthquakes.append(earthquake)
+                
+                updated_ms = props.get('updated') or timestamp_ms
+                if max_updated_ms is None or updated_ms > max_updated_ms:
+                    max_updated_ms = updated_ms
+                
+            except (KeyError, ValueError, IndexError, TypeError):
+                continue
+        
+        max_updated = None
+        if max_updated_ms is not None:
+            max_updated = datetime.fromtimestamp(max_updated_ms / 1000, tz=timezone.utc)
+        
+        return earthquakes, max_updated
+    
+    def collect(self, days=7, min_magnitude=2.5, incremental=True, token=None):
+        """
+        USGS'den veri topla
+        incremental=True: kalıcı imleç ile sadece değişenleri çek
+        token: paralel toplayıcının CycleToken'ı (yazmadan önce claim edilir)
+        Hata çağırana iletilir (paralel toplayıcı 'error' olarak raporlar)
+        """
         print("\n" + "="*50)
         print("🚀 USGS Deprem Verisi Toplama Başladı")
         print("="*50)
         
+        db = SessionLocal()
+        
         try:
             # Tarih aralığı
             end_time = datetime.now(timezone.utc)
-            start_time = end_time - timedelta(days=days)
+            cursor = get_cursor(db, self.cursor_name) if incremental else None
+            start_time, updated_after, mode = self.plan_window(cursor, end_time, days)
             
             print("🌍 USGS'den veri çekiliyor...")
             print(f"   📅 Tarih aralığı: {start_time.strftime('%Y-%m-%d')} - {end_time.strftime('%Y-%m-%d')}")
             print(f"   📊 Min. büyüklük: {min_magnitude}")
+            if updated_after is not None:
+                print(f"   🔁 Artımlı: {updated_after.strftime('%Y-%m-%d %H:%M:%S')} sonrası güncellenenler")
+            else:
+                print(f"   📦 Tam pencere ({mode})")
             
-            # API parametreleri
-            params = {
-                'format': 'geojson',
-                'starttime': start_time.isoformat(),
-                'endtime': end_time.isoformat(),
-                'minlatitude': self.min_latitude,
-                'maxlatitude': self.max_latitude,
-                'minlongitude': self.min_longitude,
-                'maxlongitude': self.max_longitude,
-                'minmagnitude': min_magnitude,
-                'orderby': 'time-asc'
-            }
-            
-            # API isteği
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            features = data.get('features', [])
+            features = self.fetch_features(start_time, end_time, min_magnitude, updated_after)
+            earthquakes, max_updated = self.parse_features(features)
             
-            earthquakes = []
+            print(f"✅ {len(earthquakes)} deprem verisi alındı")
             
-            for feature in features:
-                try:
-                    props = feature['properties']
-                    coords = feature['geometry']['coordinates']
-                    
-                    # Timestamp (milisaniye)
-                    timestamp_ms = props['time']
-                    dt_utc = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
-                    
-                    # Koordinatlar
-                    lat = coords[1]
-                    lon = coords[0]
-                    depth = coords[2]
-                    magnitude = props['mag']
-                    
-                    # Event ID oluştur (timestamp + konum + büyüklük)
-                    event_id = self.generate_event_id(dt_utc, lat, lon, magnitude)
-                    
-                    earthquake = {
-                        'event_id': event_id,
-                        'timestamp': dt_utc,
-                        'latitude': lat,
-                        'longitude': lon,
-                        'depth': depth,
-                        'magnitude': magnitude,
-                        'location': props.get('place', 'Unknown'),
-                        'source': self.source
-                    }
-                    
-                    earthquakes.append(earthquake)
-                    
-                except (KeyError, ValueError, IndexError) as e:
-                    continue
+            # Veritabanına kaydet - imleç aynı transaction'da ilerler
+            claim(token)
+            self.save_to_database(earthquakes, db=db)
             
-            print(f"✅ {len(earthquakes)} deprem verisi alındı")
+            if cursor is not None:
+                if max_updated is not None:
+                    new_hwm = max_updated.replace(tzinfo=None)
+                    if cursor.high_water_mark is None or new_hwm > cursor.high_water_mark:
+                        cursor.high_water_mark = new_hwm
+                elif cursor.high_water_mark is None:
+                    # Boş tam pencere: bir sonraki çalıştırma artımlı başlayabilsin
+                    cursor.high_water_mark = end_time.replace(tzinfo=None)
+                cursor.last_success_at = end_time.replace(tzinfo=None)
             
-            # Veritabanına kaydet
-            self.save_to_database(earthquakes)
+            db.commit()
             
             print("="*50 + "\n")
             
             return earthquakes
             
         except Exception as e:
+            db.rollback()
             print(f"❌ USGS veri toplama hatası: {e}")
             print("="*50 + "\n")
-            return []
-    
-    def save_to_database(self, earthquakes):
-        """Depremleri veritabanına kaydet"""
-        db = SessionLocal()
-        
-        try:
-            new_count = 0
-            existing_count = 0
-            
-            for eq_data in earthquakes:
-                # Event ID ile kontrol et
-                existing = db.query(Earthquake).filter(
-                    Earthquake.event_id == eq_data['event_id']
-                ).first()
-                
-                if not existing:
-                    # Yeni deprem ekle
-                    earthquake = Earthquake(**eq_data)
-                    db.add(earthquake)
-                    new_count += 1
-                else:
-                    existing_count += 1
-            
-            # Commit
-            db.commit()
-            
-            print("💾 Veritabanına kaydedildi:")
-            print(f"   ✅ {new_count} yeni deprem")
-            print(f"   ⏭️  {existing_count} zaten mevcut")
-            
-        except Exception as e:
-            print(f"❌ Veritabanı kayıt hatası: {e}")
-            db.rollback()
+            raise
         finally:
             db.close()
+    
+    def save_to_database(self, earthquakes, db=None):
+        """Depremleri veritabanına kaydet (tek toplu upsert)"""
+        result = upsert_earthquakes(earthquakes, db=db)
+        
+        print("💾 Veritabanına kaydedildi:")
+        print(f"   ✅ {result['inserted']} yeni deprem")
+        print(f"   ⏭️  {result['skipped']} zaten mevcut")
+        return result
 
 if __name__ == "__main__":
     collector = USGSCollector()
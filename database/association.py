@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+Kaynaklar Arası Olay Eşleştirme (Deduplication)
+- Aynı fiziksel deprem Kandilli, AFAD ve USGS'ten ayrı ayrı gelir
+- Zaman + mesafe toleransı içindeki kayıtlar tek bir tekil olayda
+  (canonical_events) birleştirilir, her kaynak kaydı event_origins ile bağlanır
+- Zamanlar her kaynakta naive UTC (Kandilli'nin yerel saati parser'da çevrilir),
+  tolerans doğrudan uygulanır
+- Adaylar zaman kovası + enlem/boylam hücresi indeksinden bulunur;
+  her kayıt yalnızca komşu hücrelere bakar, batch başına O(n)
+- Ingest (database/ingest.py) aynı transaction'da çağırır; CLI ve zamanlanmış
+  çalıştırma analyzers/event_association.py'de
+"""
+import math
+from datetime import datetime, timedelta
+
+from database.dialect import advisory_xact_lock, insert_for
+from database.models import CanonicalEvent, Earthquake, EventOrigin
+from database.spatial import haversine_km
+
+TIME_TOLERANCE_S = 60  # Kaynaklar arası oluş zamanı farkı
+DISTANCE_TOLERANCE_KM = 50.0  # Kaynaklar arası episantr farkı
+KM_PER_DEGREE = 111.2
+EPOCH = datetime(1970, 1, 1)
+
+# Tekil olayın değerleri en öncelikli kaynaktan alınır (küçük = öncelikli)
+SOURCE_PRIORITY = {
+    'Kandilli': 0,
+    'Kandilli_Archive': 1,
+    'Kandilli_Manual': 2,
+    'AFAD': 3,
+    'USGS': 4,
+}
+
+# Eşzamanlı collector'lar aynı olayı iki kez tekilleştirmesin
+ADVISORY_LOCK_KEY = 80080801
+
+# Tercih edilen kayıttan tekil olaya kopyalanan değerler
+PREFERRED_COLUMNS = ('timestamp', 'latitude', 'longitude', 'magnitude', 'depth', 'location')
+REFRESH_BATCH_SIZE = 1000
+
+
+def source_rank(source):
+    return SOURCE_PRIORITY.get(source, len(SOURCE_PRIORITY))
+
+
+def to_epoch(timestamp):
+    """Naive UTC datetime -> saniye (yerel saat dilimine bakmadan)"""
+    return (timestamp - EPOCH).total_seconds()
+
+
+class _Candidate:
+    """İndeksteki tekil olay (mevcut veya bu çalıştırmada yeni)"""
+
+    __slots__ = ('canonical', 'epoch', 'latitude', 'longitude', 'sources', 'rank')
+
+    def __init__(self, canonical):
+        self.canonical = canonical
+        self.sources = set(filter(None, (canonical.sources or '').split(',')))
+        self.rank = source_rank(canonical.preferred_source)
+        self.refresh()
+
+    def refresh(self):
+        self.epoch = to_epoch(self.canonical.timestamp)
+        self.latitude = self.canonical.latitude
+        self.longitude = self.canonical.longitude
+
+
+class SpatioTemporalIndex:
+    """
+    Zaman kovası + enlem/boylam hücresi -> aday listesi
+    Kova genişliği toleranslara eşit, bu yüzden bir eşleşme her zaman
+    komşu (±1) kovalardadır; boylam komşuluğu enleme göre genişletilir
+    """
+
+    def __init__(self, time_tolerance_s, distance_km):
+        self.time_tolerance_s = time_tolerance_s
+        self.distance_km = distance_km
+        self.cell_deg = distance_km / KM_PER_DEGREE
+        self.buckets = {}
+
+    def _key(self, epoch, latitude, longitude):
+        return (
+            math.floor(epoch / self.time_tolerance_s),
+            math.floor(latitude / self.cell_deg),
+            math.floor(longitude / self.cell_deg),
+        )
+
+    def add(self, candidate):
+        key = self._key(candidate.epoch, candidate.latitude, candidate.longitude)
+        self.buckets.setdefault(key, []).append(candidate)
+
+    def move(self, candidate):
+        """Tercih edilen kaynak değişince adayı yeni hücresine taşı"""
+        old_key = self._key(candidate.epoch, candidate.latitude, candidate.longitude)
+        self.buckets[old_key].remove(candidate)
+        candidate.refresh()
+        self.add(candidate)
+
+    def neighbours(self, epoch, latitude, longitude):
+        t, y, x = self._key(epoch, latitude, longitude)
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        lon_span = math.ceil(1 / cos_lat)
+
+        for dt in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dx in range(-lon_span, lon_span + 1):
+                    yield from self.buckets.get((t + dt, y + dy, x + dx), ())
+
+
+class EventAssociator:
+    """Bağlanmamış earthquakes kayıtlarını tekil olaylara eşleştir"""
+
+    def __init__(self, db, time_tolerance_s=TIME_TOLERANCE_S, distance_km=DISTANCE_TOLERANCE_KM):
+        self.db = db
+        self.time_tolerance_s = time_tolerance_s
+        self.distance_km = distance_km
+        # Oluşturulan/taşınan tekil olayların (eski ve yeni) zamanları - özet tabloları için
+        self.touched = set()
+
+    def _unlinked(self, since, until):
+        query = self.db.query(Earthquake).outerjoin(
+            EventOrigin, EventOrigin.event_id == Earthquake.event_id
+        ).filter(
+            EventOrigin.event_id.is_(None),
+            Earthquake.timestamp.isnot(None),
+            Earthquake.latitude.isnot(None),
+            Earthquake.longitude.isnot(None),
+        )
+        if since is not None:
+            query = query.filter(Earthquake.timestamp >= since)
+        if until is not None:
+            query = query.filter(Earthquake.timestamp <= until)
+        return query.order_by(Earthquake.timestamp).all()
+
+    def _load_index(self, start, end):
+        index = SpatioTemporalIndex(self.time_tolerance_s, self.distance_km)
+        margin = timedelta(seconds=self.time_tolerance_s)
+
+        canonicals = self.db.query(CanonicalEvent).filter(
+            CanonicalEvent.timestamp >= start - margin,
+            CanonicalEvent.timestamp <= end + margin
+        ).all()
+
+        for canonical in canonicals:
+            index.add(_Candidate(canonical))
+        return index
+
+    def _best_match(self, index, eq, epoch):
+        """Tolerans içindeki, bu kaynağı henüz içermeyen en yakın aday"""
+        best, best_score, best_dt, best_km = None, None, None, None
+
+        for candidate in index.neighbours(epoch, eq.latitude, eq.longitude):
+            if eq.source in candidate.sources:
+                continue  # Aynı kaynağın iki kaydı ayrı depremlerdir
+
+            dt = abs(candidate.epoch - epoch)
+            if dt > self.time_tolerance_s:
+                continue
+
+            km = haversine_km(eq.latitude, eq.longitude, candidate.latitude, candidate.longitude)
+            if km > self.distance_km:
+                continue
+
+            score = dt / self.time_tolerance_s + km / self.distance_km
+            if best_score is None or score < best_score:
+                best, best_score, best_dt, best_km = candidate, score, dt, km
+
+        return best, best_dt, best_km
+
+    @staticmethod
+    def _prefer(canonical, eq):
+        canonical.timestamp = eq.timestamp
+        canonical.latitude = eq.latitude
+        canonical.longitude = eq.longitude
+        canonical.magnitude = eq.magnitude
+        canonical.depth = eq.depth
+        canonical.location = eq.location
+        canonical.preferred_source = eq.source
+        canonical.preferred_event_id = eq.event_id
+        canonical.preferred_earthquake_id = eq.id
+
+    def _refresh_batch(self, event_ids):
+        canonical_ids = [
+            canonical_id for (canonical_id,) in
+            self.db.query(EventOrigin.canonical_id).filter(EventOrigin.event_id.in_(event_ids)).distinct()
+        ]
+        if not canonical_ids:
+            return []
+
+        members = {}
+        for origin, eq in self.db.query(EventOrigin, Earthquake).join(
+            Earthquake, Earthquake.event_id == EventOrigin.event_id
+        ).filter(EventOrigin.canonical_id.in_(canonical_ids)):
+            members.setdefault(origin.canonical_id, []).append((origin, eq))
+
+        freed = []
+        for canonical in self.db.query(CanonicalEvent).filter(CanonicalEvent.id.in_(canonical_ids)):
+            group = members.get(canonical.id, [])
+
+            preferred = next((eq for _, eq in group if eq.event_id == canonical.preferred_event_id), None)
+            if preferred is not None and any(
+                getattr(canonical, col) != getattr(preferred, col) for col in PREFERRED_COLUMNS
+            ):
+                self.touched.add(canonical.timestamp)
+                self._prefer(canonical, preferred)
+                self.touched.add(canonical.timestamp)
+
+            epoch = to_epoch(canonical.timestamp)
+            deltas = [
+                (origin, abs(to_epoch(eq.timestamp) - epoch),
+                 haversine_km(eq.latitude, eq.longitude, canonical.latitude, canonical.longitude))
+                for origin, eq in group
+            ]
+
+            if any(dt > self.time_tolerance_s or km > self.distance_km for _, dt, km in deltas):
+                # Üyeler artık aynı deprem sayılmaz: grubu çöz, associate() yeniden kursun
+                self.touched.add(canonical.timestamp)
+                freed.extend(eq.timestamp for _, eq in group)
+                for origin, _, _ in deltas:
+                    self.db.delete(origin)
+                self.db.delete(canonical)
+                continue
+
+            for origin, dt, km in deltas:
+                origin.time_delta_s = dt
+                origin.distance_km = km
+
+        return freed
+
+    def refresh(self, event_ids):
+        """
+        Değerleri güncellenen (ingest update=True) kayıtların tekil olaylarını yenile
+        - Tercih edilen kayıt değiştiyse tekil olay yeni değerleri alır
+        - Üyelerin zaman/mesafe farkları yeniden hesaplanır; tolerans dışına
+          düşen üye varsa tekil olay silinir, kayıtları associate() yeniden eşleştirir
+        Commit çağıran tarafa aittir
+
+        Dönüş: serbest kalan kayıtların zamanları (associate penceresi için)
+        """
+        advisory_xact_lock(self.db, ADVISORY_LOCK_KEY)
+
+        event_ids = list(event_ids)
+        freed = []
+        for i in range(0, len(event_ids), REFRESH_BATCH_SIZE):
+            freed.extend(self._refresh_batch(event_ids[i:i + REFRESH_BATCH_SIZE]))
+
+        # Silinen tekil olaylar associate() okumadan önce veritabanından kalkmalı
+        self.db.flush()
+        return freed
+
+    def associate(self, since=None, until=None):
+        """
+        Pencere içindeki bağlanmamış kayıtları eşleştir
+        Commit çağıran tarafa aittir (ingest ile aynı transaction)
+
+        Dönüş: {'linked': n, 'created': n}
+        """
+        result = {'linked': 0, 'created': 0}
+
+        advisory_xact_lock(self.db, ADVISORY_LOCK_KEY)
+
+        earthquakes = self._unlinked(since, until)
+        if not earthquakes:
+            return result
+
+        index = self._load_index(earthquakes[0].timestamp, earthquakes[-1].timestamp)
+        links = []  # (earthquake, candidate, dt, km)
+
+        for eq in earthquakes:
+            epoch = to_epoch(eq.timestamp)
+            candidate, dt, km = self._best_match(index, eq, epoch)
+
+            if candidate is None:
+                canonical = CanonicalEvent(source_count=0, sources='')
+                self._prefer(canonical, eq)
+                self.db.add(canonical)
+                self.touched.add(canonical.timestamp)
+
+                candidate = _Candidate(canonical)
+                index.add(candidate)
+                dt, km = 0.0, 0.0
+                result['created'] += 1
+            else:
+                result['linked'] += 1
+
+                if source_rank(eq.source) < candidate.rank:
+                    self.touched.add(candidate.canonical.timestamp)
+                    self._prefer(candidate.canonical, eq)
+                    self.touched.add(eq.timestamp)
+                    candidate.rank = source_rank(eq.source)
+                    index.move(candidate)
+
+            candidate.sources.add(eq.source)
+            candidate.canonical.sources = ','.join(sorted(candidate.sources, key=source_rank))
+            candidate.canonical.source_count = len(candidate.sources)
+            links.append((eq, candidate, dt, km))
+
+        # Yeni tekil olayların id'leri için
+        self.db.flush()
+
+        rows = [
+            {
+                'event_id': eq.event_id,
+                'canonical_id': candidate.canonical.id,
+                'source': eq.source,
+                'time_delta_s': dt,
+                'distance_km': km,
+                'created_at': datetime.utcnow(),
+            }
+            for eq, candidate, dt, km in links
+        ]
+        self.db.execute(
+            insert_for(self.db, EventOrigin).values(rows).on_conflict_do_nothing(index_elements=['event_id'])
+        )
+
+        return result
+
+    def rebuild(self, since, until=None):
+        """Penceredeki tekil olayları silip baştan eşleştir"""
+        advisory_xact_lock(self.db, ADVISORY_LOCK_KEY)
+
+        window = self.db.query(CanonicalEvent.id).filter(CanonicalEvent.timestamp >= since)
+        if until is not None:
+            window = window.filter(CanonicalEvent.timestamp <= until)
+        canonical_ids = window.scalar_subquery()
+
+        self.touched.update(
+            timestamp for (timestamp,) in
+            self.db.query(CanonicalEvent.timestamp).filter(CanonicalEvent.id.in_(canonical_ids))
+        )
+
+        self.db.query(EventOrigin).filter(
+            EventOrigin.canonical_id.in_(canonical_ids)
+        ).delete(synchronize_session=False)
+        self.db.query(CanonicalEvent).filter(
+            CanonicalEvent.id.in_(canonical_ids)
+        ).delete(synchronize_session=False)
+
+        return self.associate(since, until)
+
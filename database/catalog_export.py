@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Katalog export'u: earthquakes tablosu sütunlu Parquet dosyalarına
+- Geçmiş analizleri (RetrospectiveAnalysis, check_database) üretim
+  veritabanına binlerce satırlık sorgu göndermek yerine yerel dosyaları okur
+- Düzen ve yazma yolu soğuk katmanla aynı (database/cold_storage.py):
+  <CATALOG_DIR>/earthquakes/year=YYYY/YYYY-MM.parquet, zstd, atomik yazma
+- Artımlı: ay başına (satır sayısı, en yeni created_at) manifest'te tutulur;
+  sadece değişen aylar (yeni ay, bu ay, geç gelen kayıtlar) yeniden yazılır.
+  Tablodan çıkan aylar (soğuk katmana taşınan) export'tan silinir.
+  Yerinde güncellenen satırlar (upsert update=True) sayıyı değiştirmez: --full
+- load_catalog() export + soğuk katman dosyalarını bellek eşlemeli okur;
+  zaman, bbox ve magnitüd filtresi row group istatistiklerine itilir
+- Export veritabanının anlık görüntüsüdür; son export zamanı manifest'te
+
+Kullanım:
+    python database/catalog_export.py           # değişen aylar
+    python database/catalog_export.py --full    # tüm aylar baştan
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import func, literal_column, select
+
+from database.cold_storage import (
+    COLUMNS, FLOAT_COLUMNS, KEY_COLUMNS, _as_datetime, load_events, month_bounds, month_path,
+    month_paths, read_months, rows_to_table, write_month
+)
+from database.dialect import time_bucket
+from database.models import Earthquake, MaintenanceSession
+
+CATALOG_DIR = os.getenv(
+    'CATALOG_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'catalog'))
+)
+MANIFEST_NAME = 'manifest.json'
+
+
+def manifest_path(root=None):
+    return os.path.join(root or CATALOG_DIR, MANIFEST_NAME)
+
+
+def read_manifest(root=None):
+    """{'exported_at': iso, 'months': {'YYYY-MM': {'rows': n, 'last_created': iso}}} (yoksa None)"""
+    path = manifest_path(root)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest, root=None):
+    path = manifest_path(root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def month_key(year, month):
+    return f"{year}-{month:02d}"
+
+
+def month_stats(db):
+    """Tablodaki her ay için satır sayısı ve en yeni created_at (tek GROUP BY)"""
+    table = Earthquake.__table__
+    rows = db.execute(
+        select(time_bucket('month', table.c.timestamp), func.count(), func.max(table.c.created_at))
+        .group_by(literal_column('1'))
+    ).all()
+
+    stats = {}
+    for bucket, count, last_created in rows:
+        bucket = _as_datetime(bucket)
+        last_created = _as_datetime(last_created)
+        stats[month_key(bucket.year, bucket.month)] = {
+            'rows': count,
+            'last_created': last_created.isoformat() if last_created else None,
+        }
+    return stats
+
+
+def export_month(db, year, month, root=None):
+    """Bir ayı tablodan baştan yaz; dönüş: satır sayısı"""
+    start, end = month_bounds(year, month)
+    table = Earthquake.__table__
+    rows = db.execute(
+        select(*[table.c[name] for name in COLUMNS])
+        .where(table.c.timestamp >= start, table.c.timestamp < end)
+        .order_by(table.c.timestamp)
+    ).all()
+    return write_month(rows_to_table(rows), year, month, root or CATALOG_DIR, merge=False)
+
+
+def export_catalog(full=False, root=None):
+    """Değişen ayları export et, tablodan çıkan ayları sil"""
+    root = root or CATALOG_DIR
+
+    print("\n" + "="*60)
+    print(f"📦 KATALOG EXPORT'U ({'tam' if full else 'artımlı'}) → {root}")
+    print("="*60)
+
+    started = time.perf_counter()
+    manifest = read_manifest(root) or {'months': {}}
+    exported_rows = 0
+
+    db = MaintenanceSession()
+    try:
+        stats = month_stats(db)
+        changed = sorted(key for key, stat in stats.items() if full or manifest['months'].get(key) != stat)
+        removed = sorted(set(manifest['months']) - set(stats))
+
+        for key in changed:
+            year, month = map(int, key.split('-'))
+            count = export_month(db, year, month, root)
+            manifest['months'][key] = stats[key]
+            exported_rows += count
+            print(f"   ✅ {key}: {count:,} satır")
+    finally:
+        db.close()
+
+    for key in removed:
+        year, month = map(int, key.split('-'))
+        path = month_path(year, month, root)
+        if os.path.exists(path):
+            os.remove(path)
+        del manifest['months'][key]
+        print(f"   🗑️  {key}: tabloda yok (soğuk katmanda veya silindi), export'tan kaldırıldı")
+
+    manifest['exported_at'] = datetime.utcnow().isoformat(timespec='seconds')
+    _write_manifest(manifest, root)
+
+    print("="*60)
+    print(f"✅ {len(changed)} ay yazıldı ({exported_rows:,} satır), {len(stats) - len(changed)} ay değişmemiş")
+    print(f"⏱️  Süre: {time.perf_counter() - started:.1f}s")
+    print("="*60 + "\n")
+    return len(changed)
+
+
+def catalog_available(root=None):
+    return read_manifest(root) is not None
+
+
+def load_catalog(start=None, end=None, bbox=None, min_magnitude=None, columns=None, root=None, cold_root=None):
+    """
+    Export + soğuk katman - pandas.DataFrame (COLUMNS veya columns)
+    Veritabanına bağlanmaz; export yoksa FileNotFoundError
+    bbox: (lat_min, lat_max, lon_min, lon_max)
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    if not catalog_available(root):
+        raise FileNotFoundError(f"Katalog export'u yok: {manifest_path(root)} (python database/catalog_export.py)")
+
+    columns = list(columns or COLUMNS)
+    # Soğuk aya geç gelen kayıt iki dizinde de olabilir: tekilleştirme anahtarı okunur
+    read_columns = columns + [name for name in KEY_COLUMNS if name not in columns]
+
+    cold_paths = month_paths(start, end, cold_root)
+    tables = [
+        read_months(paths, start, end, bbox, min_magnitude, read_columns)
+        for paths in (cold_paths, month_paths(start, end, root or CATALOG_DIR))
+        if paths
+    ]
+    if not tables:
+        return pd.DataFrame({name: pd.Series(dtype=FLOAT_COLUMNS.get(name, 'object')) for name in columns})
+
+    events = pa.concat_tables(tables).to_pandas()
+    if cold_paths and len(tables) > 1:
+        events = events.drop_duplicates(KEY_COLUMNS, keep='last')
+
+    events = events.sort_values('timestamp', kind='stable').reset_index(drop=True)
+    return events[columns]
+
+
+def load_history(db, start=None, end=None, bbox=None, min_magnitude=None):
+    """
+    Geçmiş analizleri için olaylar: export varsa yerel dosyalardan,
+    yoksa veritabanı + soğuk katmandan (load_events) - aynı kolonlar
+    """
+    if catalog_available():
+        return load_catalog(start, end, bbox, min_magnitude).astype(FLOAT_COLUMNS)
+    return load_events(db, start, end, bbox, min_magnitude)
+
+
+def describe_source():
+    """Analiz çıktısı için veri kaynağı satırı"""
+    manifest = read_manifest()
+    if manifest is None:
+        return "🗄️  Veri kaynağı: veritabanı (yerel kopya için: python database/catalog_export.py)"
+    return f"📦 Veri kaynağı: katalog export'u ({len(manifest['months'])} ay, son export {manifest['exported_at']} UTC)"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="earthquakes tablosunu Parquet kataloğuna export et")
+    parser.add_argument('--full', action='store_true', help="Değişmemiş aylar dahil tümünü yeniden yaz")
+    args = parser.parse_args()
+
+    export_catalog(full=args.full)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Sorgu planı kontrolü
+- API ve anomali dedektörünün sıcak sorgularını EXPLAIN ile çalıştırır ve
+  beklenen indeksi kullandıklarını doğrular
+- Küçük tablolarda planlayıcı haklı olarak seq scan seçebilir; bu yüzden
+  varsayılan olarak enable_seqscan kapatılır ve "indeks kullanılabilir mi"
+  kontrol edilir (--natural ile gerçek plan)
+- earthquakes partitioned: sıcak pencere sorgularının en fazla son iki aylık
+  partition'a dokunduğu (partition pruning) da kontrol edilir
+- Bir sorgu beklenen indeksi kullanmıyorsa çıkış kodu 1
+
+Kullanım:
+    python database/migrate.py && python database/check_query_plans.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, text, tuple_
+
+from database.models import (
+    CanonicalEvent, Earthquake, EarthquakeRollupDaily, EarthquakeRollupHourly, SessionLocal
+)
+from database.rollups import CANONICAL_SOURCE
+from database.spatial import nearest_first, within_radius
+
+FUTURE_SLACK = timedelta(days=1)  # api.py ile aynı üst sınır payı
+PAGE_LIMIT = 1001  # api.DEFAULT_PAGE_SIZE + 1 (sonraki sayfa var mı)
+
+
+HOT_WINDOW_PARTITIONS = 2  # 48 saat (+1 gün pay) en fazla iki aya yayılır
+
+
+def hot_queries(db):
+    """
+    (isim, sorgu, kabul edilen indeksler, en fazla taranacak partition)
+    api.py ve dedektördeki filtrelerle aynı; partition sınırı None ise kontrol yok
+    """
+    now = datetime.utcnow()
+    last_48h = now - timedelta(hours=48)
+    end = now + FUTURE_SLACK
+    lat, lon, radius_km = 38.0, 37.2, 50
+    cursor = (now - timedelta(hours=24), 1)  # Sayfanın ortasından bir imleç
+
+    return [
+        ("/api/earthquakes (dedupe)",
+         db.query(CanonicalEvent).filter(
+             CanonicalEvent.timestamp >= last_48h,
+             CanonicalEvent.magnitude >= 2.5
+         ).order_by(CanonicalEvent.timestamp.desc(), CanonicalEvent.id.desc()).limit(PAGE_LIMIT),
+         {'ix_canonical_events_timestamp_magnitude', 'ix_canonical_events_timestamp_id'}, None),
+
+        ("/api/earthquakes (dedupe, sonraki sayfa)",
+         db.query(CanonicalEvent).filter(
+             CanonicalEvent.timestamp >= last_48h,
+             CanonicalEvent.magnitude >= 2.5,
+             tuple_(CanonicalEvent.timestamp, CanonicalEvent.id) < tuple_(*cursor)
+         ).order_by(CanonicalEvent.timestamp.desc(), CanonicalEvent.id.desc()).limit(PAGE_LIMIT),
+         {'ix_canonical_events_timestamp_id'}, None),
+
+        ("/api/earthquakes?dedupe=false",
+         db.query(Earthquake).filter(
+             Earthquake.timestamp >= last_48h,
+             Earthquake.timestamp < end,
+             Earthquake.magnitude >= 2.5
+         ).order_by(Earthquake.timestamp.desc(), Earthquake.id.desc()).limit(PAGE_LIMIT),
+         {'ix_earthquakes_timestamp_magnitude', 'ix_earthquakes_timestamp_id'}, HOT_WINDOW_PARTITIONS),
+
+        ("/api/earthquakes?dedupe=false (sonraki sayfa)",
+         db.query(Earthquake).filter(
+             Earthquake.timestamp >= last_48h,
+             Earthquake.timestamp < end,
+             Earthquake.magnitude >= 2.5,
+             tuple_(Earthquake.timestamp, Earthquake.id) < tuple_(*cursor)
+         ).order_by(Earthquake.timestamp.desc(), Earthquake.id.desc()).limit(PAGE_LIMIT),
+         {'ix_earthquakes_timestamp_id'}, HOT_WINDOW_PARTITIONS),
+
+        ("/api/earthquakes?source=Kandilli",
+         db.query(Earthquake).filter(
+             Earthquake.timestamp >= last_48h,
+             Earthquake.timestamp < end,
+             Earthquake.magnitude >= 2.5,
+             Earthquake.source == 'Kandilli'
+         ).order_by(Earthquake.timestamp.desc(), Earthquake.id.desc()).limit(PAGE_LIMIT),
+         {'ix_earthquakes_source_timestamp', 'ix_earthquakes_timestamp_id'}, HOT_WINDOW_PARTITIONS),
+
+        ("/api/stats",
+         db.query(EarthquakeRollupHourly).filter(
+             EarthquakeRollupHourly.source == CANONICAL_SOURCE,
+             EarthquakeRollupHourly.bucket >= now - timedelta(hours=24)
+         ),
+         {'ix_earthquake_rollups_hourly_source_bucket', 'earthquake_rollups_hourly_pkey'}, None),
+
+        ("/api/region-stats",
+         db.query(Earthquake).filter(
+             Earthquake.timestamp >= now - timedelta(hours=168),
+             Earthquake.timestamp < end,
+             within_radius(db, Earthquake, lat, lon, radius_km)
+         ),
+         {'ix_earthquakes_geog_time'}, HOT_WINDOW_PARTITIONS),
+
+        ("/api/nearest",
+         db.query(CanonicalEvent).filter(
+             CanonicalEvent.timestamp >= now - timedelta(hours=168)
+         ).order_by(nearest_first(db, CanonicalEvent, lat, lon)).limit(10),
+         {'ix_canonical_events_geog_time'}, None),
+
+        ("RetrospectiveAnalysis.fetch_fault_zone_data",
+         db.query(Earthquake).filter(and_(
+             Earthquake.timestamp >= datetime(2022, 11, 7),
+             Earthquake.timestamp <= datetime(2023, 2, 5),
+             Earthquake.latitude.between(36.5, 39.5),
+             Earthquake.longitude.between(35.5, 39.0),
+             Earthquake.magnitude >= 2.0
+         )),
+         {'ix_earthquakes_lat_lon_time'}, 4),
+
+        ("AnomalyDetector.get_recent_earthquakes",
+         db.query(CanonicalEvent).filter(CanonicalEvent.timestamp >= last_48h),
+         {'ix_canonical_events_timestamp_magnitude', 'ix_canonical_events_timestamp'}, None),
+
+        ("AnomalyDetector.get_baseline_counts",
+         db.query(EarthquakeRollupDaily).filter(
+             EarthquakeRollupDaily.source == CANONICAL_SOURCE,
+             EarthquakeRollupDaily.bucket >= last_48h - timedelta(days=90),
+             EarthquakeRollupDaily.bucket < last_48h
+         ),
+         {'ix_earthquake_rollups_daily_source_bucket', 'earthquake_rollups_daily_pkey'}, None),
+    ]
+
+
+def plan_indexes(node):
+    """
+    Plan ağacında kullanılan tüm indeks isimleri
+    Partition indeksleri ana indeks adıyla başlar (ix_..._p2025_01)
+    """
+    names = set()
+    if 'Index Name' in node:
+        names.add(node['Index Name'])
+    for child in node.get('Plans', []):
+        names |= plan_indexes(child)
+    return names
+
+
+def plan_relations(node):
+    """Plan ağacında taranan tüm tablolar (partition'lar dahil)"""
+    names = set()
+    if 'Relation Name' in node:
+        names.add(node['Relation Name'])
+    for child in node.get('Plans', []):
+        names |= plan_relations(child)
+    return names
+
+
+def _matches(used, expected):
+    """Kullanılan indeksler arasında beklenen (veya onun partition indeksi) var mı"""
+    return sorted(
+        name for name in used
+        if any(name == index or name.startswith(f"{index}_") for index in expected)
+    )
+
+
+def explain(db, query):
+    sql = query.statement.compile(db.get_bind(), compile_kwargs={'literal_binds': True})
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def check(natural=False):
+    db = SessionLocal()
+    failures = 0
+
+    try:
+        if not natural:
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+
+        print("\n" + "="*60)
+        print("🔍 SORGU PLANI KONTROLÜ" + (" (gerçek plan)" if natural else " (seq scan kapalı)"))
+        print("="*60)
+
+        for name, query, expected, max_partitions in hot_queries(db):
+            plan = explain(db, query)
+            used = plan_indexes(plan)
+            matched = _matches(used, expected)
+            partitions = sorted(r for r in plan_relations(plan) if r.startswith('earthquakes_'))
+
+            if not matched:
+                failures += 1
+                print(f"   ❌ {name}: beklenen {', '.join(sorted(expected))}, "
+                      f"kullanılan {', '.join(sorted(used)) or 'seq scan'}")
+            elif max_partitions is not None and len(partitions) > max_partitions:
+                failures += 1
+                print(f"   ❌ {name}: {len(partitions)} partition taranıyor (en fazla {max_partitions}) - pruning yok")
+            else:
+                detail = f" [{len(partitions)} partition]" if max_partitions is not None else ""
+                print(f"   ✅ {name}: {', '.join(matched[:2])}{detail}")
+
+        db.rollback()
+    finally:
+        db.close()
+
+    print("="*60)
+    if failures:
+        print(f"❌ {failures} sorgu beklenen indeksi kullanmıyor (migration uygulandı mı?)")
+    else:
+        print("✅ Tüm sıcak sorgular indeks kullanıyor")
+    print("="*60 + "\n")
+
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sıcak sorguların indeks kullanımını kontrol et")
+    parser.add_argument('--natural', action='store_true', help="enable_seqscan'ı kapatmadan gerçek planı kontrol et")
+    args = parser.parse_args()
+
+    sys.exit(1 if check(natural=args.natural) else 0)
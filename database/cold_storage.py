@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+Sıcak/soğuk katman: eski depremler sütunlu Parquet dosyalarında
+- Trafiğin neredeyse tamamı son günlere bakar; ufuktan (varsayılan 365 gün)
+  eski aylar earthquakes tablosundan alınıp ay başına bir Parquet dosyasına
+  yazılır: <COLD_STORAGE_DIR>/earthquakes/year=YYYY/YYYY-MM.parquet
+- zstd sıkıştırma + location/source sözlük kodlaması; satırlar zamana göre
+  sıralı olduğundan row group istatistikleri zaman/konum filtresini daraltır
+- Taşıma ay başına tek transaction: DELETE ... RETURNING ile alınan satırlar
+  dosyaya yazılamazsa rollback; eşzamanlı ingest satır kaybettirmez.
+  PostgreSQL'de boşalan aylık partition ayrılıp silinir (tablo ve indeksler küçülür)
+- Soğuk aya sonradan gelen kayıt (arşiv backfill) sıcak tabloda kalır; bir
+  sonraki çalıştırmada dosyayla birleştirilir (event_id, timestamp tekil);
+  o saatlerin özet kovaları birleştirilmiş dosyadan yeniden hesaplanır
+- load_events() iki katmanı birleştirir (RetrospectiveAnalysis, check_database)
+- Özet tabloları (database/rollups.py) tüm geçmişi tutmaya devam eder;
+  /api/stats ve dedektör etkilenmez. canonical_events taşınmaz.
+
+Kullanım:
+    python database/cold_storage.py --dry-run
+    python database/cold_storage.py --horizon-days 365
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, literal_column, select, text
+
+from database.dialect import is_sqlite, time_bucket
+from database.models import Earthquake, MaintenanceSession
+from database.partitions import partition_name
+from database.versions import EARTHQUAKES, bump
+
+COLD_STORAGE_DIR = os.getenv(
+    'COLD_STORAGE_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'cold'))
+)
+DEFAULT_HORIZON_DAYS = int(os.getenv('COLD_HORIZON_DAYS', '365'))
+# Olay eşleştirme (92 gün) ve dedektör baseline'ı (90 gün + 48 saat) ham satırlara bakar
+MIN_HORIZON_DAYS = 120
+ROW_GROUP_SIZE = 65536
+LOCK_TIMEOUT = '5s'
+
+COLUMNS = (
+    'id', 'event_id', 'timestamp', 'latitude', 'longitude',
+    'magnitude', 'depth', 'location', 'source', 'created_at',
+)
+KEY_COLUMNS = ['event_id', 'timestamp']
+FLOAT_COLUMNS = {'latitude': 'float64', 'longitude': 'float64', 'magnitude': 'float64', 'depth': 'float64'}
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('id', pa.int64()),
+        ('event_id', pa.string()),
+        ('timestamp', pa.timestamp('us')),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('magnitude', pa.float64()),
+        ('depth', pa.float64()),
+        ('location', pa.string()),
+        ('source', pa.string()),
+        ('created_at', pa.timestamp('us')),
+    ])
+
+
+def _as_datetime(value):
+    """SQLite'ta time_bucket metin döner"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def month_bounds(year, month):
+    start = datetime(year, month, 1)
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def month_path(year, month, root=None):
+    return os.path.join(root or COLD_STORAGE_DIR, 'earthquakes', f"year={year}", f"{year}-{month:02d}.parquet")
+
+
+def cold_months(root=None):
+    """Dosyası olan aylar (varsayılan kök: soğuk katman): [(yıl, ay)] sıralı"""
+    base = os.path.join(root or COLD_STORAGE_DIR, 'earthquakes')
+    if not os.path.isdir(base):
+        return []
+
+    months = []
+    for year_dir in os.listdir(base):
+        if not year_dir.startswith('year='):
+            continue
+        for name in os.listdir(os.path.join(base, year_dir)):
+            if name.endswith('.parquet'):
+                year, month = name[:-len('.parquet')].split('-')
+                months.append((int(year), int(month)))
+    return sorted(months)
+
+
+def hot_since(root=None):
+    """Sıcak tablonun kesintisiz başladığı ay başı (soğuk katman boşsa None)"""
+    months = cold_months(root)
+    if not months:
+        return None
+    return month_bounds(*months[-1])[1]
+
+
+def rows_to_table(rows):
+    """(COLUMNS sırasıyla) satırlar -> pyarrow.Table"""
+    import pyarrow as pa
+
+    schema = _arrow_schema()
+    columns = list(zip(*rows)) if rows else [[] for _ in COLUMNS]
+    return pa.Table.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+def _merge(existing, fresh):
+    """Aynı (event_id, timestamp) iki katmanda varsa sıcak (yeni) kayıt kazanır"""
+    import pyarrow as pa
+
+    merged = pa.concat_tables([existing, fresh]).to_pandas()
+    merged = merged.drop_duplicates(KEY_COLUMNS, keep='last').sort_values('timestamp', kind='stable')
+    return pa.Table.from_pandas(merged, schema=_arrow_schema(), preserve_index=False)
+
+
+def write_month(table, year, month, root=None, merge=True):
+    """
+    Ay dosyasını atomik yaz; dönüş: dosyadaki satır sayısı
+    merge=True: dosya varsa birleştir, False: baştan yaz (katalog export'u)
+    """
+    import pyarrow.parquet as pq
+
+    path = month_path(year, month, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if merge and os.path.exists(path):
+        table = _merge(pq.read_table(path, schema=_arrow_schema()), table)
+    else:
+        table = table.sort_by('timestamp')
+
+    tmp_path = f"{path}.tmp"
+    pq.write_table(
+        table, tmp_path,
+        compression='zstd',
+        use_dictionary=['location', 'source'],
+        row_group_size=ROW_GROUP_SIZE,
+        write_statistics=True,
+    )
+    written = pq.read_metadata(tmp_path).num_rows
+    if written != table.num_rows:
+        os.remove(tmp_path)
+        raise IOError(f"{path}: {table.num_rows} satır yazılacaktı, {written} yazıldı")
+
+    os.replace(tmp_path, path)
+    return written
+
+
+def read_months(paths, start=None, end=None, bbox=None, min_magnitude=None, columns=None):
+    """
+    Ay dosyalarından filtrelenmiş okuma - pyarrow.Table
+    Dosyalar bellek eşlemeli (mmap) açılır; zaman/bbox/magnitüd filtresi
+    row group istatistikleriyle okumadan önce uygulanır (predicate pushdown)
+    bbox: (lat_min, lat_max, lon_min, lon_max)
+    """
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    condition = None
+    filters = []
+    if start is not None:
+        filters.append(ds.field('timestamp') >= start)
+    if end is not None:
+        filters.append(ds.field('timestamp') < end)
+    if bbox is not None:
+        lat_min, lat_max, lon_min, lon_max = bbox
+        filters += [
+            ds.field('latitude') >= lat_min, ds.field('latitude') <= lat_max,
+            ds.field('longitude') >= lon_min, ds.field('longitude') <= lon_max,
+        ]
+    if min_magnitude is not None:
+        filters.append(ds.field('magnitude') >= min_magnitude)
+    for expression in filters:
+        condition = expression if condition is None else condition & expression
+
+    dataset = ds.dataset(
+        paths, schema=_arrow_schema(), format='parquet', filesystem=fs.LocalFileSystem(use_mmap=True)
+    )
+    return dataset.to_table(columns=list(columns or COLUMNS), filter=condition)
+
+
+def month_paths(start=None, end=None, root=None):
+    """[start, end) ile kesişen ay dosyaları"""
+    return [
+        month_path(year, month, root)
+        for year, month in cold_months(root)
+        if (end is None or month_bounds(year, month)[0] < end)
+        and (start is None or month_bounds(year, month)[1] > start)
+    ]
+
+
+def read_cold(start=None, end=None, bbox=None, min_magnitude=None, columns=None, root=None):
+    """Soğuk katmandan [start, end) aralığı - pyarrow.Table (dosya yoksa None)"""
+    paths = month_paths(start, end, root)
+    if not paths:
+        return None
+    return read_months(paths, start, end, bbox, min_magnitude, columns)
+
+
+def load_events(db, start=None, end=None, bbox=None, min_magnitude=None):
+    """
+    Sıcak tablo + soğuk katman birleşik görünümü - pandas.DataFrame (COLUMNS)
+    Geçmiş sorguları (RetrospectiveAnalysis vb.) katman ayrımını bilmez
+    """
+    import pandas as pd
+
+    table = Earthquake.__table__
+    query = select(*[table.c[name] for name in COLUMNS])
+    if start is not None:
+        query = query.where(table.c.timestamp >= start)
+    if end is not None:
+        query = query.where(table.c.timestamp < end)
+    if bbox is not None:
+        lat_min, lat_max, lon_min, lon_max = bbox
+        query = query.where(
+            table.c.latitude.between(lat_min, lat_max),
+            table.c.longitude.between(lon_min, lon_max),
+        )
+    if min_magnitude is not None:
+        query = query.where(table.c.magnitude >= min_magnitude)
+
+    hot = pd.DataFrame(db.execute(query).all(), columns=list(COLUMNS))
+    cold = read_cold(start, end, bbox, min_magnitude)
+
+    if cold is None or cold.num_rows == 0:
+        events = hot
+    else:
+        # Soğuk aya geç gelen kayıt henüz taşınmamışsa iki katmanda da olabilir
+        events = pd.concat([cold.to_pandas(), hot], ignore_index=True)
+        events = events.drop_duplicates(KEY_COLUMNS, keep='last')
+
+    # Boş sıcak sonuç object tipinde gelir; kolon tipleri iki katmanda aynı olsun
+    events = events.astype(FLOAT_COLUMNS)
+    events['timestamp'] = pd.to_datetime(events['timestamp'])
+    return events.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+def _drop_empty_partition(db, year, month):
+    """Taşınan ayın partition'ı boşsa ayır ve sil (PostgreSQL)"""
+    name = partition_name(year, month)
+    if db.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is None:
+        return False
+
+    db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    db.execute(text(f"LOCK TABLE {name} IN EXCLUSIVE MODE"))
+    if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+        return False
+
+    # Bu aya sonradan gelen kayıtlar default partition'a düşer (sonraki çalıştırmada taşınır)
+    db.execute(text(f"ALTER TABLE {Earthquake.__tablename__} DETACH PARTITION {name}"))
+    db.execute(text(f"DROP TABLE {name}"))
+    return True
+
+
+def _refresh_merged_rollups(db, rows, year, month, root=None):
+    """
+    Soğuk aya geç gelen kayıtların özet kovaları: ingest bu saatleri atlar
+    (ham satırların çoğu dosyada), birleştirilmiş dosyadan yeniden hesaplanır
+    """
+    import pyarrow.parquet as pq
+    from database.rollups import hour_bucket, refresh_cold_rollups
+
+    pairs = {(hour_bucket(_as_datetime(row.timestamp)), row.source) for row in rows}
+    hours = {bucket for bucket, _ in pairs}
+    merged = pq.read_table(
+        month_path(year, month, root), columns=['timestamp', 'latitude', 'longitude', 'magnitude', 'source']
+    ).to_pylist()
+    refresh_cold_rollups(db, pairs, [row for row in merged if hour_bucket(row['timestamp']) in hours])
+
+
+def tier_month(db, year, month, root=None):
+    """
+    Bir ayı sıcak tablodan soğuk katmana taşı; dönüş: taşınan satır sayısı
+    Satırlar dosyaya yazılmadan transaction commit edilmez
+    """
+    start, end = month_bounds(year, month)
+    table = Earthquake.__table__
+    merging = os.path.exists(month_path(year, month, root))
+
+    try:
+        rows = db.execute(
+            delete(table)
+            .where(table.c.timestamp >= start, table.c.timestamp < end)
+            .returning(*[table.c[name] for name in COLUMNS])
+        ).all()
+
+        if rows:
+            write_month(rows_to_table(rows), year, month, root)
+            if merging:
+                _refresh_merged_rollups(db, rows, year, month, root)
+            bump(db, EARTHQUAKES)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if not is_sqlite(db):
+        try:
+            _drop_empty_partition(db, year, month)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"   ⚠️  {partition_name(year, month)} silinemedi (sonraki çalıştırmada denenir): {e}")
+
+    return len(rows)
+
+
+def tier_events(horizon_days=DEFAULT_HORIZON_DAYS, dry_run=False, root=None):
+    """Ufuktan tamamen eski ayları soğuk katmana taşı"""
+    if horizon_days < MIN_HORIZON_DAYS:
+        raise ValueError(f"❌ Ufuk en az {MIN_HORIZON_DAYS} gün olmalı (eşleştirme/baseline pencereleri)")
+
+    print("\n" + "="*60)
+    print(f"🧊 SOĞUK KATMANA TAŞIMA (ufuk: {horizon_days} gün)")
+    print("="*60)
+
+    cutoff = datetime.utcnow() - timedelta(days=horizon_days)
+    cutoff_month = datetime(cutoff.year, cutoff.month, 1)  # Bu ay ve sonrası sıcak kalır
+    table = Earthquake.__table__
+    started = time.perf_counter()
+    moved = 0
+
+    db = MaintenanceSession()
+    try:
+        # Sıcak tabloda kaydı kalan eski aylar (soğuk aya geç gelenler dahil)
+        month = time_bucket('month', table.c.timestamp)
+        pending = db.execute(
+            select(month, func.count()).where(table.c.timestamp < cutoff_month)
+            .group_by(literal_column('1')).order_by(literal_column('1'))
+        ).all()
+
+        for bucket, count in pending:
+            bucket = _as_datetime(bucket)
+            if dry_run:
+                print(f"   📋 {bucket:%Y-%m}: {count:,} satır taşınacak")
+                continue
+            moved += tier_month(db, bucket.year, bucket.month, root)
+            print(f"   ✅ {bucket:%Y-%m}: {count:,} satır → {month_path(bucket.year, bucket.month, root)}")
+    finally:
+        db.close()
+
+    months = len(pending)
+    print("="*60)
+    if dry_run:
+        print(f"📋 {months} ay taşınacak (--dry-run)")
+    else:
+        print(f"✅ {months} ay, {moved:,} satır soğuk katmana taşındı")
+        print(f"⏱️  Süre: {time.perf_counter() - started:.1f}s")
+    print("="*60 + "\n")
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Eski depremleri Parquet soğuk katmanına taşı")
+    parser.add_argument('--horizon-days', type=int, default=DEFAULT_HORIZON_DAYS,
+                        help="Bundan eski tam aylar taşınır")
+    parser.add_argument('--dry-run', action='store_true', help="Sadece taşınacak ayları listele")
+    args = parser.parse_args()
+
+    tier_events(horizon_days=args.horizon_days, dry_run=args.dry_run)
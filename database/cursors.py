@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""Collector imleçleri - artımlı toplama için kaynak başına kalıcı durum"""
+from database.models import CollectorCursor
+
+
+def get_cursor(db, source):
+    """Kaynağın imlecini getir, yoksa boş bir imleç oluştur (commit çağırana ait)"""
+    cursor = db.get(CollectorCursor, source)
+    if cursor is None:
+        cursor = CollectorCursor(source=source)
+        db.add(cursor)
+    return cursor
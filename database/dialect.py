@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Veritabanı arka ucu farkları (PostgreSQL / gömülü SQLite)
+- DATABASE_URL=sqlite:///data/deprem.db ile sunucusuz yerel mod: yerel
+  benchmark, test ve tek makinelik (edge) kurulumlar için
+- SQLite bağlantıları WAL modunda ve ayarlı pragma'larla açılır
+- Upsert, advisory lock ve zaman kovası (date_trunc) burada iki arka uca
+  göre üretilir; collector'lar, API ve dedektör değişmeden çalışır
+- PostgreSQL'e özgü kısımlar (partition, GiST, PostGIS, COPY, migration) SQLite'ta atlanır
+"""
+import math
+import os
+
+from sqlalchemy import DateTime, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql.functions import FunctionElement
+from geoalchemy2 import Geography
+
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),        # Okuyucular yazıcıyı beklemez
+    ('synchronous', 'NORMAL'),      # WAL ile güvenli, her commit'te fsync yok
+    ('busy_timeout', 5000),         # Kilitli veritabanında 5s bekle
+    ('cache_size', -65536),         # 64 MiB sayfa önbelleği
+    ('temp_store', 'MEMORY'),
+    ('mmap_size', 268435456),       # 256 MiB
+    ('foreign_keys', 'ON'),
+)
+
+# SQLAlchemy'nin SQLite DateTime saklama biçimi ile aynı
+SQLITE_BUCKET_FORMATS = {
+    'hour': '%Y-%m-%d %H:00:00.000000',
+    'day': '%Y-%m-%d 00:00:00.000000',
+    'month': '%Y-%m-01 00:00:00.000000',
+}
+
+
+def is_sqlite(bind):
+    """bind: engine, connection veya session"""
+    if hasattr(bind, 'get_bind'):
+        bind = bind.get_bind()
+    return bind.dialect.name == 'sqlite'
+
+
+def engine_options(url):
+    """create_engine için arka uca özgü seçenekler"""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return {}
+
+    # Dosya yoksa dizini oluştur (sqlite:///data/deprem.db)
+    if url.database and url.database != ':memory:':
+        directory = os.path.dirname(os.path.abspath(url.database))
+        os.makedirs(directory, exist_ok=True)
+
+    # API thread havuzu ve scheduler aynı bağlantıları farklı thread'lerden kullanır
+    return {'connect_args': {'check_same_thread': False}}
+
+
+def _sqlite_power(base, exponent):
+    """PostgreSQL power() gibi: NULL girdide NULL (magnitüdü olmayan kayıt)"""
+    if base is None or exponent is None:
+        return None
+    return math.pow(base, exponent)
+
+
+def configure_engine(engine):
+    """SQLite ise her yeni bağlantıda pragma'ları uygula"""
+    if engine.dialect.name != 'sqlite':
+        return engine
+
+    from database.spatial import sqlite_distance_km  # spatial bu modülü import eder
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+        # Enerji toplamı için (derleme seçeneğine bağlı olmasın)
+        dbapi_connection.create_function('power', 2, _sqlite_power, deterministic=True)
+        # geog (PostGIS) yerine yarıçap/en yakın sorguları (database/spatial.py)
+        dbapi_connection.create_function('distance_km', 4, sqlite_distance_km, deterministic=True)
+
+    return engine
+
+
+def insert_for(db, table):
+    """on_conflict_do_nothing / on_conflict_do_update destekleyen INSERT"""
+    if is_sqlite(db):
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
+
+
+def advisory_xact_lock(db, key):
+    """
+    Transaction sonuna kadar süren uygulama kilidi
+    SQLite'ta yazıcılar zaten veritabanı kilidiyle sıralanır - işlem yok
+    """
+    if not is_sqlite(db):
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': key})
+
+
+class time_bucket(FunctionElement):
+    """
+    Zaman damgasını saat/gün/ay başına indir: time_bucket('hour', kolon)
+    offset: kovalamadan önce eklenen süre (UTC -> Türkiye günü: timedelta(hours=3));
+    dönen kova kaydırılmış saatte
+    """
+    type = DateTime()
+    inherit_cache = False  # unit ve offset önbellek anahtarında yok
+    name = 'time_bucket'
+
+    def __init__(self, unit, expr, offset=None):
+        self.unit = unit
+        self.offset_s = int(offset.total_seconds()) if offset else 0
+        super().__init__(expr)
+
+
+@compiles(time_bucket)
+def _time_bucket_default(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    if element.offset_s:
+        expr = f"{expr} + interval '{element.offset_s} seconds'"
+    return f"date_trunc('{element.unit}', {expr})"
+
+
+@compiles(time_bucket, 'sqlite')
+def _time_bucket_sqlite(element, compiler, **kw):
+    fmt = SQLITE_BUCKET_FORMATS[element.unit]
+    modifier = f", '{element.offset_s:+d} seconds'" if element.offset_s else ''
+    return f"strftime('{fmt}', {compiler.process(element.clauses, **kw)}{modifier})"
+
+
+@compiles(CreateColumn, 'sqlite')
+def _create_column_sqlite(element, compiler, **kw):
+    """
+    - SQLite bileşik birincil anahtarda autoincrement desteklemez (earthquakes:
+      (id, timestamp)); id düz INTEGER olarak açılır, models.py'deki trigger rowid ile doldurur
+    - PostGIS geography kolonu (geog) boş (NULL) bir BLOB olarak açılır; mesafe
+      sorguları enlem/boylamla yapılır (database/spatial.py)
+    """
+    column = element.element
+    if isinstance(column.type, Geography):
+        return f"{compiler.preparer.format_column(column)} BLOB"
+    if column.autoincrement is True and len(column.table.primary_key.columns) > 1:
+        return f"{compiler.preparer.format_column(column)} INTEGER"
+    return compiler.visit_create_column(element, **kw)
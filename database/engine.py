@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Engine fabrikası ve iş yüküne göre session yönlendirme
+- Her iş yükünün (api, ingest, detector, maintenance) kendi bağlantı havuzu
+  ve statement_timeout'u vardır; engine'ler ilk kullanımda oluşturulur
+- DATABASE_REPLICA_URL verilirse API okumaları read replica'ya gider;
+  ingest, anomali tespiti ve bakım her zaman birincil veritabanına yazar
+- pool_pre_ping + pool_recycle: boşta kalırken sunucu/proxy tarafından
+  kapatılmış bağlantılar ilk sorguda hata vermez
+- idle_in_transaction_session_timeout: açık unutulan transaction kilit tutmaz
+- Ayarlar ortam değişkeniyle ezilebilir: DB_<İŞ YÜKÜ>_<AYAR>
+  (ör. DB_API_POOL_SIZE=10, DB_INGEST_STATEMENT_TIMEOUT_MS=0 -> sınırsız)
+- PostgreSQL'e özgü ayarlar (havuz boyutu, timeout'lar) SQLite'ta uygulanmaz
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from database.dialect import configure_engine, engine_options
+
+# .env süreç genelinde burada yüklenir (ucuz); engine'ler ise tembel
+load_dotenv()
+
+POOL_RECYCLE_S = 1800  # Yarım saatten eski bağlantılar yenilenir
+
+WORKLOADS = {
+    # Kısa okuma sorguları; uvicorn thread havuzu kadar eşzamanlı istek
+    'api': {
+        'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 10,
+        'statement_timeout_ms': 5000, 'idle_in_transaction_ms': 60000, 'replica': True,
+    },
+    # Collector'lar (3 kaynak paralel), olay eşleştirme ve özet güncelleme
+    'ingest': {
+        'pool_size': 3, 'max_overflow': 2, 'pool_timeout': 30,
+        'statement_timeout_ms': 60000, 'idle_in_transaction_ms': 300000, 'replica': False,
+    },
+    # Anomali tespiti ve günlük rapor: tek iş, birkaç büyük sorgu
+    'detector': {
+        'pool_size': 1, 'max_overflow': 1, 'pool_timeout': 30,
+        'statement_timeout_ms': 120000, 'idle_in_transaction_ms': 300000, 'replica': False,
+    },
+    # Migration, partition, toplu içe aktarma, özet yeniden kurma: süre sınırı yok
+    'maintenance': {
+        'pool_size': 1, 'max_overflow': 1, 'pool_timeout': 30,
+        'statement_timeout_ms': None, 'idle_in_transaction_ms': None, 'replica': False,
+    },
+}
+DEFAULT_WORKLOAD = 'maintenance'
+
+
+def workload_settings(workload):
+    """İş yükü ayarları (ortam değişkeni ezmeleriyle)"""
+    if workload not in WORKLOADS:
+        raise ValueError(f"❌ Bilinmeyen iş yükü: {workload} ({', '.join(WORKLOADS)})")
+
+    settings = dict(WORKLOADS[workload])
+    for key, value in settings.items():
+        if key == 'replica':
+            continue
+        override = os.getenv(f"DB_{workload.upper()}_{key.upper()}")
+        if override is not None:
+            value = int(override)
+            # Timeout'larda 0 = sınırsız
+            settings[key] = None if key.endswith('_ms') and value <= 0 else value
+    return settings
+
+
+def pool_capacity(workload):
+    """Aynı anda açılabilecek en fazla bağlantı (pool_size + max_overflow)"""
+    settings = workload_settings(workload)
+    return settings['pool_size'] + settings['max_overflow']
+
+
+def database_url(workload):
+    """API okumaları replica'ya (varsa), diğer her şey birincil veritabanına"""
+    if WORKLOADS[workload]['replica'] and os.getenv('DATABASE_REPLICA_URL'):
+        return os.getenv('DATABASE_REPLICA_URL')
+
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        raise ValueError("❌ DATABASE_URL environment variable bulunamadı! (yerel mod: DATABASE_URL=sqlite:///data/deprem.db)")
+    return url
+
+
+def create_db_engine(url, workload=DEFAULT_WORKLOAD):
+    """İş yüküne göre ayarlanmış engine"""
+    settings = workload_settings(workload)
+    options = engine_options(url)
+
+    if make_url(url).get_backend_name() == 'postgresql':
+        server_options = ' '.join(
+            f"-c {name}={value}"
+            for name, value in (
+                ('statement_timeout', settings['statement_timeout_ms']),
+                ('idle_in_transaction_session_timeout', settings['idle_in_transaction_ms']),
+            )
+            if value
+        )
+        connect_args = {'application_name': f"deprem-monitor-{workload}"}
+        if server_options:
+            connect_args['options'] = server_options
+
+        options.update(
+            pool_size=settings['pool_size'],
+            max_overflow=settings['max_overflow'],
+            pool_timeout=settings['pool_timeout'],
+            pool_pre_ping=True,
+            pool_recycle=POOL_RECYCLE_S,
+            connect_args=connect_args,
+        )
+
+    return configure_engine(create_engine(url, **options))
+
+
+_engines = {}
+_engine_lock = threading.Lock()
+
+
+def get_engine(workload=DEFAULT_WORKLOAD):
+    """İş yükünün paylaşılan engine'i; ilk çağrıda oluşturulur"""
+    engine = _engines.get(workload)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(workload)
+            if engine is None:
+                url = database_url(workload)
+                print(f"✅ Veritabanı bağlantısı ({workload}): {url[:30]}...")
+                engine = _engines[workload] = create_db_engine(url, workload)
+    return engine
+
+
+def dispose_engines():
+    """Tüm havuzları kapat (fork sonrası veya süreç kapanırken)"""
+    with _engine_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+class _LazySessionFactory:
+    """sessionmaker gibi çağrılır; engine'i ilk session açılırken bağlar"""
+
+    def __init__(self, workload):
+        self.workload = workload
+        self._factory = None
+
+    def __call__(self, **kwargs):
+        if self._factory is None:
+            self._factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine(self.workload))
+        return self._factory(**kwargs)
+
+
+_session_factories = {}
+
+
+def session_factory(workload):
+    """İş yükü başına tek session fabrikası"""
+    if workload not in _session_factories:
+        workload_settings(workload)  # Bilinmeyen iş yükünde erken hata
+        _session_factories[workload] = _LazySessionFactory(workload)
+    return _session_factories[workload]
+
+
+# Birincil veritabanı (yazma) - collector'lar, ingest, scriptler
+SessionLocal = session_factory('ingest')
+# API okumaları - DATABASE_REPLICA_URL varsa replica
+ReadSessionLocal = session_factory('api')
+DetectorSession = session_factory('detector')
+MaintenanceSession = session_factory('maintenance')
+
+
+@contextmanager
+def session_scope(workload='ingest'):
+    """
+    Açık yaşam döngülü session: başarıda commit, hatada rollback, her durumda
+    close - bağlantı işler arasındaki boşta sürede havuza döner
+    """
+    db = session_factory(workload)()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
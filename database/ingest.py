@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Toplu deprem kaydı (bulk upsert)
+- Tüm collector'lar normalize edilmiş olayları buradan yazar
+- Her batch tek bir INSERT ... ON CONFLICT (event_id, timestamp) ifadesi ile gider
+  (earthquakes partitioned: benzersiz kısıt partition anahtarını içermek zorunda)
+- event_id tek başına da tekil tutulur: kayıtlı bir event_id farklı timestamp
+  ile gelirse (AFAD/USGS revizyonu) yeni satır eklenmez, mevcut satır yeni
+  zamana taşınır (update=True) ya da atlanır; yazıcılar kilitle sıralanır
+- PostgreSQL ve gömülü SQLite (database/dialect.py) için aynı yol
+- Yeni kayıtlar aynı transaction içinde tekil olaylara (canonical_events) bağlanır;
+  güncellenen kayıtların tekil olayları yenilenir (database/association.py)
+- Etkilenen saatlik/günlük özetler (database/rollups.py) de aynı transaction'da güncellenir
+- Veri sürümü (database/versions.py) artırılır: API yanıt önbelleği geçersizlenir
+"""
+from datetime import datetime, timezone
+from sqlalchemy import literal_column, select
+
+from database.association import EventAssociator
+from database.dialect import advisory_xact_lock, insert_for, is_sqlite
+from database.models import Earthquake, SessionLocal
+from database.rollups import CANONICAL_SOURCE, hour_bucket, refresh_rollups
+from database.versions import EARTHQUAKES, bump
+
+# Normalize edilmiş bir olayda bulunabilecek kolonlar
+EVENT_COLUMNS = (
+    'event_id', 'timestamp', 'latitude', 'longitude',
+    'magnitude', 'depth', 'location', 'source'
+)
+
+# Çakışma hedefi ve ON CONFLICT DO UPDATE ile güncellenecek kolonlar
+CONFLICT_COLUMNS = ['event_id', 'timestamp']
+UPDATE_COLUMNS = ('latitude', 'longitude', 'magnitude', 'depth', 'location', 'source')
+
+DEFAULT_BATCH_SIZE = 1000
+
+# event_id kontrolü ile INSERT arasında başka bir yazıcının aynı olayı eklemesini önler
+ADVISORY_LOCK_KEY = 80080804
+
+
+def normalize_event(eq):
+    """
+    Olay sözlüğünü earthquakes tablosunun kolonlarına indir
+    - Bilinmeyen anahtarlar (date, time, md, geometry ...) atılır
+    - Timezone'lu timestamp'ler naive UTC'ye çevrilir
+    """
+    event = {col: eq.get(col) for col in EVENT_COLUMNS}
+
+    timestamp = event['timestamp']
+    if timestamp is not None and timestamp.tzinfo is not None:
+        event['timestamp'] = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return event
+
+
+def _batches(events, batch_size):
+    for i in range(0, len(events), batch_size):
+        yield events[i:i + batch_size]
+
+
+def _dedupe_batch(batch):
+    """Aynı event_id bir ifadede iki kez olamaz (ON CONFLICT hatası) - sonuncuyu tut"""
+    by_id = {}
+    for event in batch:
+        by_id[event['event_id']] = event
+    return list(by_id.values())
+
+
+def _existing_rows(db, rows):
+    """Batch'teki event_id'lerden zaten kayıtlı olanlar: {event_id: (id, timestamp, source)}"""
+    found = db.execute(
+        select(Earthquake.event_id, Earthquake.id, Earthquake.timestamp, Earthquake.source).where(
+            Earthquake.event_id.in_([row['event_id'] for row in rows])
+        )
+    )
+    return {event_id: (id_, timestamp, source) for event_id, id_, timestamp, source in found}
+
+
+def _move_row(db, id_, old_timestamp, row):
+    """
+    Revize edilen origin zamanı: mevcut satırı yeni timestamp'e taşı
+    id korunur (canonical_events.preferred_earthquake_id); PostgreSQL satırı
+    gerekirse başka aylık partition'a kendisi taşır
+    """
+    db.execute(
+        Earthquake.__table__.update()
+        .where(Earthquake.id == id_, Earthquake.timestamp == old_timestamp)
+        .values(timestamp=row['timestamp'], updated_at=datetime.utcnow(),
+                **{col: row[col] for col in UPDATE_COLUMNS})
+    )
+
+
+def upsert_earthquakes(events, db=None, update=False, batch_size=DEFAULT_BATCH_SIZE, associate=True):
+    """
+    Olayları toplu olarak yaz
+
+    update=False: ON CONFLICT DO NOTHING (mevcut kayıtlar atlanır)
+    update=True:  ON CONFLICT DO UPDATE (mevcut kayıtlar güncellenir;
+                  timestamp'i değişen event_id mevcut satırda taşınır)
+
+    db verilirse commit çağıran tarafa aittir; verilmezse kendi session'ını
+    açıp commit eder.
+
+    associate=True: yeni eklenen kayıtlar kaynaklar arası eşleştirilir,
+                    güncellenenlerin tekil olayları yenilenir
+
+    Dönüş: {'inserted': n, 'updated': n, 'skipped': n}
+    """
+    result = {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    # Partition anahtarı olmayan (timestamp'siz) kayıt yazılamaz
+    events = [normalize_event(eq) for eq in events if eq.get('event_id') and eq.get('timestamp')]
+    if not events:
+        return result
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+
+    # Taşınan satırların eski saatleri de özetlerde yeniden hesaplanır
+    hours = set()
+    updated_ids = []
+
+    try:
+        advisory_xact_lock(db, ADVISORY_LOCK_KEY)
+
+        for batch in _batches(events, batch_size):
+            rows = _dedupe_batch(batch)
+            result['skipped'] += len(batch) - len(rows)
+
+            existing = _existing_rows(db, rows)
+            revised = [row for row in rows if row['event_id'] in existing
+                       and existing[row['event_id']][1] != row['timestamp']]
+            if revised:
+                for row in revised:
+                    id_, old_timestamp, old_source = existing.pop(row['event_id'])
+                    if update:
+                        _move_row(db, id_, old_timestamp, row)
+                        updated_ids.append(row['event_id'])
+                        if old_source:
+                            hours.add((hour_bucket(old_timestamp), old_source))
+                revised_ids = {row['event_id'] for row in revised}
+                rows = [row for row in rows if row['event_id'] not in revised_ids]
+                result['updated' if update else 'skipped'] += len(revised)
+                if not rows:
+                    continue
+
+            stmt = insert_for(db, Earthquake).values(rows)
+
+            if update:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=CONFLICT_COLUMNS,
+                    # ON CONFLICT DO UPDATE'te kolonların onupdate'i çalışmaz
+                    set_={**{col: stmt.excluded[col] for col in UPDATE_COLUMNS}, 'updated_at': datetime.utcnow()}
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=CONFLICT_COLUMNS)
+
+            if is_sqlite(db):
+                # Sayımlar için önceden var olan anahtarlara bakılır (kalanların timestamp'i aynı)
+                db.execute(stmt)
+                inserted = sum(1 for row in rows if row['event_id'] not in existing)
+                written = len(rows) if update else inserted
+                if update:
+                    updated_ids.extend(row['event_id'] for row in rows if row['event_id'] in existing)
+            else:
+                # xmax = 0 -> satır bu ifade ile eklendi, aksi halde güncellendi
+                stmt = stmt.returning(Earthquake.event_id, literal_column('(xmax = 0)').label('inserted'))
+
+                returned = db.execute(stmt).all()
+                inserted = sum(1 for row in returned if row.inserted)
+                written = len(returned)
+                updated_ids.extend(row.event_id for row in returned if not row.inserted)
+
+            result['inserted'] += inserted
+            result['updated'] += written - inserted
+            result['skipped'] += len(rows) - written
+
+        if result['inserted'] or result['updated']:
+            hours |= {(hour_bucket(event['timestamp']), event['source']) for event in events if event['source']}
+
+            if associate:
+                associator = EventAssociator(db)
+                # Güncellenen kayıtlar: tekil olay değerleri/üyelikleri yenilenir,
+                # tolerans dışına düşenler aşağıda yeniden eşleştirilir
+                freed = associator.refresh(updated_ids) if updated_ids else []
+                if result['inserted'] or freed:
+                    timestamps = [event['timestamp'] for event in events] + freed
+                    associator.associate(min(timestamps), max(timestamps))
+                hours |= {(hour_bucket(ts), CANONICAL_SOURCE) for ts in associator.touched}
+
+            refresh_rollups(db, hours)
+            bump(db, EARTHQUAKES)
+
+        if own_session:
+            db.commit()
+
+    except Exception:
+        if own_session:
+            db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
+
+    return result
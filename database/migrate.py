@@ -1,15 +1,38 @@
 # -*- coding: utf-8 -*-
-"""Database migration - Add missing columns"""
+"""
+Versiyonlu migration çalıştırıcı
+- Uygulanan migration'lar schema_migrations tablosunda tutulur, her
+  migration bir kez çalışır
+- İndeksler CREATE INDEX CONCURRENTLY ile kurulur (tabloyu yazmaya kilitlemez);
+  yarıda kalmış (INVALID) bir indeks bir sonraki çalıştırmada silinip yeniden kurulur
+- Partitioned tablolarda indeks ana tabloya ON ONLY ile açılır, her partition'da
+  CONCURRENTLY kurulup ATTACH edilir
+- Aynı anda iki çalıştırıcı olmasın diye advisory lock alınır
+
+Kullanım:
+    python database/migrate.py            # bekleyen migration'ları uygula
+    python database/migrate.py --status   # durum
+"""
 import os
 import sys
 
 # PYTHON PATH düzeltmesi
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import argparse
+from datetime import datetime
+
 from dotenv import load_dotenv
 load_dotenv()
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+
+from database.engine import create_db_engine
+from database.models import GEOG_EXPRESSION
+
+from database.partitions import (
+    MONTHS_AHEAD, add_months, ensure_partitions_between, is_partitioned, list_partitions
+)
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
@@ -17,38 +40,398 @@ if not DATABASE_URL:
     print("❌ DATABASE_URL bulunamadı!")
     sys.exit(1)
 
-print(f"🔗 Bağlanıyorum: {DATABASE_URL[:40]}...")
+MIGRATION_LOCK_KEY = 80080802
+LOCK_TIMEOUT = '5s'  # Kilit alınamazsa uzun süre bekleyip sorguları tıkama
+
+
+class Migration:
+    """
+    Tek bir şema değişikliği
+    statements: transaction içinde çalışan SQL'ler
+    indexes: (isim, tablo, kolonlar) - autocommit'te CONCURRENTLY kurulur
+    run: SQL listesiyle ifade edilemeyen migration'lar için run(engine)
+    """
+
+    def __init__(self, version, name, statements=(), indexes=(), run=None):
+        self.version = version
+        self.name = name
+        self.statements = statements
+        self.indexes = indexes
+        self.run = run
+
+
+# Lat/lon kutusu + zaman aralığı sorguları için (btree_gist gerekir)
+SPATIAL_TEMPORAL_INDEXES = [
+    # /api/region-stats ve RetrospectiveAnalysis
+    ('ix_earthquakes_lat_lon_time', 'earthquakes', 'USING gist (latitude, longitude, timestamp)'),
+    ('ix_canonical_events_lat_lon_time', 'canonical_events', 'USING gist (latitude, longitude, timestamp)'),
+]
+
+# PostGIS geography noktası (database/spatial.py): ST_DWithin yarıçap ve KNN (<->) sorguları
+GEOGRAPHY_INDEXES = [
+    ('ix_earthquakes_geog_time', 'earthquakes', 'USING gist (geog, timestamp)'),
+    ('ix_canonical_events_geog_time', 'canonical_events', 'USING gist (geog, timestamp)'),
+]
+
+EARTHQUAKE_COLUMNS = 'id, event_id, timestamp, latitude, longitude, magnitude, depth, location, source, created_at'
+
+# Migration 5 anındaki şema (modelden değil: sonraki kolon/indeksler kendi migration'larında)
+PARTITIONED_EARTHQUAKES_DDL = [
+    """
+    CREATE TABLE earthquakes (
+        id INTEGER NOT NULL DEFAULT nextval('{sequence}'::regclass),
+        event_id VARCHAR,
+        timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        latitude FLOAT,
+        longitude FLOAT,
+        magnitude FLOAT,
+        depth FLOAT,
+        location VARCHAR,
+        source VARCHAR,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id, timestamp),
+        CONSTRAINT uq_earthquakes_event_id_timestamp UNIQUE (event_id, timestamp)
+    ) PARTITION BY RANGE (timestamp)
+    """,
+    'CREATE INDEX ix_earthquakes_id ON earthquakes (id)',
+    'CREATE INDEX ix_earthquakes_event_id ON earthquakes (event_id)',
+    'CREATE INDEX ix_earthquakes_timestamp ON earthquakes (timestamp)',
+    'CREATE INDEX ix_earthquakes_magnitude ON earthquakes (magnitude)',
+    'CREATE INDEX ix_earthquakes_timestamp_magnitude ON earthquakes (timestamp, magnitude)',
+    'CREATE INDEX ix_earthquakes_source_timestamp ON earthquakes (source, timestamp)',
+]
+
+
+def partition_earthquakes(engine):
+    """
+    earthquakes'i aylık partitioned tabloya çevir
+    - Eski tablo earthquakes_legacy olarak kalır (doğrulandıktan sonra elle silinir)
+    - id'ler korunur (canonical_events.preferred_earthquake_id bunlara bakıyor),
+      sequence yeni tabloya devredilir
+    - timestamp'i NULL olan satırlar partition anahtarı olmadığı için taşınmaz
+    - Tek transaction: taşıma bitene kadar earthquakes'e yazma bekler
+    """
+    with engine.begin() as conn:
+        if is_partitioned(conn, 'earthquakes'):
+            print("  ⏭️  earthquakes zaten partitioned")
+            return
+
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        conn.execute(text("LOCK TABLE earthquakes IN ACCESS EXCLUSIVE MODE"))
+        legacy_seq = conn.execute(text("SELECT pg_get_serial_sequence('earthquakes', 'id')")).scalar()
+
+        conn.execute(text("ALTER TABLE earthquakes RENAME TO earthquakes_legacy"))
+        legacy_indexes = conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'earthquakes_legacy'"
+        )).scalars().all()
+        for index in legacy_indexes:
+            conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index.replace("earthquakes", "earthquakes_legacy", 1)}"'))
+
+        # Partitioned ana tablo + indeksleri (boş tabloda anında); id eski
+        # sequence'tan devam eder
+        for statement in PARTITIONED_EARTHQUAKES_DDL:
+            conn.execute(text(statement.format(sequence=legacy_seq)))
+        conn.execute(text("ALTER TABLE earthquakes_legacy ALTER COLUMN id DROP DEFAULT"))
+        conn.execute(text(f"ALTER SEQUENCE {legacy_seq} OWNED BY earthquakes.id"))
+
+        first = conn.execute(text("SELECT min(timestamp) FROM earthquakes_legacy")).scalar()
+        now = datetime.utcnow()
+        first = first or now
+        end_year, end_month = add_months(now.year, now.month, MONTHS_AHEAD)
+        ensure_partitions_between(conn, first.year, first.month, end_year, end_month)
+        print(f"  📦 {len(list_partitions(conn))} partition oluşturuldu ({first:%Y-%m} → {end_year}-{end_month:02d})")
+
+        moved = conn.execute(text(f"""
+            INSERT INTO earthquakes ({EARTHQUAKE_COLUMNS})
+            SELECT {EARTHQUAKE_COLUMNS} FROM earthquakes_legacy WHERE timestamp IS NOT NULL
+        """)).rowcount
+        skipped = conn.execute(text("SELECT count(*) FROM earthquakes_legacy WHERE timestamp IS NULL")).scalar()
+        print(f"  ✅ {moved:,} satır taşındı ({skipped} satır timestamp'siz, taşınmadı)")
+
+        # Yeni ana tabloda GiST indeksi (tablo zaten kilitli, CONCURRENTLY gereksiz)
+        for name, table, columns in SPATIAL_TEMPORAL_INDEXES:
+            if table == 'earthquakes':
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns}"))
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text("ANALYZE earthquakes"))
+
+    print("  💡 Doğruladıktan sonra: DROP TABLE earthquakes_legacy;")
+
+
+# Kandilli kaynakları Türkiye yerel saatiyle yazılmıştı (collectors/kandilli_parser.py artık UTC döner)
+KANDILLI_UTC_SQL = """
+    UPDATE earthquakes
+    SET timestamp = (timestamp AT TIME ZONE 'Europe/Istanbul') AT TIME ZONE 'UTC'
+    WHERE source IN ('Kandilli', 'Kandilli_Archive', 'Kandilli_Manual')
+"""
+
+
+def kandilli_utc_timestamps(engine):
+    """
+    Mevcut Kandilli kayıtlarını UTC'ye çevir, ardından kaynaklar arası
+    eşleştirmeyi ve özet tablolarını baştan kur (USGS/AFAD ile 3 saat kaymıştı)
+    """
+    from database.association import EventAssociator
+    from database.models import MaintenanceSession
+    from database.rollups import rebuild_rollups
+    from database.versions import EARTHQUAKES, bump
+
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        moved = conn.execute(text(KANDILLI_UTC_SQL)).rowcount
+    print(f"  🕒 {moved:,} Kandilli kaydı UTC'ye çevrildi")
+
+    db = MaintenanceSession()
+    try:
+        result = EventAssociator(db).rebuild(datetime(1900, 1, 1))
+        bump(db, EARTHQUAKES)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"  🔗 Eşleştirme yeniden kuruldu: {result['linked']} bağlantı, {result['created']} tekil olay")
+
+    rebuild_rollups()
+
+    if os.getenv('COLD_STORAGE_DIR'):
+        print("  ⚠️  Soğuk katmandaki (Parquet) Kandilli ayları yerel saatte kaldı")
+
+
+def backfill_rollups(engine):
+    """Özet tablolarını oluştur ve mevcut veriden doldur (database/rollups.py)"""
+    from database.models import Base, EarthquakeRollupDaily, EarthquakeRollupHourly
+    from database.rollups import rebuild_rollups
+
+    Base.metadata.create_all(bind=engine, tables=[
+        EarthquakeRollupHourly.__table__, EarthquakeRollupDaily.__table__
+    ])
+    rebuild_rollups()
+
+
+MIGRATIONS = [
+    Migration(1, 'anomaly_columns', statements=[
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS alert_level VARCHAR',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS anomaly_type VARCHAR',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS description TEXT',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS latitude FLOAT',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS longitude FLOAT',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS radius_km FLOAT DEFAULT 50.0',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS earthquake_count INTEGER DEFAULT 0',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS baseline_rate FLOAT DEFAULT 0.0',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS current_rate FLOAT DEFAULT 0.0',
+        'ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS resolved_at TIMESTAMP',
+    ]),
+    Migration(2, 'collector_cursor_markers', statements=[
+        'ALTER TABLE collector_cursors ADD COLUMN IF NOT EXISTS fingerprint VARCHAR',
+        'ALTER TABLE collector_cursors ADD COLUMN IF NOT EXISTS marker TEXT',
+    ]),
+    Migration(3, 'composite_indexes', indexes=[
+        # /api/earthquakes (dedupe=false), büyüklük filtreli zaman aralıkları
+        ('ix_earthquakes_timestamp_magnitude', 'earthquakes', '(timestamp, magnitude)'),
+        # /api/earthquakes?source=..., USGS/Kandilli kaynak bazlı sorgular
+        ('ix_earthquakes_source_timestamp', 'earthquakes', '(source, timestamp)'),
+        # /api/earthquakes (dedupe), /api/stats, AnomalyDetector
+        ('ix_canonical_events_timestamp_magnitude', 'canonical_events', '(timestamp, magnitude)'),
+    ]),
+    Migration(4, 'spatial_temporal_indexes', statements=[
+        # GiST'te skaler kolonlar (<, <=, BETWEEN) için operatör sınıfları
+        'CREATE EXTENSION IF NOT EXISTS btree_gist',
+    ], indexes=SPATIAL_TEMPORAL_INDEXES),
+    Migration(5, 'partition_earthquakes', run=partition_earthquakes),
+    Migration(6, 'earthquake_rollups', run=backfill_rollups),
+    Migration(7, 'geography_points', statements=[
+        'CREATE EXTENSION IF NOT EXISTS postgis',
+        # Üretilen kolon: her yazma yolunda veritabanı doldurur (tablo bir kez yeniden yazılır)
+        f'ALTER TABLE earthquakes ADD COLUMN IF NOT EXISTS geog geography(Point, 4326) '
+        f'GENERATED ALWAYS AS ({GEOG_EXPRESSION}) STORED',
+        f'ALTER TABLE canonical_events ADD COLUMN IF NOT EXISTS geog geography(Point, 4326) '
+        f'GENERATED ALWAYS AS ({GEOG_EXPRESSION}) STORED',
+    ], indexes=GEOGRAPHY_INDEXES),
+    Migration(8, 'data_versions', statements=[
+        # API yanıt önbelleğinin geçersizlenmesi (database/versions.py, api_cache.py)
+        'CREATE TABLE IF NOT EXISTS data_versions ('
+        'name VARCHAR PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0, updated_at TIMESTAMP)',
+    ]),
+    Migration(9, 'keyset_indexes', indexes=[
+        # /api/earthquakes sayfalama: ORDER BY timestamp DESC, id DESC + (timestamp, id) < imleç
+        ('ix_earthquakes_timestamp_id', 'earthquakes', '(timestamp, id)'),
+        ('ix_canonical_events_timestamp_id', 'canonical_events', '(timestamp, id)'),
+    ]),
+    Migration(10, 'kandilli_utc_timestamps', run=kandilli_utc_timestamps),
+    Migration(11, 'earthquake_updated_at', statements=[
+        # Son olaylar deposunun artımlı senkronu güncellemeleri de görsün (database/recent_store.py)
+        'ALTER TABLE earthquakes ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP',
+    ]),
+    Migration(12, 'retry_empty_backfill_months', statements=[
+        # Eski backfill 0 satırlık her ayı 'empty' işaretliyordu; artık 'empty'
+        # yalnızca HTTP 404 - eski işaretler bir kez daha denensin (collectors/archive_backfill.py)
+        "UPDATE archive_backfill_months SET status = 'pending' WHERE status = 'empty'",
+    ]),
+]
+
+
+def ensure_migrations_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+    """))
 
-engine = create_engine(DATABASE_URL)
 
-def migrate():
-    """Add missing columns to anomalies table"""
+def applied_versions(conn):
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def index_state(conn, name):
+    """None: yok, True: geçerli, False: yarıda kalmış CONCURRENTLY build (INVALID)"""
+    row = conn.execute(text("""
+        SELECT i.indisvalid
+        FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+        WHERE c.relname = :name
+    """), {'name': name}).first()
+    return None if row is None else row[0]
+
+
+def _build_concurrently(conn, name, table, columns):
+    state = index_state(conn, name)
+
+    if state is True:
+        return False
+
+    if state is False:
+        print(f"  🧹 {name} yarıda kalmış (INVALID), yeniden kuruluyor")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {columns}"))
+    return True
+
+
+def _attached_child(conn, parent_index, partition):
+    """Partition'da ana indekse bağlı bir indeks var mı (yeni partition'lara otomatik açılır)"""
+    return conn.execute(text("""
+        SELECT 1
+        FROM pg_inherits inh JOIN pg_index idx ON idx.indexrelid = inh.inhrelid
+        WHERE inh.inhparent = CAST(:parent AS regclass) AND idx.indrelid = CAST(:partition AS regclass)
+    """), {'parent': parent_index, 'partition': partition}).first() is not None
+
+
+def create_index_concurrently(conn, name, table, columns):
+    """İndeksi yazmaları kilitlemeden kur (autocommit bağlantıda)"""
+    if not is_partitioned(conn, table):
+        if _build_concurrently(conn, name, table, columns):
+            print(f"  ✅ {name} kuruldu")
+        else:
+            print(f"  ⏭️  {name} zaten var")
+        return
+
+    if index_state(conn, name) is True:
+        print(f"  ⏭️  {name} zaten var")
+        return
+
+    # Partitioned tabloda CONCURRENTLY yok: ana indeks ON ONLY (geçersiz başlar),
+    # her partition'da ayrı ayrı CONCURRENTLY, sonra ATTACH -> hepsi bağlanınca geçerli
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {columns}"))
+
+    for partition in list_partitions(conn, table):
+        if _attached_child(conn, name, partition):
+            continue
+        child = f"{name}_{partition[len(table) + 1:]}"
+        _build_concurrently(conn, child, partition, columns)
+        conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+    print(f"  ✅ {name} kuruldu ({len(list_partitions(conn, table))} partition)")
+
+
+def apply_migration(engine, migration):
+    print(f"\n🔧 {migration.version:04d}_{migration.name}")
+
+    if migration.statements:
+        with engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            for statement in migration.statements:
+                conn.execute(text(statement))
+        print(f"  ✅ {len(migration.statements)} ifade uygulandı")
+
+    if migration.indexes:
+        # CONCURRENTLY transaction içinde çalışamaz
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+            for name, table, columns in migration.indexes:
+                create_index_concurrently(conn, name, table, columns)
+                conn.execute(text(f"ANALYZE {table}"))
+
+    if migration.run:
+        migration.run(engine)
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {'version': migration.version, 'name': migration.name}
+        )
+
+
+def migrate(engine=None):
+    """Bekleyen migration'ları sırayla uygula"""
+    engine = engine or create_db_engine(DATABASE_URL, 'maintenance')
+    print(f"🔗 Bağlanıyorum: {DATABASE_URL[:40]}...")
+
+    if engine.dialect.name != 'postgresql':
+        print("✅ Gömülü veritabanı: şema init_db ile kurulur, migration gerekmez")
+        return 0
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as lock_conn:
+        # Oturum seviyesinde kilit: diğer çalıştırıcılar bu bitene kadar bekler
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {'key': MIGRATION_LOCK_KEY})
+        try:
+            with engine.begin() as conn:
+                ensure_migrations_table(conn)
+                done = applied_versions(conn)
+
+            pending = [m for m in MIGRATIONS if m.version not in done]
+            if not pending:
+                print("✅ Şema güncel, bekleyen migration yok")
+                return 0
+
+            for migration in pending:
+                apply_migration(engine, migration)
+
+            print(f"\n✅ {len(pending)} migration uygulandı!")
+            return len(pending)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': MIGRATION_LOCK_KEY})
+
+
+def status(engine=None):
+    """Migration durumunu yazdır"""
+    engine = engine or create_db_engine(DATABASE_URL, 'maintenance')
+
+    with engine.begin() as conn:
+        ensure_migrations_table(conn)
+        done = applied_versions(conn)
+
+    print("\n📋 Migration durumu:")
+    for migration in MIGRATIONS:
+        icon = '✅' if migration.version in done else '⏳'
+        print(f"   {icon} {migration.version:04d}_{migration.name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Versiyonlu migration çalıştırıcı")
+    parser.add_argument('--status', action='store_true', help="Sadece durumu göster")
+    args = parser.parse_args()
+
     try:
-        with engine.connect() as conn:
-            print("🔧 Kolonları ekliyorum...")
-            
-            conn.execute(text('ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS alert_level VARCHAR;'))
-            print("  ✅ alert_level eklendi")
-            
-            conn.execute(text('ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS anomaly_type VARCHAR;'))
-            print("  ✅ anomaly_type eklendi")
-            
-            conn.execute(text('ALTER TABLE anomalies ADD COLUMN IF NOT EXISTS description TEXT;'))
-            print("  ✅ description eklendi")
-            
-            conn.commit()
-            
-            print("\n✅ Migration tamamlandı!")
-            
-            # Kontrol et
-            result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name = 'anomalies';"))
-            columns = [row[0] for row in result]
-            print(f"\n📋 Anomalies kolonları: {', '.join(columns)}")
-            
+        if args.status:
+            status()
+        else:
+            migrate()
     except Exception as e:
         print(f"\n❌ Migration hatası: {e}")
         import traceback
         traceback.print_exc()
-
-if __name__ == "__main__":
-    migrate()
\ No newline at end of file
+        sys.exit(1)
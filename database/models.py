@@ -1,28 +1,114 @@
 # -*- coding: utf-8 -*-
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, create_engine
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Index, UniqueConstraint, Computed, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred
+from geoalchemy2 import Geography
 from datetime import datetime
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# Engine ve session'lar iş yüküne göre database/engine.py'de (ilk kullanımda oluşturulur)
+from database.engine import (
+    DetectorSession, MaintenanceSession, ReadSessionLocal, SessionLocal, get_engine, session_scope
+)
 
 Base = declarative_base()
 
+# Episantr noktası enlem/boylamdan veritabanında üretilir: her yazma yolunda
+# (upsert, COPY, eşleştirme) dolu; GiST indeksi migration 7 ile (database/spatial.py)
+GEOG_EXPRESSION = 'ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography'
+
+def geography_column():
+    """Tembel yüklenen geography(Point, 4326); SQLite'ta boş kolon (database/dialect.py)"""
+    return deferred(Column(
+        Geography('POINT', srid=4326, spatial_index=False),
+        Computed(GEOG_EXPRESSION, persisted=True)
+    ))
+
 class Earthquake(Base):
-    """Deprem modeli"""
+    """
+    Deprem modeli
+    Tablo timestamp üzerinden aylık RANGE partition'lıdır (database/partitions.py);
+    partition anahtarı her benzersiz kısıtta bulunmak zorunda olduğundan
+    birincil anahtar (id, timestamp), tekillik (event_id, timestamp)
+    """
     __tablename__ = "earthquakes"
     
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    event_id = Column(String, index=True)
+    timestamp = Column(DateTime, primary_key=True, index=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    magnitude = Column(Float, index=True)
+    depth = Column(Float)
+    location = Column(String)
+    source = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Yerinde güncelleme / zaman revizyonu (ingest update=True); son olaylar deposu senkronu
+    updated_at = Column(DateTime, nullable=True, onupdate=datetime.utcnow)
+    geog = geography_column()
+    
+    # Sıcak sorgular için bileşik indeksler (database/migrate.py ile de kurulur;
+    # lat/lon/zaman GiST indeksi btree_gist gerektirdiği için sadece migration'da)
+    __table_args__ = (
+        UniqueConstraint('event_id', 'timestamp', name='uq_earthquakes_event_id_timestamp'),
+        Index('ix_earthquakes_timestamp_magnitude', 'timestamp', 'magnitude'),
+        Index('ix_earthquakes_source_timestamp', 'source', 'timestamp'),
+        Index('ix_earthquakes_timestamp_id', 'timestamp', 'id'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+    # Üretilen geog insert sonrası RETURNING ile geri okunmaz
+    __mapper_args__ = {'eager_defaults': False}
+
+# SQLite'ta bileşik birincil anahtardaki id kendiliğinden artmaz; rowid ile doldur
+event.listen(Earthquake.__table__, 'after_create', DDL("""
+    CREATE TRIGGER IF NOT EXISTS earthquakes_assign_id AFTER INSERT ON earthquakes
+    WHEN NEW.id IS NULL
+    BEGIN
+        UPDATE earthquakes SET id = NEW.rowid WHERE rowid = NEW.rowid;
+    END
+""").execute_if(dialect='sqlite'))
+
+class CanonicalEvent(Base):
+    """Kaynaklar arası tekilleştirilmiş deprem (Kandilli/AFAD/USGS aynı olay)"""
+    __tablename__ = "canonical_events"
+    
     id = Column(Integer, primary_key=True, index=True)
-    event_id = Column(String, unique=True, index=True)
     timestamp = Column(DateTime, index=True)
     latitude = Column(Float)
     longitude = Column(Float)
     magnitude = Column(Float, index=True)
     depth = Column(Float)
     location = Column(String)
+    # Tercih edilen (en öncelikli kaynaktan gelen) kayıt
+    preferred_source = Column(String)
+    preferred_event_id = Column(String, index=True)
+    preferred_earthquake_id = Column(Integer)
+    sources = Column(String)  # Virgülle ayrılmış kaynak listesi
+    source_count = Column(Integer, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    geog = geography_column()
+    
+    __table_args__ = (
+        Index('ix_canonical_events_timestamp_magnitude', 'timestamp', 'magnitude'),
+        Index('ix_canonical_events_timestamp_id', 'timestamp', 'id'),
+    )
+    __mapper_args__ = {'eager_defaults': False}
+
+# geog kolonları PostGIS gerektirir (init_db tabloları modelden kurar)
+for _table in (Earthquake.__table__, CanonicalEvent.__table__):
+    event.listen(_table, 'before_create', DDL(
+        "CREATE EXTENSION IF NOT EXISTS postgis"
+    ).execute_if(dialect='postgresql'))
+
+class EventOrigin(Base):
+    """Kaynak kaydının (earthquakes.event_id) tekil depreme bağlantısı"""
+    __tablename__ = "event_origins"
+    
+    event_id = Column(String, primary_key=True)
+    canonical_id = Column(Integer, index=True)
     source = Column(String)
+    time_delta_s = Column(Float)  # Tercih edilen kayda göre zaman farkı
+    distance_km = Column(Float)  # Tercih edilen kayda göre mesafe
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class Anomaly(Base):
@@ -57,19 +143,92 @@ class AlertLog(Base):
     sent_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String)
 
-# Database bağlantısı
-DATABASE_URL = os.getenv('DATABASE_URL')
+class CollectorCursor(Base):
+    """Kaynak başına artımlı toplama imleci (high-water mark)"""
+    __tablename__ = "collector_cursors"
+    
+    source = Column(String, primary_key=True)
+    high_water_mark = Column(DateTime, nullable=True)  # Kaynaktan alınan en yeni 'updated' zamanı (UTC)
+    last_success_at = Column(DateTime, nullable=True)  # Son başarılı çalıştırma (UTC)
+    fingerprint = Column(String, nullable=True)  # Son yanıtın sha256 parmak izi
+    marker = Column(Text, nullable=True)  # Son listedeki satırların hash kümesi (delta parse)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ArchiveBackfillMonth(Base):
+    """Kandilli arşiv backfill checkpoint'i - ay başına durum"""
+    __tablename__ = "archive_backfill_months"
+    
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    status = Column(String, default='pending')  # pending, done, empty, failed
+    attempts = Column(Integer, default=0)
+    saved_count = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class EarthquakeRollupHourly(Base):
+    """
+    Saatlik özet - grid hücresi ve kaynak başına (database/rollups.py)
+    source='canonical' satırları kaynaklar arası tekil olaylardan (canonical_events)
+    hücre: round(enlem / 0.45), round(boylam / 0.45) - AnomalyDetector grid'i
+    """
+    __tablename__ = "earthquake_rollups_hourly"
 
-if DATABASE_URL:
-    print(f"✅ DATABASE_URL bulundu: {DATABASE_URL[:30]}...")
-    engine = create_engine(DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-else:
-    raise ValueError("❌ DATABASE_URL environment variable bulunamadı!")
+    bucket = Column(DateTime, primary_key=True)  # Saat başı (UTC)
+    source = Column(String, primary_key=True)
+    cell_lat = Column(Integer, primary_key=True)
+    cell_lon = Column(Integer, primary_key=True)
+    event_count = Column(Integer, default=0)
+    max_magnitude = Column(Float, nullable=True)
+    energy = Column(Float, default=0.0)  # Toplam enerji (J): log10 E = 1.5M + 4.8
+    count_m25 = Column(Integer, default=0)  # 2.5 <= M < 3.0
+    count_m3 = Column(Integer, default=0)   # 3.0 <= M < 4.0
+    count_m4 = Column(Integer, default=0)   # 4.0 <= M < 5.0
+    count_m5 = Column(Integer, default=0)   # M >= 5.0
+
+    __table_args__ = (
+        Index('ix_earthquake_rollups_hourly_source_bucket', 'source', 'bucket'),
+    )
+
+class EarthquakeRollupDaily(Base):
+    """Günlük özet (UTC gün) - saatlik özetlerden türetilir, kolonlar aynı"""
+    __tablename__ = "earthquake_rollups_daily"
+
+    bucket = Column(DateTime, primary_key=True)  # Gün başı (UTC)
+    source = Column(String, primary_key=True)
+    cell_lat = Column(Integer, primary_key=True)
+    cell_lon = Column(Integer, primary_key=True)
+    event_count = Column(Integer, default=0)
+    max_magnitude = Column(Float, nullable=True)
+    energy = Column(Float, default=0.0)
+    count_m25 = Column(Integer, default=0)
+    count_m3 = Column(Integer, default=0)
+    count_m4 = Column(Integer, default=0)
+    count_m5 = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('ix_earthquake_rollups_daily_source_bucket', 'source', 'bucket'),
+    )
+
+class DataVersion(Base):
+    """
+    Veri sürümü sayacı - yazan işlem aynı transaction'da artırır (database/versions.py)
+    API yanıt önbelleği (api_cache.py) sürüm değişince geçersizlenir
+    """
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)  # earthquakes, anomalies
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 def init_db():
     """Veritabanı tablolarını oluştur"""
+    from database.partitions import ensure_partitions
+    
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    # Partition'sız partitioned tabloya insert yapılamaz
+    ensure_partitions(engine)
     print("✅ Veritabanı tabloları oluşturuldu")
 
 if __name__ == "__main__":
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+earthquakes tablosunun aylık RANGE (timestamp) partition'ları
+- earthquakes_pYYYY_MM: [ay başı, sonraki ay başı)
+- earthquakes_default: sadece başıboş satırlar (hatalı zaman damgası, partition'ı
+  açılmamış bir aya beklenmedik yazma); ensure_partition o aya düşenleri
+  kilit altında tüm default'u tarayarak taşır, bu yüzden boş kalmalı
+- ensure_partitions() önümüzdeki aylar için partition'ları önceden açar;
+  scheduler günde bir kez, init_db ve migration da çağırır
+- Geçmiş ayları yazan yollar (arşiv backfill, TXT içe aktarma) yazmadan önce
+  ensure_partitions_for() ile o ayların partition'larını açar
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+PARTITIONED_TABLE = 'earthquakes'
+MONTHS_AHEAD = 3
+# Eşzamanlı çağıranlar (paralel içe aktarma süreçleri, scheduler) aynı ayı iki kez açmasın
+PARTITION_LOCK_KEY = 80080805
+
+
+def partition_name(year, month, table=PARTITIONED_TABLE):
+    return f"{table}_p{year}_{month:02d}"
+
+
+def default_partition_name(table=PARTITIONED_TABLE):
+    return f"{table}_default"
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def add_months(year, month, count):
+    index = year * 12 + (month - 1) + count
+    return index // 12, index % 12 + 1
+
+
+def is_partitioned(conn, table=PARTITIONED_TABLE):
+    """Tablo partitioned (relkind = 'p') mi?"""
+    return conn.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE relname = :table AND relkind IN ('r', 'p')"),
+        {'table': table}
+    ).scalar() is True
+
+
+def list_partitions(conn, table=PARTITIONED_TABLE):
+    """Tablonun partition isimleri"""
+    rows = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+        ORDER BY child.relname
+    """), {'table': table})
+    return [row[0] for row in rows]
+
+
+def ensure_default_partition(conn, table=PARTITIONED_TABLE):
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"))
+
+
+def ensure_partition(conn, year, month, table=PARTITIONED_TABLE):
+    """
+    Tek bir ay partition'ını oluştur (varsa dokunma)
+    Default partition'da o aya düşmüş satırlar varsa önce yeni tabloya taşınır,
+    yoksa PARTITION OF doğrudan başarısız olurdu
+    Dönüş: oluşturulduysa True
+    """
+    name = partition_name(year, month, table)
+    if conn.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None:
+        return False
+
+    start = datetime(year, month, 1)
+    end = datetime(*_next_month(year, month), 1)
+    bounds = f"FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    default = default_partition_name(table)
+    params = {'start': start, 'end': end}
+
+    stranded = 0
+    if conn.execute(text("SELECT to_regclass(:name)"), {'name': default}).scalar() is not None:
+        stranded = conn.execute(
+            text(f"SELECT count(*) FROM {default} WHERE timestamp >= :start AND timestamp < :end"), params
+        ).scalar()
+
+    if not stranded:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}"))
+        return True
+
+    # Üretilen kolonlar (geog) yazılamaz; yeni tabloda yeniden hesaplanır
+    columns = ', '.join(conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = :table AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """), {'table': table}).scalars().all())
+
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {default} WHERE timestamp >= :start AND timestamp < :end RETURNING {columns}
+        )
+        INSERT INTO {name} ({columns}) SELECT {columns} FROM moved
+    """), params)
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    print(f"   📦 {name}: default partition'dan {stranded} satır taşındı")
+    return True
+
+
+def ensure_partitions_between(conn, start_year, start_month, end_year, end_month, table=PARTITIONED_TABLE):
+    """[başlangıç ayı, bitiş ayı] aralığındaki tüm partition'lar + default"""
+    created = 0
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        created += ensure_partition(conn, year, month, table)
+        year, month = _next_month(year, month)
+
+    ensure_default_partition(conn, table)
+    return created
+
+
+def ensure_partitions(engine=None, months_ahead=MONTHS_AHEAD, table=PARTITIONED_TABLE):
+    """
+    İçinde bulunulan ay ve önümüzdeki `months_ahead` ay için partition'ları aç
+    Tablo henüz partitioned değilse (migration uygulanmamış) veya veritabanı
+    SQLite ise hiçbir şey yapmaz
+    """
+    if engine is None:
+        from database.models import get_engine
+        engine = get_engine()
+
+    if engine.dialect.name != 'postgresql':
+        return 0
+
+    now = datetime.utcnow()
+    end_year, end_month = add_months(now.year, now.month, months_ahead)
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn, table):
+            return 0
+
+        conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': PARTITION_LOCK_KEY})
+        created = ensure_partitions_between(conn, now.year, now.month, end_year, end_month, table)
+
+    if created:
+        print(f"📦 {created} yeni {table} partition'ı oluşturuldu")
+    return created
+
+
+def ensure_partitions_for(start, end, engine=None, table=PARTITIONED_TABLE):
+    """
+    [start, end] zaman aralığındaki her ayın partition'ını aç (kendi kısa transaction'ı)
+    Geçmiş ayları yazan toplu yüklemeler yazmadan önce çağırır: satırlar default
+    partition'a düşmez ve o aylar da partition pruning'den yararlanır
+    SQLite'ta veya tablo partitioned değilse hiçbir şey yapmaz
+    """
+    if start is None or end is None:
+        return 0
+
+    if engine is None:
+        from database.models import get_engine
+        engine = get_engine()
+
+    if engine.dialect.name != 'postgresql':
+        return 0
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn, table):
+            return 0
+
+        conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': PARTITION_LOCK_KEY})
+        created = ensure_partitions_between(conn, start.year, start.month, end.year, end.month, table)
+
+    if created:
+        print(f"📦 {created} {table} partition'ı açıldı ({start:%Y-%m} → {end:%Y-%m})")
+    return created
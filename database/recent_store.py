@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Süreç içi son olaylar deposu (NumPy sütunları)
+- API istekleri ve anomali tespiti aynı 48 saat - 7 günlük pencereyi her
+  seferinde ORM nesnesi olarak yüklemek yerine bellekteki sütunları
+  (zaman, enlem, boylam, magnitüd, derinlik, kaynak id, konum id) vektörel
+  olarak filtreler ve özetler
+- Tekrar eden metinler (kaynak, konum) sözlükte tutulur (interning);
+  dizilerde sadece tamsayı id
+- Senkronizasyon artımlıdır: pencere içinde coalesce(updated_at, created_at)
+  son görülen değerden (OVERLAP payıyla) yeni olan satırlar çekilir (yerinde
+  güncellenen ve zamanı revize edilen kayıtlar dahil),
+  id'ye göre güncellenir/eklenir; pencereden çıkanlar atılır. Web ve scheduler
+  ayrı süreçler olduğundan yeni ingest veritabanından okunur
+  (en fazla MIN_SYNC_INTERVAL_S gecikme)
+- FULL_RELOAD_S'de bir tam yükleme: silinen satırlar (eşleştirme --rebuild) ve
+  OVERLAP'tan uzun süren transaction'larla gelenler
+- Diziler her senkronizasyonda yeniden kurulup tek atamayla değiştirilir;
+  okuyucular kilitsiz, tutarlı bir görüntü (RecentEvents) alır
+- Pencereyi aşan sorgular (hours > RECENT_STORE_HOURS) veritabanına gider
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from database.models import CanonicalEvent, Earthquake
+from database.spatial import EARTH_RADIUS_KM
+
+RECENT_STORE_HOURS = int(os.getenv('RECENT_STORE_HOURS', '168'))
+MIN_SYNC_INTERVAL_S = float(os.getenv('RECENT_STORE_SYNC_S', '5'))
+FULL_RELOAD_S = 3600
+OVERLAP = timedelta(minutes=15)  # Geç commit edilen transaction payı
+FUTURE_SLACK = timedelta(days=1)  # api.get_time_window ile aynı
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class _Interner:
+    """Metin -> tamsayı id (0 = None); yalnızca eklenir, eski id'ler geçerli kalır"""
+
+    def __init__(self):
+        self.values = [None]
+        self._ids = {None: 0}
+
+    def id(self, value):
+        found = self._ids.get(value)
+        if found is None:
+            found = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return found
+
+    def lookup(self, value):
+        return self._ids.get(value)
+
+
+class RecentEvents:
+    """Tutarlı görüntü: aynı uzunlukta, zamana göre sıralı sütunlar"""
+
+    FLOAT_COLUMNS = ('latitude', 'longitude', 'magnitude', 'depth')
+
+    def __init__(self, columns, sources, locations):
+        self.columns = columns
+        self.sources = sources
+        self.locations = locations
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def since(self, start, end=None):
+        """[start, end) aralığının indeksleri (sıralı dizide ikili arama)"""
+        import numpy as np
+
+        times = self.columns['timestamp']
+        first = np.searchsorted(times, np.datetime64(start, 'us'), side='left')
+        last = len(times) if end is None else np.searchsorted(times, np.datetime64(end, 'us'), side='left')
+        return np.arange(first, last)
+
+    def filter(self, start, end=None, min_magnitude=None, source=None):
+        """Zaman aralığı, minimum magnitüd ve kaynak filtresi - zamana göre artan indeksler"""
+        columns = self.columns
+        indices = self.since(start, end)
+        if min_magnitude is not None:
+            indices = indices[columns['magnitude'][indices] >= min_magnitude]
+        if source is not None:
+            source_id = self.sources.lookup(source)
+            if source_id is None:
+                return indices[:0]
+            indices = indices[columns['source'][indices] == source_id]
+        return indices
+
+    def page(self, indices, limit, before=None):
+        """
+        (zaman, id) azalan sırada en fazla limit indeks; before=(zaman, id)
+        imlecinden sonrası (veritabanı keyset sayfalamasıyla aynı sıra)
+        """
+        import numpy as np
+
+        times, ids = self.columns['timestamp'][indices], self.columns['id'][indices]
+        if before is not None:
+            timestamp, row_id = np.datetime64(before[0], 'us'), before[1]
+            keep = (times < timestamp) | ((times == timestamp) & (ids < row_id))
+            indices, times, ids = indices[keep], times[keep], ids[keep]
+        return indices[np.lexsort((ids, times))[::-1][:limit]]
+
+    def located(self, indices):
+        """Koordinatı olan kayıtlar (özet tablolarıyla aynı kural)"""
+        import numpy as np
+
+        columns = self.columns
+        return indices[~(np.isnan(columns['latitude'][indices]) | np.isnan(columns['longitude'][indices]))]
+
+    def within_radius(self, indices, lat, lon, radius_km):
+        """Haversine ile yarıçap filtresi (database/spatial.py ile aynı küre)"""
+        import numpy as np
+
+        lat1 = np.radians(self.columns['latitude'][indices])
+        lon1 = np.radians(self.columns['longitude'][indices])
+        lat2, lon2 = np.radians(lat), np.radians(lon)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+        return indices[distance <= radius_km]
+
+    def totals(self, indices):
+        """Sayı ve en büyük magnitüd (kayıt yoksa None)"""
+        import numpy as np
+
+        magnitudes = self.columns['magnitude'][indices]
+        magnitudes = magnitudes[~np.isnan(magnitudes)]
+        return len(indices), (float(magnitudes.max()) if len(magnitudes) else None)
+
+    def records(self, indices):
+        """JSON'a hazır sözlükler (NaN -> None, kaynak/konum id'leri metne çevrilir)"""
+        columns = self.columns
+        values = {
+            name: columns[name][indices].tolist()
+            for name in ('id', 'event_id', 'earthquake_id', 'timestamp', *self.FLOAT_COLUMNS, 'source', 'location', 'sources')
+        }
+        sources, locations = self.sources.values, self.locations.values
+
+        records = []
+        for i in range(len(indices)):
+            record = {name: values[name][i] for name in ('id', 'event_id', 'timestamp')}
+            for name in self.FLOAT_COLUMNS:
+                value = values[name][i]
+                record[name] = None if value != value else value
+            record['earthquake_id'] = None if values['earthquake_id'][i] < 0 else values['earthquake_id'][i]
+            record['source'] = sources[values['source'][i]]
+            record['location'] = locations[values['location'][i]]
+            record['sources'] = sources[values['sources'][i]]
+            records.append(record)
+        return records
+
+    def to_frame(self, indices):
+        """pandas.DataFrame (analizler için)"""
+        import numpy as np
+        import pandas as pd
+
+        columns = self.columns
+        frame = pd.DataFrame({name: columns[name][indices] for name in ('timestamp', *self.FLOAT_COLUMNS)})
+        frame['location'] = np.asarray(self.locations.values, dtype=object)[columns['location'][indices]]
+        return frame
+
+
+class RecentEventStore:
+    """Bir tablonun son RECENT_STORE_HOURS saati; snapshot() ile okunur"""
+
+    def __init__(self, model, window_hours=RECENT_STORE_HOURS):
+        self.model = model
+        self.window = timedelta(hours=window_hours)
+        self._events = None
+        self._mark = None
+        self._synced_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def covers(self, hours):
+        """Bu pencere depodan cevaplanabilir mi"""
+        return timedelta(hours=hours) <= self.window
+
+    def _select(self):
+        model = self.model
+        if model is CanonicalEvent:
+            return select(
+                model.id, model.timestamp, model.latitude, model.longitude, model.magnitude, model.depth,
+                model.location, model.preferred_source.label('source'), model.preferred_event_id.label('event_id'),
+                model.preferred_earthquake_id.label('earthquake_id'), model.sources,
+                func.coalesce(model.updated_at, model.created_at).label('mark'),
+            )
+        return select(
+            model.id, model.timestamp, model.latitude, model.longitude, model.magnitude, model.depth,
+            model.location, model.source, model.event_id, model.id.label('earthquake_id'),
+            model.source.label('sources'), func.coalesce(model.updated_at, model.created_at).label('mark'),
+        )
+
+    def _fetch(self, db, start, mark=None):
+        model = self.model
+        query = self._select().where(model.timestamp >= start)
+        if model is Earthquake:
+            # Partition pruning için üst sınır (api ile aynı pay)
+            query = query.where(model.timestamp < utcnow() + FUTURE_SLACK)
+        if mark is not None:
+            query = query.where(query.selected_columns.mark > mark - OVERLAP)
+        return db.execute(query).all()
+
+    def _build(self, rows, sources, locations):
+        import numpy as np
+
+        count = len(rows)
+        columns = {
+            'id': np.fromiter((row.id for row in rows), dtype=np.int64, count=count),
+            'timestamp': np.array([row.timestamp for row in rows], dtype='datetime64[us]'),
+            'event_id': np.array([row.event_id for row in rows], dtype=object),
+            'earthquake_id': np.fromiter(
+                (-1 if row.earthquake_id is None else row.earthquake_id for row in rows), dtype=np.int64, count=count
+            ),
+            'source': np.fromiter((sources.id(row.source) for row in rows), dtype=np.int32, count=count),
+            'location': np.fromiter((locations.id(row.location) for row in rows), dtype=np.int32, count=count),
+            'sources': np.fromiter((sources.id(row.sources) for row in rows), dtype=np.int32, count=count),
+        }
+        for name in RecentEvents.FLOAT_COLUMNS:
+            columns[name] = np.array([getattr(row, name) for row in rows], dtype=np.float64)
+        if not count:
+            columns['event_id'] = np.empty(0, dtype=object)
+        return columns
+
+    def _merge(self, current, fresh, start):
+        """Güncellenen id'ler yenisiyle değişir, pencere dışı atılır, zamana göre sıralanır"""
+        import numpy as np
+
+        keep = ~np.isin(current['id'], fresh['id'])
+        keep &= current['timestamp'] >= np.datetime64(start, 'us')
+        merged = {name: np.concatenate([current[name][keep], fresh[name]]) for name in current}
+        order = np.argsort(merged['timestamp'], kind='stable')
+        return {name: values[order] for name, values in merged.items()}
+
+    def sync(self, db, force=False):
+        """Gerekirse veritabanından güncelle; dönüş: güncel RecentEvents"""
+        if not force and not self._sync_due():
+            return self._events
+
+        import numpy as np
+
+        with self._lock:
+            if not force and not self._sync_due():
+                return self._events
+
+            now = time.monotonic()
+            start = utcnow() - self.window
+            full = self._events is None or now - self._loaded_at >= FULL_RELOAD_S
+
+            rows = self._fetch(db, start, None if full else self._mark)
+            marks = [row.mark for row in rows if row.mark is not None]
+            if self._mark is not None and not full:
+                marks.append(self._mark)
+
+            if full:
+                sources, locations = _Interner(), _Interner()
+                columns = self._build(rows, sources, locations)
+                order = np.argsort(columns['timestamp'], kind='stable')
+                columns = {name: values[order] for name, values in columns.items()}
+                self._loaded_at = now
+            else:
+                sources, locations = self._events.sources, self._events.locations
+                columns = self._merge(self._events.columns, self._build(rows, sources, locations), start)
+
+            self._mark = max(marks) if marks else None
+            self._events = RecentEvents(columns, sources, locations)
+            self._synced_at = now
+            return self._events
+
+    def expire(self):
+        """Sonraki okuma beklemeden senkronize etsin (veri sürümü değişti - api_cache.py)"""
+        self._synced_at = 0.0
+
+    def _sync_due(self):
+        return self._events is None or time.monotonic() - self._synced_at >= MIN_SYNC_INTERVAL_S
+
+    def snapshot(self, db):
+        """Okuyucular için: senkronize edilmiş tutarlı görüntü"""
+        return self.sync(db)
+
+
+# Süreç başına tek depo (web: API okumaları, scheduler: anomali tespiti)
+recent_earthquakes = RecentEventStore(Earthquake)
+recent_events = RecentEventStore(CanonicalEvent)
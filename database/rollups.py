@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Grid hücresi + kaynak başına saatlik/günlük özet tabloları
+- earthquake_rollups_hourly / earthquake_rollups_daily: sayı, en büyük
+  magnitüd, toplam enerji ve magnitüd sınıfı sayıları
+- Hücre AnomalyDetector grid'i ile aynı: round(enlem / 0.45), round(boylam / 0.45)
+- source='canonical' satırları kaynaklar arası tekil olaylardan (canonical_events)
+- Koordinatsız kayıtlar hücreye düşmediği için özetlere girmez
+- Ingest ile aynı transaction içinde, etkilenen (saat, kaynak) kovaları ham
+  satırlardan yeniden hesaplanır (silme + INSERT ... SELECT, PostgreSQL ve
+  SQLite için aynı ifadeler - database/dialect.py); böylece
+  güncellenen/taşınan kayıtlarda da özet doğru kalır
+- Toplu yüklemelerden (COPY içe aktarma, migration) sonra --rebuild ile baştan kurulur;
+  soğuk katmana taşınmış aylar (database/cold_storage.py) yeniden kurulmaz
+
+Kullanım:
+    python database/rollups.py --rebuild                      # tüm geçmiş
+    python database/rollups.py --rebuild --since 2023-01-01
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    Column, DateTime, Float, Integer, MetaData, String, Table,
+    and_, cast, delete, func, insert, literal, literal_column, select, tuple_
+)
+
+from database.cold_storage import cold_months, hot_since
+from database.dialect import advisory_xact_lock, time_bucket
+from database.models import (
+    CanonicalEvent, Earthquake, EarthquakeRollupDaily, EarthquakeRollupHourly, MaintenanceSession
+)
+from database.versions import EARTHQUAKES, bump
+
+GRID_SIZE = 0.45  # AnomalyDetector.grid_size ile aynı (~50km)
+CANONICAL_SOURCE = 'canonical'
+ADVISORY_LOCK_KEY = 80080803  # Aynı kovanın eşzamanlı yeniden hesaplanmasını önler
+
+HOURLY = EarthquakeRollupHourly.__table__
+DAILY = EarthquakeRollupDaily.__table__
+ROLLUP_COLUMNS = [
+    'bucket', 'source', 'cell_lat', 'cell_lon', 'event_count', 'max_magnitude', 'energy',
+    'count_m25', 'count_m3', 'count_m4', 'count_m5',
+]
+# GROUP BY bucket, source, cell_lat, cell_lon (sıra numarasıyla; iki arka uçta da geçerli)
+GROUP_KEYS = [literal_column(str(i)) for i in range(1, 5)]
+
+
+def hour_bucket(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(timestamp):
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _hourly_select(table, source_expr, start, end):
+    """Ham tablodan (earthquakes / canonical_events) saatlik özet satırları"""
+    magnitude = table.c.magnitude
+    return select(
+        time_bucket('hour', table.c.timestamp),
+        source_expr,
+        cast(func.round(table.c.latitude / GRID_SIZE), Integer),
+        cast(func.round(table.c.longitude / GRID_SIZE), Integer),
+        func.count(),
+        func.max(magnitude),
+        func.coalesce(func.sum(func.power(10, 1.5 * magnitude + 4.8)), 0),
+        func.count().filter(and_(magnitude >= 2.5, magnitude < 3.0)),
+        func.count().filter(and_(magnitude >= 3.0, magnitude < 4.0)),
+        func.count().filter(and_(magnitude >= 4.0, magnitude < 5.0)),
+        func.count().filter(magnitude >= 5.0),
+    ).where(
+        table.c.latitude.isnot(None),
+        table.c.longitude.isnot(None),
+        table.c.timestamp >= start,
+        table.c.timestamp < end,
+    ).group_by(*GROUP_KEYS)
+
+
+def _raw_hourly(start, end, table=None):
+    table = Earthquake.__table__ if table is None else table
+    return _hourly_select(table, table.c.source, start, end)
+
+
+def _canonical_hourly(start, end):
+    return _hourly_select(CanonicalEvent.__table__, literal(CANONICAL_SOURCE, String), start, end)
+
+
+def _daily_select(start, end):
+    return select(
+        time_bucket('day', HOURLY.c.bucket), HOURLY.c.source, HOURLY.c.cell_lat, HOURLY.c.cell_lon,
+        func.sum(HOURLY.c.event_count), func.max(HOURLY.c.max_magnitude), func.sum(HOURLY.c.energy),
+        func.sum(HOURLY.c.count_m25), func.sum(HOURLY.c.count_m3),
+        func.sum(HOURLY.c.count_m4), func.sum(HOURLY.c.count_m5),
+    ).where(
+        HOURLY.c.bucket >= start,
+        HOURLY.c.bucket < end,
+    ).group_by(*GROUP_KEYS)
+
+
+def _insert(table, query):
+    return insert(table).from_select(ROLLUP_COLUMNS, query)
+
+
+def refresh_rollups(db, pairs):
+    """
+    Etkilenen (saat başı, kaynak) kovalarını yeniden hesapla
+    Kaynak 'canonical' ise canonical_events'ten, değilse earthquakes'ten
+    Ham satırları soğuk katmanda olan aylar atlanır: tablodaki kısmi veriyle
+    hesaplanırsa özet eksilir; taşıma işi birleştirirken günceller (refresh_cold_rollups)
+    Commit çağıran tarafa aittir (ingest ile aynı transaction)
+
+    Dönüş: yeniden hesaplanan saatlik kova sayısı
+    """
+    pairs = set(pairs)
+    cold = set(cold_months())
+    if cold:
+        pairs = {
+            (bucket, source) for bucket, source in pairs
+            if source == CANONICAL_SOURCE or (bucket.year, bucket.month) not in cold
+        }
+    return _refresh(db, sorted(pairs), Earthquake.__table__)
+
+
+def refresh_cold_rollups(db, pairs, rows):
+    """
+    Soğuk aya geç gelen kayıtlar dosyayla birleştirildikten sonra etkilenen kovalar
+    rows: o saatlerin tüm ham satırları (timestamp, latitude, longitude, magnitude,
+    source sözlükleri); geçici tabloya yüklenip aynı ifadelerle hesaplanır
+    """
+    staging = Table(
+        'rollup_staging', MetaData(),
+        Column('timestamp', DateTime), Column('latitude', Float), Column('longitude', Float),
+        Column('magnitude', Float), Column('source', String),
+        prefixes=['TEMPORARY'],
+    )
+    connection = db.connection()
+    staging.create(connection)
+    try:
+        if rows:
+            db.execute(insert(staging), rows)
+        return _refresh(db, sorted(set(pairs)), staging)
+    finally:
+        staging.drop(connection)
+
+
+def _refresh(db, pairs, raw_table):
+    if not pairs:
+        return 0
+
+    advisory_xact_lock(db, ADVISORY_LOCK_KEY)
+
+    # 1. Saatlik kovalar
+    start = pairs[0][0]
+    end = max(bucket for bucket, _ in pairs) + timedelta(hours=1)
+    canonical_hours = [bucket for bucket, source in pairs if source == CANONICAL_SOURCE]
+
+    db.execute(delete(HOURLY).where(tuple_(HOURLY.c.bucket, HOURLY.c.source).in_(pairs)))
+
+    raw = _raw_hourly(start, end, raw_table)
+    db.execute(_insert(HOURLY, raw.where(
+        tuple_(time_bucket('hour', raw_table.c.timestamp), raw_table.c.source).in_(pairs)
+    )))
+
+    if canonical_hours:
+        canonical_table = CanonicalEvent.__table__
+        db.execute(_insert(HOURLY, _canonical_hourly(start, end).where(
+            time_bucket('hour', canonical_table.c.timestamp).in_(canonical_hours)
+        )))
+
+    # 2. Günlük kovalar saatlik özetlerden
+    days = sorted({(day_bucket(bucket), source) for bucket, source in pairs})
+    day_end = max(bucket for bucket, _ in days) + timedelta(days=1)
+
+    db.execute(delete(DAILY).where(tuple_(DAILY.c.bucket, DAILY.c.source).in_(days)))
+    db.execute(_insert(DAILY, _daily_select(days[0][0], day_end).where(
+        tuple_(time_bucket('day', HOURLY.c.bucket), HOURLY.c.source).in_(days)
+    )))
+
+    return len(pairs)
+
+
+def rebuild_range(db, start, end):
+    """[start, end) gün aralığındaki tüm özetleri baştan kur (gün sınırına hizalı)"""
+    advisory_xact_lock(db, ADVISORY_LOCK_KEY)
+
+    for table in (DAILY, HOURLY):
+        db.execute(delete(table).where(table.c.bucket >= start, table.c.bucket < end))
+
+    db.execute(_insert(HOURLY, _raw_hourly(start, end)))
+    db.execute(_insert(HOURLY, _canonical_hourly(start, end)))
+    db.execute(_insert(DAILY, _daily_select(start, end)))
+
+
+def rebuild_rollups(since=None, until=None):
+    """
+    Özetleri ay ay (her ay ayrı transaction) baştan kur
+    since/until verilmezse verinin tamamı
+    """
+    print("\n" + "="*60)
+    print("🧮 ÖZET TABLOLARI YENİDEN KURULUYOR")
+    print("="*60)
+
+    db = MaintenanceSession()
+    started = time.perf_counter()
+
+    try:
+        if since is None or until is None:
+            bounds = [
+                value
+                for column in (Earthquake.timestamp, CanonicalEvent.timestamp)
+                for value in db.execute(select(func.min(column), func.max(column))).one()
+                if value is not None
+            ]
+            if not bounds:
+                print("⚠️  Veritabanında deprem yok")
+                return 0
+            since = since or min(bounds)
+            until = until or max(bounds)
+
+        start = day_bucket(since).replace(day=1)
+        end = day_bucket(until) + timedelta(days=1)
+
+        # Soğuk katmandaki aylar ham tabloda yok; özetleri silinirse geri gelmez
+        hot_start = hot_since()
+        if hot_start is not None and start < hot_start:
+            print(f"⚠️  {hot_start:%Y-%m} öncesi soğuk katmanda (database/cold_storage.py), atlanıyor")
+            start = hot_start
+        months = 0
+
+        while start < end:
+            next_month = (start + timedelta(days=32)).replace(day=1)
+            chunk_end = min(next_month, end)
+
+            rebuild_range(db, start, chunk_end)
+            bump(db, EARTHQUAKES)
+            db.commit()
+            months += 1
+            print(f"   ✅ {start:%Y-%m}")
+
+            start = chunk_end
+
+        rows = db.execute(select(func.count()).select_from(HOURLY)).scalar()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print("="*60)
+    print(f"✅ {months} ay yeniden kuruldu, {rows:,} saatlik özet satırı")
+    print(f"⏱️  Süre: {time.perf_counter() - started:.1f}s")
+    print("="*60 + "\n")
+    return months
+
+
+def window_totals(db, start, source=CANONICAL_SOURCE):
+    """
+    start'tan bu yana toplam sayı ve en büyük magnitüd
+    Tam saatler saatlik özetten, ilk (kısmi) saat ham tablodan okunur - sonuç kesin
+    """
+    first_full_hour = hour_bucket(start)
+    if first_full_hour < start:
+        first_full_hour += timedelta(hours=1)
+
+    count, max_magnitude = db.execute(
+        select(func.coalesce(func.sum(HOURLY.c.event_count), 0), func.max(HOURLY.c.max_magnitude))
+        .where(HOURLY.c.source == source, HOURLY.c.bucket >= first_full_hour)
+    ).one()
+
+    if first_full_hour > start:
+        model = CanonicalEvent if source == CANONICAL_SOURCE else Earthquake
+        edge = select(func.count(), func.max(model.magnitude)).where(
+            model.timestamp >= start,
+            model.timestamp < first_full_hour,
+            model.latitude.isnot(None),
+            model.longitude.isnot(None),
+        )
+        if model is Earthquake:
+            edge = edge.where(Earthquake.source == source)
+        edge_count, edge_max = db.execute(edge).one()
+
+        count += edge_count
+        if edge_max is not None and (max_magnitude is None or edge_max > max_magnitude):
+            max_magnitude = edge_max
+
+    return count, max_magnitude
+
+
+def cell_counts(db, start, end=None, source=CANONICAL_SOURCE, daily=False):
+    """[start, end) aralığında hücre başına deprem sayısı: {(cell_lat, cell_lon): n}"""
+    table = DAILY if daily else HOURLY
+
+    query = select(table.c.cell_lat, table.c.cell_lon, func.sum(table.c.event_count)).where(
+        table.c.source == source,
+        table.c.bucket >= start,
+    ).group_by(table.c.cell_lat, table.c.cell_lon)
+    if end is not None:
+        query = query.where(table.c.bucket < end)
+
+    return {(cell_lat, cell_lon): int(count) for cell_lat, cell_lon, count in db.execute(query)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deprem özet tabloları (saatlik/günlük)")
+    parser.add_argument('--rebuild', action='store_true', help="Özetleri ham tablolardan baştan kur")
+    parser.add_argument('--since', help="Başlangıç tarihi (YYYY-MM-DD)")
+    parser.add_argument('--until', help="Bitiş tarihi (YYYY-MM-DD, dahil)")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+        sys.exit(0)
+
+    rebuild_rollups(
+        since=datetime.fromisoformat(args.since) if args.since else None,
+        until=datetime.fromisoformat(args.until) if args.until else None,
+    )
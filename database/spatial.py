@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Mesafe sorguları (yarıçap ve en yakın komşu)
+- PostgreSQL/PostGIS: geog (geography(Point, 4326)) kolonu üzerinde ST_DWithin
+  ve KNN (<->) sıralaması; ikisi de GiST indeksini kullanır, küre üzerinde kesindir
+- geog, latitude/longitude'dan üretilen (GENERATED ... STORED) bir kolondur;
+  upsert, COPY ve eşleştirme dahil her yazmada veritabanı tarafından doldurulur
+- Gömülü SQLite'ta geog yoktur: enlem/boylam kutusu ön filtresi + haversine
+  (bağlantıda kaydedilen distance_km fonksiyonu - database/dialect.py)
+"""
+import math
+
+from sqlalchemy import and_, func
+
+from database.dialect import is_sqlite
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.2
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """İki nokta arası büyük daire mesafesi (km)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def sqlite_distance_km(lat1, lon1, lat2, lon2):
+    """SQLite fonksiyonu: koordinatı eksik satırda NULL"""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    return haversine_km(lat1, lon1, lat2, lon2)
+
+
+def point(lat, lon):
+    """Sorgu noktası (geography)"""
+    return func.ST_GeogFromText(f"SRID=4326;POINT({float(lon)} {float(lat)})")
+
+
+def distance_km(db, model, lat, lon):
+    """Kayıt ile nokta arası mesafe ifadesi (km)"""
+    if is_sqlite(db):
+        return func.distance_km(model.latitude, model.longitude, lat, lon)
+    return func.ST_Distance(model.geog, point(lat, lon)) / 1000.0
+
+
+def within_radius(db, model, lat, lon, radius_km):
+    """Yarıçap filtresi (filter()'a verilir)"""
+    if is_sqlite(db):
+        lat_range = radius_km / KM_PER_DEGREE
+        lon_range = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        return and_(
+            model.latitude.between(lat - lat_range, lat + lat_range),
+            model.longitude.between(lon - lon_range, lon + lon_range),
+            distance_km(db, model, lat, lon) <= radius_km,
+        )
+    return func.ST_DWithin(model.geog, point(lat, lon), radius_km * 1000.0)
+
+
+def nearest_first(db, model, lat, lon):
+    """En yakından uzağa sıralama (order_by'a verilir) - PostGIS'te indeksli KNN"""
+    if is_sqlite(db):
+        return distance_km(db, model, lat, lon)
+    return model.geog.op('<->')(point(lat, lon))
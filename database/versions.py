@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Veri sürümleri (data_versions)
+- Deprem ve anomali verisini değiştiren her yazma, sayacı kendi
+  transaction'ı içinde artırır: sürüm görünür olduğunda veri de görünürdür
+  (read replica'da da aynı sırayla gelir)
+- Okuyucular (api_cache.py) sadece bu küçük tabloya bakarak önbelleğin hâlâ
+  geçerli olup olmadığını anlar
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database.dialect import insert_for
+from database.models import DataVersion
+
+EARTHQUAKES = 'earthquakes'  # earthquakes, canonical_events (ve türetilen özetler)
+ANOMALIES = 'anomalies'
+
+
+def bump(db, *names):
+    """Sürümleri bir artır; commit çağıran tarafa aittir"""
+    now = datetime.utcnow()
+    for name in names:
+        stmt = insert_for(db, DataVersion).values(name=name, version=1, updated_at=now)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'version': DataVersion.version + 1, 'updated_at': now}
+        ))
+
+
+def read_versions(db):
+    """{isim: sürüm}"""
+    return dict(db.execute(select(DataVersion.name, DataVersion.version)).all())
@@ -2,8 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from collectors.usgs_collector import USGSCollector
-from collectors.kandilli_collector import KandilliCollector
+from collectors.parallel_collector import collect_all_parallel
 from analyzers.anomaly_detector import AnomalyDetector
 from alerts.email_service import EmailAlertService
 from database.models import init_database
@@ -17,15 +16,9 @@ def collect_all_data():
     print(f"⏰ Başlangıç: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*60 + "\n")
     
-    # 1. Kandilli (Türkiye)
-    print("📍 1/2: Türkiye depremlerini çekiyorum (Kandilli)...")
-    kandilli = KandilliCollector()
-    kandilli.collect()
-    
-    # 2. USGS (Global)
-    print("\n📍 2/2: Global depremlerini çekiyorum (USGS)...")
-    usgs = USGSCollector()
-    usgs.collect(days=7, min_magnitude=2.5)
+    # Kandilli (Türkiye), USGS (Global) ve AFAD paralel
+    print("📍 Kandilli, USGS ve AFAD depremlerini paralel çekiyorum...")
+    collect_all_parallel()
     
     print("\n" + "="*60)
     print("✅ TÜM VERİLER BAŞARIYLA TOPLANDI!")
@@ -10,9 +10,12 @@ from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
 import time
 
-from collectors.usgs_collector import USGSCollector
-from collectors.kandilli_collector import KandilliCollector
+from collectors.parallel_collector import collect_all_parallel
 from analyzers.anomaly_detector import AnomalyDetector
+from analyzers.event_association import associate_recent
+from database.partitions import ensure_partitions
+from database.cold_storage import tier_events
+from database.catalog_export import export_catalog
 from alerts.email_service import EmailAlertService
 
 def run_data_collection():
@@ -22,15 +25,9 @@ def run_data_collection():
     print("⏰"*30 + "\n")
     
     try:
-        # Kandilli
-        print("📍 Kandilli'den veri çekiliyor...")
-        kandilli = KandilliCollector()
-        kandilli.collect()
-        
-        # USGS
-        print("\n📍 USGS'den veri çekiliyor...")
-        usgs = USGSCollector()
-        usgs.collect(days=7, min_magnitude=2.5)
+        # Kandilli, USGS ve AFAD paralel çekilir - yavaş kaynak diğerlerini bekletmez
+        print("📍 Kandilli, USGS ve AFAD'dan paralel veri çekiliyor...")
+        collect_all_parallel()
         
         print("\n✅ Veri toplama tamamlandı!")
         
@@ -63,6 +60,30 @@ def run_anomaly_detection():
         print(f"❌ Anomali analizi hatası: {e}")
 
 
+def run_partition_maintenance():
+    """Önümüzdeki aylar için earthquakes partition'larını önceden aç"""
+    try:
+        ensure_partitions()
+    except Exception as e:
+        print(f"❌ Partition bakım hatası: {e}")
+
+
+def run_cold_tiering():
+    """Ufuktan eski ayları Parquet soğuk katmanına taşı"""
+    try:
+        tier_events()
+    except Exception as e:
+        print(f"❌ Soğuk katman hatası: {e}")
+
+
+def run_catalog_export():
+    """Değişen ayları analiz kataloğuna (Parquet) yaz"""
+    try:
+        export_catalog()
+    except Exception as e:
+        print(f"❌ Katalog export hatası: {e}")
+
+
 def start_scheduler():
     """Scheduler'ı başlat"""
     scheduler = BackgroundScheduler()
@@ -94,6 +115,35 @@ def start_scheduler():
         replace_existing=True
     )
     
+    # Her gün 03:00'te gelecek ayların partition'ları
+    scheduler.add_job(
+        func=run_partition_maintenance,
+        trigger=CronTrigger(hour=3, minute=0),
+        id='partition_maintenance_job',
+        name='Partition Bakımı',
+        replace_existing=True
+    )
+    
+    # Soğuk katman kalıcı bir dizin gerektirir (konteyner diski yeniden başlatmada silinir)
+    if os.getenv('COLD_STORAGE_DIR'):
+        scheduler.add_job(
+            func=run_cold_tiering,
+            trigger=CronTrigger(hour=4, minute=0),
+            id='cold_tiering_job',
+            name='Soğuk Katman',
+            replace_existing=True
+        )
+    
+    # Analiz kataloğu: taşımadan sonra (taşınan aylar export'tan çıkar)
+    if os.getenv('CATALOG_DIR'):
+        scheduler.add_job(
+            func=run_catalog_export,
+            trigger=CronTrigger(hour=4, minute=30),
+            id='catalog_export_job',
+            name='Katalog Export',
+            replace_existing=True
+        )
+    
     scheduler.start()
     
     print("\n" + "🚀"*30)
@@ -105,6 +155,16 @@ def start_scheduler():
     print("   📧 Günlük Rapor: Her gün 22:00'da")  # ← YENİ SATIR
     print("\n💡 Sistemi durdurmak için CTRL+C basın\n")
     
+    # Bu ayın partition'ı yoksa ilk insert başarısız olur
+    run_partition_maintenance()
+    
+    # Önceden kaydedilmiş ama tekil olaya bağlanmamış kayıtları yakala
+    # (baseline penceresi: 90 gün + 48 saat)
+    try:
+        associate_recent(days=92)
+    except Exception as e:
+        print(f"❌ Olay eşleştirme hatası: {e}")
+    
     # İlk çalıştırmayı hemen yap
     print("🏃 İlk veri toplama başlatılıyor...\n")
     run_data_collection()
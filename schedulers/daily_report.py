@@ -8,29 +8,82 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import and_
+from sqlalchemy import and_, func, literal_column
 from dotenv import load_dotenv
 
 # PYTHON PATH DÜZELTMESİ - Proje root'unu ekle
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Şimdi import edebiliriz
-from database.models import Earthquake, Anomaly, SessionLocal
+from database.dialect import time_bucket
+from database.models import CanonicalEvent, EarthquakeRollupHourly, Anomaly, DetectorSession
+from database.rollups import CANONICAL_SOURCE, hour_bucket
 
 load_dotenv()
 
+TURKEY_OFFSET = timedelta(hours=3)
+
 def get_turkey_time():
     """Türkiye saatini döndür (UTC+3)"""
-    turkey_tz = timezone(timedelta(hours=3))
+    turkey_tz = timezone(TURKEY_OFFSET)
     return datetime.now(timezone.utc).astimezone(turkey_tz)
 
+def get_rollup_summary(db, start, end):
+    """
+    [start, end) saatlik özetlerinden toplam ve büyüklük dağılımı
+    start/end saat başına hizalı naive UTC olmalı
+    """
+    H = EarthquakeRollupHourly
+    total, m5, m4, m3, m25 = db.query(
+        func.coalesce(func.sum(H.event_count), 0),
+        func.coalesce(func.sum(H.count_m5), 0),
+        func.coalesce(func.sum(H.count_m4), 0),
+        func.coalesce(func.sum(H.count_m3), 0),
+        func.coalesce(func.sum(H.count_m25), 0),
+    ).filter(
+        H.source == CANONICAL_SOURCE,
+        H.bucket >= start,
+        H.bucket < end
+    ).one()
+    
+    return {
+        'total': int(total),
+        'mag_distribution': {
+            '5.0+': int(m5),
+            '4.0-4.9': int(m4),
+            '3.0-3.9': int(m3),
+            '2.5-2.9': int(m25),
+        }
+    }
+
+def clean_location(location):
+    """Kandilli'nin İlksel/Revize eklerini at"""
+    return location.replace('İlksel', '').replace('Revize', '').strip()
+
+def location_city(location):
+    """Konum metninden şehir - GELİŞTİRİLMİŞ PARSE"""
+    location = clean_location(location)
+    
+    # 1. Önce parantez içini kontrol et
+    if '(' in location and ')' in location:
+        city = location.split('(')[-1].replace(')', '').strip()
+    # 2. Parantez yoksa, tire sonrasını al
+    elif '-' in location:
+        city = location.split('-')[-1].strip()
+    # 3. Hiçbiri yoksa tüm metni al (Kıbrıs gibi)
+    else:
+        city = location.strip()
+    
+    # Son temizlik
+    return clean_location(city) if city else None
+
 def get_daily_stats(days_back=0):
     """
     Belirtilen gün öncesinin deprem istatistiklerini hesapla
     days_back=0: Bugün
     days_back=1: Dün
     """
-    db = SessionLocal()
+    db = DetectorSession()
     
     try:
         # Türkiye saati ile hedef günün başlangıcı (00:00)
@@ -49,39 +102,43 @@ def get_daily_stats(days_back=0):
         print(f"   🌍 Başlangıç (UTC): {today_start_utc.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"   🌍 Bitiş (UTC): {today_end_utc.strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Hedef günün depremleri - Naive timestamp karşılaştırması
-        earthquakes_today = db.query(Earthquake).filter(
-            and_(
-                Earthquake.timestamp >= today_start_utc.replace(tzinfo=None),
-                Earthquake.timestamp < today_end_utc.replace(tzinfo=None)
-            )
-        ).all()
+        # Hedef gün - Naive UTC (Türkiye günü saat başına hizalı, saatlik özetler kesin)
+        window_start = today_start_utc.replace(tzinfo=None)
+        window_end = today_end_utc.replace(tzinfo=None)
+        summary = get_rollup_summary(db, window_start, window_end)
         
         # Eğer hala bulamazsa, son 24 saati dene
-        if len(earthquakes_today) == 0:
+        if summary['total'] == 0:
             print("⚠️  Bugünün verisi bulunamadı, son 24 saat deneniyor...")
-            last_24h = datetime.now(timezone.utc) - timedelta(hours=24)
-            earthquakes_today = db.query(Earthquake).filter(
-                Earthquake.timestamp >= last_24h.replace(tzinfo=None)
-            ).all()
+            window_end = hour_bucket(datetime.utcnow()) + timedelta(hours=1)
+            window_start = window_end - timedelta(hours=24)
+            summary = get_rollup_summary(db, window_start, window_end)
         
-        # İstatistikler
-        total_count = len(earthquakes_today)
+        # İstatistikler (kaynaklar arası tekil depremler)
+        total_count = summary['total']
         
         print(f"\n📊 Bulunan deprem sayısı: {total_count}")
         
         if total_count == 0:
             return None
         
-        max_eq = max(earthquakes_today, key=lambda x: x.magnitude)
+        # Günün olayları satır satır yüklenmez: en büyük deprem tek satır,
+        # bölgeler konum başına sayı (sonuç boyutu günün yoğunluğundan bağımsız)
+        in_window = and_(
+            CanonicalEvent.timestamp >= window_start,
+            CanonicalEvent.timestamp < window_end
+        )
+        max_eq = db.query(
+            CanonicalEvent.magnitude, CanonicalEvent.location, CanonicalEvent.timestamp
+        ).filter(in_window, CanonicalEvent.magnitude.isnot(None)).order_by(
+            CanonicalEvent.magnitude.desc(), CanonicalEvent.timestamp
+        ).first()
+        
+        if max_eq is None:
+            return None
         
         # Büyüklük dağılımı
-        mag_distribution = {
-            '5.0+': len([eq for eq in earthquakes_today if eq.magnitude >= 5.0]),
-            '4.0-4.9': len([eq for eq in earthquakes_today if 4.0 <= eq.magnitude < 5.0]),
-            '3.0-3.9': len([eq for eq in earthquakes_today if 3.0 <= eq.magnitude < 4.0]),
-            '2.5-2.9': len([eq for eq in earthquakes_today if 2.5 <= eq.magnitude < 3.0]),
-        }
+        mag_distribution = summary['mag_distribution']
         
         # Aktif anomaliler - TÜM ANOMALİLERİ SAY (is_active kontrolü yapma)
         try:
@@ -95,51 +152,39 @@ def get_daily_stats(days_back=0):
             print(f"⚠️ Anomali sorgusu hatası: {e}")
             active_anomalies = []
         
-        # Bölgesel dağılım (şehir bazlı) - GELİŞTİRİLMİŞ PARSE
+        # Bölgesel dağılım (şehir bazlı) - konum sayıları SQL'de, şehir ayrıştırma konum başına
+        location_counts = db.query(CanonicalEvent.location, func.count()).filter(
+            in_window, CanonicalEvent.location.isnot(None)
+        ).group_by(CanonicalEvent.location).all()
+        
         regional_counts = {}
-        for eq in earthquakes_today:
-            # Lokasyonu temizle
-            location = eq.location.replace('İlksel', '').replace('Revize', '').strip()
-    
-            # Şehir çıkarma mantığı
-            city = None
-    
-            # 1. Önce parantez içini kontrol et
-            if '(' in location and ')' in location:
-                city = location.split('(')[-1].replace(')', '').strip()
-                # 2. Parantez yoksa, tire sonrasını al
-            elif '-' in location:
-                parts = location.split('-')
-                city = parts[-1].strip()
-                # 3. Hiçbiri yoksa tüm metni al (Kıbrıs gibi)
-            else:
-                city = location.strip()
-    
-            # Son temizlik
-            if city:
-                city = city.replace('İlksel', '').replace('Revize', '').strip()
+        for location, count in location_counts:
+            city = location_city(location)
             if city:  # Boş değilse
-                regional_counts[city] = regional_counts.get(city, 0) + 1
+                regional_counts[city] = regional_counts.get(city, 0) + count
         
         # En aktif 5 bölge
-        top_regions = sorted(regional_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        top_regions = sorted(regional_counts.items(), key=lambda x: (-x[1], x[0]))[:5]
+        
+        # Son 7 günlük trend - saatlik özetler Türkiye günlerine SQL'de toplanır (en fazla 7 satır)
+        trend_start = (today_start - timedelta(days=6)).astimezone(timezone.utc).replace(tzinfo=None)
+        daily_totals = db.query(
+            time_bucket('day', EarthquakeRollupHourly.bucket, TURKEY_OFFSET),
+            func.sum(EarthquakeRollupHourly.event_count)
+        ).filter(
+            EarthquakeRollupHourly.source == CANONICAL_SOURCE,
+            EarthquakeRollupHourly.bucket >= trend_start,
+            EarthquakeRollupHourly.bucket < today_end_utc.replace(tzinfo=None)
+        ).group_by(literal_column('1')).all()
+        
+        daily_counts = {day.date(): int(count) for day, count in daily_totals}
         
-        # Son 7 günlük trend
         trend_data = []
         for i in range(6, -1, -1):
-            day_start = (today_start - timedelta(days=i)).astimezone(timezone.utc).replace(tzinfo=None)
-            day_end = (today_start - timedelta(days=i-1)).astimezone(timezone.utc).replace(tzinfo=None)
-            
-            day_count = db.query(Earthquake).filter(
-                and_(
-                    Earthquake.timestamp >= day_start,
-                    Earthquake.timestamp < day_end
-                )
-            ).count()
-            
+            day = today_start - timedelta(days=i)
             trend_data.append({
-                'date': (today_start - timedelta(days=i)).strftime('%d %b'),
-                'count': day_count
+                'date': day.strftime('%d %b'),
+                'count': daily_counts.get(day.date(), 0)
             })
         
         return {
@@ -147,7 +192,7 @@ def get_daily_stats(days_back=0):
             'total_count': total_count,
             'max_earthquake': {
                 'magnitude': max_eq.magnitude,
-                'location': max_eq.location.replace('İlksel', '').replace('Revize', '').strip(),
+                'location': clean_location(max_eq.location or ''),
                 'time': max_eq.timestamp.strftime('%H:%M') if hasattr(max_eq.timestamp, 'strftime') else str(max_eq.timestamp)
             },
             'mag_distribution': mag_distribution,
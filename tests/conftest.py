@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Testler gömülü SQLite ile çalışır (PostgreSQL gerekmez)
+Session factory'leri süreç başına bir kez bağlandığı için tüm oturum tek
+geçici veritabanını paylaşır; testler birbirinden ayrı event_id/zaman kullanır
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_workdir = tempfile.mkdtemp(prefix='deprem_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ.setdefault('RAW_ARCHIVE', '0')
+
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    from database.models import init_db
+
+    init_db()
+    yield os.environ['DATABASE_URL']
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from collectors.archive_backfill import ArchiveBackfill
+from database.models import ArchiveBackfillMonth, SessionLocal
+
+
+def backfill(pages):
+    job = ArchiveBackfill(workers=1, rate=1000, burst=10, max_attempts=2, retry_backoff=0)
+    job.scraper.download_month = lambda year, month: pages[(year, month)]
+    return job
+
+
+def checkpoint(year, month):
+    db = SessionLocal()
+    try:
+        return db.get(ArchiveBackfillMonth, (year, month))
+    finally:
+        db.close()
+
+
+def test_missing_page_is_empty():
+    assert backfill({(1990, 1): None}).process_month(1990, 1) == ('empty', 0)
+    assert checkpoint(1990, 1).status == 'empty'
+
+
+def test_page_without_rows_is_retried_not_empty():
+    # Kesik yanıt / hata sayfası: 200 döner ama deprem satırı yok
+    job = backfill({(1990, 2): "<html><body>Service Unavailable</body></html>"})
+    assert job.process_month(1990, 2) == ('failed', 0)
+
+    row = checkpoint(1990, 2)
+    assert row.status == 'failed'
+    assert row.attempts == 2
+    assert 'deprem satırı' in row.last_error
+
+    # Başarısız ay bir sonraki planda tekrar kuyruğa girer
+    assert (1990, 2) in job.plan([(1990, 2)])
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta, timezone
+
+from collectors.kandilli_collector import KandilliCollector
+from collectors.kandilli_parser import LIVE, parse, to_records
+from database.ingest import upsert_earthquakes
+from database.models import CanonicalEvent, EventOrigin, SessionLocal
+
+
+def live_page(local_time, latitude, longitude, magnitude):
+    """Tek satırlık lst0.asp içeriği (zaman Türkiye yerel saati)"""
+    line = (
+        f"{local_time:%Y.%m.%d %H:%M:%S}  {latitude:7.4f}   {longitude:7.4f}"
+        f"        10.0      -.-  {magnitude:.1f}  -.-   {'SINDIRGI (BALIKESIR)':<50}İlksel"
+    )
+    return '\n' * 6 + line + '\n'
+
+
+def test_kandilli_timestamps_are_utc():
+    local = datetime(2025, 8, 10, 22, 53, 46)
+    [record] = to_records(parse(live_page(local, 39.2, 28.1, 6.1), LIVE))
+
+    assert record['timestamp'] == local - timedelta(hours=3)
+    # event_id yerel tarih/saatten üretilir (mevcut kayıtlarla aynı)
+    assert KandilliCollector().to_event(record)['event_id'].startswith('kandilli_20250810_225346_')
+
+
+def test_kandilli_and_usgs_records_of_same_quake_associate():
+    local = datetime(2025, 8, 10, 22, 53, 46)  # Kandilli: UTC+3
+    usgs_time = datetime(2025, 8, 10, 19, 53, 50, tzinfo=timezone.utc)
+
+    kandilli = [KandilliCollector().to_event(eq) for eq in to_records(parse(live_page(local, 39.2, 28.1, 6.1), LIVE))]
+    usgs = [{
+        'event_id': 'us6000test', 'timestamp': usgs_time, 'latitude': 39.25, 'longitude': 28.05,
+        'magnitude': 6.1, 'depth': 11.0, 'location': 'western Turkey', 'source': 'USGS',
+    }]
+
+    upsert_earthquakes(kandilli)
+    upsert_earthquakes(usgs)
+
+    db = SessionLocal()
+    try:
+        origins = {
+            origin.event_id: origin.canonical_id
+            for origin in db.query(EventOrigin).filter(
+                EventOrigin.event_id.in_([kandilli[0]['event_id'], 'us6000test'])
+            )
+        }
+        assert len(origins) == 2
+        assert len(set(origins.values())) == 1
+
+        canonical = db.get(CanonicalEvent, origins['us6000test'])
+        assert canonical.sources == 'Kandilli,USGS'
+        assert canonical.timestamp == datetime(2025, 8, 10, 19, 53, 46)
+    finally:
+        db.close()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from collectors.kandilli_collector import KandilliCollector
+from database.models import Earthquake, SessionLocal
+
+
+def line(local_time, magnitude, location='SINDIRGI (BALIKESIR)'):
+    return (
+        f"{local_time:%Y.%m.%d %H:%M:%S}  39.2000   28.1000"
+        f"        10.0      -.-  {magnitude:.1f}  -.-   {location:<50}İlksel"
+    )
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """lst0.asp yerine sırayla verilen sayfaları döndürür"""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+
+    def get(self, url, timeout=None):
+        lines = self.pages.pop(0)
+        return FakeResponse(('\n' * 6 + '\n'.join(lines) + '\n').encode('ISO-8859-9'))
+
+
+def test_take_new_lines_sees_lines_below_marker():
+    collector = KandilliCollector(session=FakeSession([]))
+    top, middle, bottom = 'A 3.1', 'B 2.0', 'C 1.8'
+
+    new_lines, marker = collector.take_new_lines([top, bottom], None)
+    assert new_lines == [top, bottom]
+
+    # Geç gelen satır en üst satırın altına eklendi
+    new_lines, marker = collector.take_new_lines([top, middle, bottom], marker)
+    assert new_lines == [middle]
+
+    # Revize satır (aynı yer, farklı içerik) da yeni sayılır
+    new_lines, _ = collector.take_new_lines([top, middle, 'C 2.2'], marker)
+    assert new_lines == ['C 2.2']
+
+
+def test_collect_delta_ingests_late_inserted_line():
+    newest = line(datetime(2025, 9, 1, 12, 30, 0), 3.1)
+    oldest = line(datetime(2025, 9, 1, 10, 0, 0), 1.8)
+    late = line(datetime(2025, 9, 1, 11, 15, 0), 2.4, 'SIMAV (KUTAHYA)')
+    revised = line(datetime(2025, 9, 1, 10, 0, 0), 2.0)
+
+    collector = KandilliCollector(session=FakeSession([
+        [newest, oldest],
+        [newest, late, oldest],
+        [newest, late, revised],
+    ]))
+    collector.cursor_name = 'kandilli_test_delta'
+
+    assert len(collector.collect_delta()) == 2
+    [record] = collector.collect_delta()
+    assert record['location'].startswith('SIMAV (KUTAHYA)')
+    [record] = collector.collect_delta()
+    assert record['magnitude'] == 2.0
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Earthquake).filter(Earthquake.event_id.like('kandilli_20250901_%')).all()
+        magnitudes = {row.event_id.split('_')[2]: row.magnitude for row in rows}
+        assert magnitudes == {'123000': 3.1, '111500': 2.4, '100000': 2.0}
+    finally:
+        db.close()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from collectors.kandilli_parser import TXT, parse, parse_txt_lines, to_records
+
+ROW = '\t'.join([
+    '1', '20240601120000', '2024.06.01', '12:00:00.00', '38.1000', '27.2000', '10.0',
+    '0.0', '2.9', '3.1', '0.0', '0.0', '0.0', 'Ke', 'SINDIRGI (BALIKESIR)',
+])
+HEADER = 'No\tDeprem Kodu\tOlus tarihi\tOlus zamani\tEnlem\tBoylam\tDerinlik\txM\tMD\tML\tMw\tMs\tMb\tTip\tYer'
+
+
+def test_trailing_tabs_on_first_row_do_not_fail_the_chunk():
+    records = to_records(parse_txt_lines([ROW + '\t\t', ROW]))
+
+    assert len(records) == 2
+    assert all(record['location'] == 'SINDIRGI (BALIKESIR)' for record in records)
+
+
+def test_extra_fields_are_ignored():
+    [record] = to_records(parse('\n'.join([HEADER, ROW + '\tfazla\tsütun']) + '\n', TXT))
+
+    assert record['magnitude'] == 3.1
+    assert record['location'] == 'SINDIRGI (BALIKESIR)'
+
+
+def test_rows_with_missing_fields_are_skipped():
+    short = ROW.rsplit('\t', 1)[0]
+
+    assert len(to_records(parse_txt_lines([short, ROW]))) == 1
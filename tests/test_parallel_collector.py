@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from collectors import parallel_collector
+from collectors.cancellation import CollectionCancelled, claim
+from collectors.http_client import retry_budget
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    def install(**source_jobs):
+        monkeypatch.setattr(parallel_collector, 'SOURCE_JOBS', source_jobs)
+        monkeypatch.setattr(parallel_collector, 'SOURCE_SETTINGS', {
+            name: {'timeout': 1, 'deadline': 0.5} for name in source_jobs
+        })
+    return install
+
+
+def test_deadline_covers_retry_budget():
+    for settings in parallel_collector.SOURCE_SETTINGS.values():
+        assert settings['deadline'] > retry_budget(settings['timeout'])
+
+
+def test_collector_errors_are_reported(jobs):
+    def failing(timeout, token):
+        raise RuntimeError("HTTP 503")
+
+    jobs(Failing=failing, Fine=lambda timeout, token: claim(token))
+    results = parallel_collector.collect_all_parallel()
+
+    assert results['Failing']['status'] == 'error'
+    assert 'HTTP 503' in results['Failing']['error']
+    assert results['Fine']['status'] == 'ok'
+
+
+def test_abandoned_worker_cannot_write(jobs):
+    release = threading.Event()
+    finished = threading.Event()
+    outcome = {}
+
+    def slow(timeout, token):
+        release.wait(5)
+        try:
+            claim(token)
+            outcome['wrote'] = True
+        except CollectionCancelled:
+            outcome['wrote'] = False
+        finished.set()
+
+    jobs(Slow=slow)
+    results = parallel_collector.collect_all_parallel()
+    assert results['Slow']['status'] == 'timeout'
+
+    # Döngü bittikten sonra HTTP isteği tamamlansa bile yazma reddedilir
+    release.set()
+    assert finished.wait(5)
+    assert outcome['wrote'] is False
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from database.ingest import upsert_earthquakes
+from database.models import Earthquake, SessionLocal
+from database.recent_store import RecentEventStore
+
+
+def event(event_id, timestamp, magnitude):
+    return {
+        'event_id': event_id, 'timestamp': timestamp, 'latitude': 38.5, 'longitude': 27.5,
+        'magnitude': magnitude, 'depth': 7.0, 'location': 'AKHISAR (MANISA)', 'source': 'AFAD',
+    }
+
+
+def magnitudes(events):
+    return dict(zip(events.columns['event_id'].tolist(), events.columns['magnitude'].tolist()))
+
+
+def test_incremental_sync_sees_updates_to_old_rows():
+    now = datetime.utcnow().replace(microsecond=0)
+    upsert_earthquakes([event('afad_sync_old', now - timedelta(hours=3), 3.0)], associate=False)
+    upsert_earthquakes([event('afad_sync_new', now - timedelta(hours=1), 2.0)], associate=False)
+
+    db = SessionLocal()
+    try:
+        # Eski kaydın ingest'i OVERLAP'tan önce olmuş gibi
+        db.query(Earthquake).filter(Earthquake.event_id == 'afad_sync_old').update(
+            {Earthquake.created_at: now - timedelta(hours=3)}
+        )
+        db.commit()
+
+        store = RecentEventStore(Earthquake, window_hours=24)
+        assert magnitudes(store.sync(db, force=True))['afad_sync_old'] == 3.0
+
+        # Büyüklük revizyonu ve origin zamanı revizyonu
+        upsert_earthquakes([event('afad_sync_old', now - timedelta(hours=3), 3.4)], update=True, associate=False)
+        assert magnitudes(store.sync(db, force=True))['afad_sync_old'] == 3.4
+
+        upsert_earthquakes([event('afad_sync_old', now - timedelta(hours=2), 3.5)], update=True, associate=False)
+        events = store.sync(db, force=True)
+        assert magnitudes(events)['afad_sync_old'] == 3.5
+        assert events.columns['event_id'].tolist().count('afad_sync_old') == 1
+    finally:
+        db.close()